@@ -0,0 +1,124 @@
+"""Бюджеты SQL-запросов и времени ответа страниц.
+
+Фикстура ``query_budget`` открывает страницу с пустым кэшем, считает
+SQL-запросы на всех соединениях и медианное время повторных запросов
+и сравнивает их с бюджетом из ``tests/budgets.json``. Бюджет запросов
+строгий, бюджет времени — с запасом на шум машины.
+
+Пересчитать бюджеты по текущему коду::
+
+    pytest --update-budgets
+"""
+import json
+import os
+import statistics
+import time
+from contextlib import ExitStack
+
+import pytest
+from django.core.cache import cache
+from django.db import connections
+
+BUDGETS_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    'budgets.json',
+)
+TIMING_RUNS = 5
+# Время ответа может вырасти в TIMING_TOLERANCE раз плюс TIMING_SLACK_MS.
+TIMING_TOLERANCE = 3.0
+TIMING_SLACK_MS = 25.0
+
+
+class Budgets:
+    def __init__(self, update):
+        self.update = update
+        self.expected = {}
+        if os.path.exists(BUDGETS_PATH):
+            with open(BUDGETS_PATH, encoding='utf-8') as budgets_file:
+                self.expected = json.load(budgets_file)
+        self.measured = {}
+
+    def save(self):
+        budgets = {**self.expected, **self.measured}
+        with open(BUDGETS_PATH, 'w', encoding='utf-8') as budgets_file:
+            json.dump(budgets, budgets_file, indent=2, sort_keys=True)
+            budgets_file.write('\n')
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        '--update-budgets', action='store_true', default=False,
+        help='Перезаписать tests/budgets.json по текущим замерам',
+    )
+
+
+def pytest_configure(config):
+    config.query_budgets = Budgets(config.getoption('update_budgets'))
+
+
+def pytest_sessionfinish(session):
+    budgets = session.config.query_budgets
+    if budgets.update and budgets.measured:
+        budgets.save()
+
+
+def _get(client, url):
+    queries = []
+
+    def record(execute, sql, params, many, context):
+        queries.append(sql)
+        return execute(sql, params, many, context)
+
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(record))
+        response = client.get(url)
+    return response, queries
+
+
+@pytest.fixture
+def query_budget(request):
+    """Проверяет страницу ``url`` на бюджет запросов и времени.
+
+    Ключ бюджета — имя view (``posts:index``); ``label`` отличает
+    замеры одной view для разных пользователей.
+    """
+    budgets = request.config.query_budgets
+
+    def check(client, url, label=None):
+        cache.clear()
+        response, queries = _get(client, url)
+        assert response.status_code == 200, (
+            f'Страница `{url}` вернула {response.status_code}'
+        )
+        key = response.resolver_match.view_name
+        if label is not None:
+            key = f'{key}[{label}]'
+        timings = []
+        for _ in range(TIMING_RUNS):
+            started = time.perf_counter()
+            client.get(url)
+            timings.append((time.perf_counter() - started) * 1000)
+        measured = {
+            'queries': len(queries),
+            'ms': round(statistics.median(timings), 2),
+        }
+        if budgets.update:
+            budgets.measured[key] = measured
+            return measured
+        budget = budgets.expected.get(key)
+        assert budget is not None, (
+            f'Нет бюджета для `{key}`: запустите `pytest --update-budgets`'
+        )
+        assert measured['queries'] <= budget['queries'], (
+            f'`{key}` выполняет {measured["queries"]} SQL-запросов при '
+            f'бюджете {budget["queries"]}:\n' + '\n'.join(queries)
+        )
+        limit = budget['ms'] * TIMING_TOLERANCE + TIMING_SLACK_MS
+        assert measured['ms'] <= limit, (
+            f'`{key}` отвечает за {measured["ms"]} мс, '
+            f'базовое время {budget["ms"]} мс'
+        )
+        return measured
+
+    return check
@@ -0,0 +1,70 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from posts.models import Comment
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def feeds(few_posts_with_group, another_few_posts_with_group_with_follower,
+          user, another_user):
+    for number in range(10):
+        Comment.objects.create(
+            post=few_posts_with_group, author=another_user,
+            text=f'Комментарий {number}',
+        )
+    return few_posts_with_group
+
+
+class TestQueryBudgets:
+
+    def test_index(self, client, feeds, query_budget):
+        query_budget(client, reverse('posts:index'))
+
+    def test_group_list(self, client, feeds, query_budget):
+        query_budget(
+            client, reverse('posts:group_list', args=[feeds.group.slug])
+        )
+
+    def test_profile(self, user_client, feeds, query_budget):
+        url = reverse('posts:profile', args=[feeds.author.username])
+        query_budget(Client(), url, 'guest')
+        query_budget(user_client, url, 'user')
+
+    def test_post_detail(self, user_client, feeds, query_budget):
+        url = reverse('posts:post_detail', args=[feeds.pk])
+        query_budget(Client(), url, 'guest')
+        query_budget(user_client, url, 'user')
+
+    def test_post_comments(self, client, feeds, query_budget):
+        query_budget(
+            client, reverse('posts:post_comments', args=[feeds.pk])
+        )
+
+    def test_feeds(self, client, feeds, query_budget):
+        query_budget(client, reverse('posts:index_rss'))
+        query_budget(
+            client, reverse('posts:group_atom', args=[feeds.group.slug])
+        )
+
+    def test_follow_index(self, user_client, feeds, query_budget):
+        query_budget(user_client, reverse('posts:follow_index'))
+
+    def test_post_create(self, user_client, feeds, query_budget):
+        query_budget(user_client, reverse('posts:post_create'))
+
+    def test_post_edit(self, user_client, feeds, query_budget):
+        query_budget(user_client, reverse('posts:post_edit', args=[feeds.pk]))
+
+    def test_over_budget_fails(self, client, feeds, query_budget, request,
+                               monkeypatch):
+        budgets = request.config.query_budgets
+        if budgets.update:
+            pytest.skip('бюджеты пересчитываются')
+        monkeypatch.setitem(
+            budgets.expected, 'posts:index', {'queries': 1, 'ms': 1000}
+        )
+        with pytest.raises(AssertionError, match='SQL-запросов'):
+            query_budget(client, reverse('posts:index'))
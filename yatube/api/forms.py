@@ -0,0 +1,44 @@
+from django import forms
+from django.contrib.auth import get_user_model
+
+from posts.forms import PostForm
+from posts.models import Follow, Group
+
+User = get_user_model()
+
+
+class ApiPostForm(PostForm):
+    """Форма поста, в которой группа задаётся адресом, а не id."""
+    group = forms.ModelChoiceField(
+        Group.objects.all(), to_field_name='slug', required=False
+    )
+
+
+class GroupForm(forms.ModelForm):
+    class Meta:
+        model = Group
+        fields = ('title', 'slug', 'description')
+
+
+class FollowForm(forms.ModelForm):
+    author = forms.ModelChoiceField(
+        User.objects.all(), to_field_name='username'
+    )
+
+    class Meta:
+        model = Follow
+        fields = ('author',)
+
+    def __init__(self, *args, user, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.instance.user = user
+
+    def clean_author(self):
+        author = self.cleaned_data['author']
+        if author == self.instance.user:
+            raise forms.ValidationError('Нельзя подписаться на себя')
+        return author
+
+    def validate_unique(self):
+        # Повторная подписка не ошибка: view вернёт уже существующую.
+        pass
@@ -0,0 +1,229 @@
+"""Представление моделей в API: поля, связи и порядок выдачи.
+
+Ресурс выбирает из базы только колонки запрошенных полей
+(``?fields=id,text``) и присоединяет связанные таблицы одним запросом,
+только если их поля нужны. Страницы и выгрузка идут по ключу порядка
+без OFFSET, поэтому глубокие страницы стоят столько же, сколько первая.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+
+class ApiError(Exception):
+    def __init__(self, status, message, **extra):
+        super().__init__(message)
+        self.status = status
+        self.payload = {'detail': message, **extra}
+
+
+class Field:
+    """Поле ресурса.
+
+    ``value(obj, request)`` возвращает значение, ``columns`` — пути
+    колонок для ``only()``, ``related`` — связи для ``select_related()``.
+    """
+
+    def __init__(self, value, columns, related=()):
+        self.value = value
+        self.columns = columns
+        self.related = related
+
+
+def attr(name):
+    return Field(lambda obj, request: getattr(obj, name), (name,))
+
+
+def date(name):
+    return Field(
+        lambda obj, request: getattr(obj, name).isoformat(), (name,)
+    )
+
+
+def username(name):
+    return Field(
+        lambda obj, request: getattr(obj, name).username,
+        (name, f'{name}__username'),
+        (name,),
+    )
+
+
+def link(viewname, arg):
+    return Field(
+        lambda obj, request: request.build_absolute_uri(
+            reverse(viewname, args=[getattr(obj, arg)])
+        ),
+        (arg,),
+    )
+
+
+def _image(obj, request):
+    return request.build_absolute_uri(obj.image.url) if obj.image else None
+
+
+def _group(obj, request):
+    return obj.group.slug if obj.group_id else None
+
+
+class Resource:
+    model = None
+    ordering = ('pk',)
+    fields = {}
+
+    def __init__(self, request, queryset):
+        self.request = request
+        self.queryset = queryset
+        self.selected = self._selected(request.GET.get('fields'))
+
+    def _selected(self, raw):
+        if not raw:
+            return list(self.fields)
+        names = [name.strip() for name in raw.split(',') if name.strip()]
+        unknown = sorted(set(names) - set(self.fields))
+        if unknown:
+            raise ApiError(
+                400, 'Неизвестные поля: ' + ', '.join(unknown),
+                fields=list(self.fields),
+            )
+        return names
+
+    def _keys(self):
+        return [
+            (key.lstrip('-'), key.startswith('-')) for key in self.ordering
+        ]
+
+    def prepared(self):
+        """Запрос с нужными колонками и связями в порядке выдачи."""
+        columns = {name for name, _ in self._keys()}
+        related = set()
+        for name in self.selected:
+            columns.update(self.fields[name].columns)
+            related.update(self.fields[name].related)
+        queryset = self.queryset
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset.only(*columns).order_by(*self.ordering)
+
+    def serialize(self, obj):
+        return {
+            name: self.fields[name].value(obj, self.request)
+            for name in self.selected
+        }
+
+    def _values(self, obj):
+        return [getattr(obj, name) for name, _ in self._keys()]
+
+    def encode_cursor(self, obj):
+        raw = json.dumps(self._values(obj), cls=DjangoJSONEncoder)
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, token):
+        keys = self._keys()
+        try:
+            padded = token + '=' * (-len(token) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(keys):
+                raise ValueError(token)
+            return [
+                self._field(name).to_python(value)
+                for (name, _), value in zip(keys, values)
+            ]
+        except (ValueError, TypeError, ValidationError):
+            raise ApiError(400, 'Некорректный курсор')
+
+    def _field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def _after(self, values):
+        """Условие «строго после объекта с ключом ``values``»."""
+        condition = Q()
+        equal = {}
+        for (name, descending), value in zip(self._keys(), values):
+            op = 'lt' if descending else 'gt'
+            condition |= Q(**equal, **{f'{name}__{op}': value})
+            equal[name] = value
+        return condition
+
+    def page(self, cursor, limit):
+        """Возвращает объекты страницы и курсор следующей (или None)."""
+        queryset = self.prepared()
+        if cursor:
+            queryset = queryset.filter(
+                self._after(self.decode_cursor(cursor))
+            )
+        rows = list(queryset[:limit + 1])
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self.encode_cursor(rows[-1])
+        return [self.serialize(obj) for obj in rows], next_cursor
+
+    def stream(self, batch_size):
+        """Отдаёт все объекты пачками по ключу, держа в памяти одну пачку."""
+        queryset = self.prepared()
+        batch = list(queryset[:batch_size])
+        while batch:
+            for obj in batch:
+                yield self.serialize(obj)
+            if len(batch) < batch_size:
+                return
+            batch = list(
+                queryset.filter(self._after(self._values(batch[-1])))
+                [:batch_size]
+            )
+
+
+class PostResource(Resource):
+    model = Post
+    ordering = ('-pub_date', '-pk')
+    fields = {
+        'id': attr('pk'),
+        'text': attr('text'),
+        'pub_date': date('pub_date'),
+        'author': username('author'),
+        'group': Field(_group, ('group', 'group__slug'), ('group',)),
+        'image': Field(_image, ('image',)),
+        'comments_count': attr('comments_count'),
+        'url': link('posts:post_detail', 'pk'),
+    }
+
+
+class GroupResource(Resource):
+    model = Group
+    fields = {
+        'id': attr('pk'),
+        'title': attr('title'),
+        'slug': attr('slug'),
+        'description': attr('description'),
+        'posts_count': attr('posts_count'),
+        'url': link('posts:group_list', 'slug'),
+    }
+
+
+class CommentResource(Resource):
+    model = Comment
+    ordering = ('-pub_date', '-pk')
+    fields = {
+        'id': attr('pk'),
+        'post': Field(lambda obj, request: obj.post_id, ('post',)),
+        'author': username('author'),
+        'text': attr('text'),
+        'pub_date': date('pub_date'),
+    }
+
+
+class FollowResource(Resource):
+    model = Follow
+    fields = {
+        'id': attr('pk'),
+        'user': username('user'),
+        'author': username('author'),
+    }
@@ -0,0 +1,238 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.test.client import BOUNDARY, MULTIPART_CONTENT, encode_multipart
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class ApiReadTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author,
+                group=cls.group if number % 2 else None,
+                text=f'Пост {number}',
+            )
+            for number in range(5)
+        ]
+        cls.comment = Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий'
+        )
+
+    def test_cursor_pagination(self):
+        """Страницы по курсору проходят все посты без повторов"""
+        url = reverse('api:posts') + '?limit=2'
+        seen = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            data = response.json()
+            seen += [item['id'] for item in data['results']]
+            url = data['next']
+        self.assertEqual(
+            seen, [post.pk for post in reversed(self.posts)]
+        )
+
+    def test_invalid_cursor(self):
+        """Испорченный курсор даёт ошибку 400"""
+        response = self.client.get(reverse('api:posts') + '?cursor=xx')
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_fields(self):
+        """Пост отдаётся со всеми полями и связями одним запросом"""
+        post = self.posts[1]
+        with self.assertNumQueries(1):
+            data = self.client.get(
+                reverse('api:post', args=[post.pk])
+            ).json()
+        self.assertEqual(data['author'], 'author')
+        self.assertEqual(data['group'], 'group')
+        self.assertEqual(data['text'], post.text)
+        self.assertIsNone(data['image'])
+
+    def test_sparse_fields(self):
+        """Отдаются только запрошенные поля, лишние таблицы не читаются"""
+        with self.assertNumQueries(1) as context:
+            data = self.client.get(
+                reverse('api:posts') + '?fields=id,text'
+            ).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+        self.assertNotIn('auth_user', context.captured_queries[0]['sql'])
+        response = self.client.get(reverse('api:posts') + '?fields=nope')
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters(self):
+        """Посты фильтруются по автору и группе"""
+        data = self.client.get(
+            reverse('api:posts') + '?group=group&limit=100'
+        ).json()
+        self.assertEqual(len(data['results']), 2)
+        data = self.client.get(reverse('api:posts') + '?author=nobody').json()
+        self.assertEqual(data['results'], [])
+
+    def test_comments_and_groups(self):
+        """Комментарии поста и группы доступны без авторизации"""
+        data = self.client.get(
+            reverse('api:comments', args=[self.posts[0].pk])
+        ).json()
+        self.assertEqual(data['results'][0]['text'], 'Комментарий')
+        data = self.client.get(reverse('api:group', args=['group'])).json()
+        self.assertEqual(data['posts_count'], 2)
+        response = self.client.get(reverse('api:post', args=[0]))
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'detail': 'Не найдено'})
+
+    @override_settings(API_EXPORT_BATCH_SIZE=2)
+    def test_export_streams_in_batches(self):
+        """Выгрузка идёт в NDJSON пачками по ключу"""
+        response = self.client.get(reverse('api:posts_export'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'application/x-ndjson; charset=utf-8'
+        )
+        with self.assertNumQueries(3):
+            lines = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(
+            [json.loads(line)['id'] for line in lines],
+            [post.pk for post in reversed(self.posts)],
+        )
+
+
+class ApiWriteTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def send(self, client, method, url, data=None):
+        return getattr(client, method)(
+            url, json.dumps(data or {}), content_type='application/json'
+        )
+
+    def test_guest_cannot_write(self):
+        """Гость не может создавать посты"""
+        response = self.send(
+            self.client, 'post', reverse('api:posts'), {'text': 'Пост'}
+        )
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(Post.objects.exists())
+
+    def test_create_and_edit_post(self):
+        """Автор создаёт, правит и удаляет свой пост"""
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'),
+            {'text': 'Новый пост', 'group': 'group'},
+        )
+        self.assertEqual(response.status_code, 201)
+        post = Post.objects.get(pk=response.json()['id'])
+        self.assertEqual(post.group, self.group)
+        url = reverse('api:post', args=[post.pk])
+        response = self.send(
+            self.reader_client, 'patch', url, {'text': 'Чужая правка'}
+        )
+        self.assertEqual(response.status_code, 403)
+        response = self.send(
+            self.author_client, 'patch', url, {'text': 'Правка'}
+        )
+        self.assertEqual(response.json()['text'], 'Правка')
+        self.assertEqual(response.json()['group'], 'group')
+        response = self.author_client.delete(url)
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Post.objects.exists())
+
+    def test_patch_with_form_and_unknown_types(self):
+        """PATCH формой меняет поля, непонятное тело даёт 415"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        url = reverse('api:post', args=[post.pk])
+        response = self.author_client.patch(
+            url, 'text=%D0%A4%D0%BE%D1%80%D0%BC%D0%B0',
+            content_type='application/x-www-form-urlencoded',
+        )
+        self.assertEqual(response.json()['text'], 'Форма')
+        response = self.author_client.patch(
+            url, encode_multipart(BOUNDARY, {'text': 'Составная форма'}),
+            content_type=MULTIPART_CONTENT,
+        )
+        self.assertEqual(response.json()['text'], 'Составная форма')
+        response = self.author_client.patch(
+            url, 'text=Текст', content_type='text/plain'
+        )
+        self.assertEqual(response.status_code, 415)
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Составная форма')
+
+    def test_validation_errors(self):
+        """Ошибки формы возвращаются в JSON"""
+        response = self.send(
+            self.author_client, 'post', reverse('api:posts'),
+            {'text': '', 'group': 'missing'},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertCountEqual(response.json()['errors'], ['text', 'group'])
+
+    def test_comment(self):
+        """Вошедший пользователь комментирует пост"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        response = self.send(
+            self.reader_client, 'post',
+            reverse('api:comments', args=[post.pk]), {'text': 'Привет'},
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['author'], 'reader')
+        self.assertEqual(post.comments.get().text, 'Привет')
+
+    def test_groups_are_staff_only(self):
+        """Группы создаёт только персонал"""
+        data = {'title': 'Новая', 'slug': 'new', 'description': 'Текст'}
+        response = self.send(
+            self.reader_client, 'post', reverse('api:groups'), data
+        )
+        self.assertEqual(response.status_code, 403)
+        User.objects.filter(pk=self.reader.pk).update(is_staff=True)
+        response = self.send(
+            self.reader_client, 'post', reverse('api:groups'), data
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def test_follow(self):
+        """Подписка создаётся один раз и удаляется владельцем"""
+        url = reverse('api:follows')
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 201)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'author'}
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.send(
+            self.reader_client, 'post', url, {'author': 'reader'}
+        )
+        self.assertEqual(response.status_code, 400)
+        follow = Follow.objects.get()
+        detail = reverse('api:follow', args=[follow.pk])
+        self.assertEqual(self.author_client.delete(detail).status_code, 404)
+        self.assertEqual(self.client.get(url).status_code, 401)
+        self.assertEqual(self.reader_client.delete(detail).status_code, 204)
+        self.assertFalse(Follow.objects.exists())
@@ -0,0 +1,32 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.posts, name='posts'),
+    path('posts.ndjson', views.posts_export, name='posts_export'),
+    path('posts/<int:post_id>/', views.post, name='post'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comments,
+        name='comments'
+    ),
+    path(
+        'posts/<int:post_id>/comments.ndjson',
+        views.comments_export,
+        name='comments_export'
+    ),
+    path(
+        'posts/<int:post_id>/comments/<int:comment_id>/',
+        views.comment,
+        name='comment'
+    ),
+    path('groups/', views.groups, name='groups'),
+    path('groups.ndjson', views.groups_export, name='groups_export'),
+    path('groups/<slug:slug>/', views.group, name='group'),
+    path('follows/', views.follows, name='follows'),
+    path('follows.ndjson', views.follows_export, name='follows_export'),
+    path('follows/<int:follow_id>/', views.follow, name='follow'),
+]
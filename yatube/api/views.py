@@ -0,0 +1,280 @@
+import json
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import (
+    Http404,
+    HttpResponse,
+    JsonResponse,
+    QueryDict,
+    StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+
+from posts.forms import CommentForm
+from posts.models import Comment, Follow, Group, Post
+
+from .forms import ApiPostForm, FollowForm, GroupForm
+from .resources import (
+    ApiError,
+    CommentResource,
+    FollowResource,
+    GroupResource,
+    PostResource)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+NDJSON = 'application/x-ndjson; charset=utf-8'
+FORM_TYPES = ('application/x-www-form-urlencoded', 'multipart/form-data')
+
+
+def api_view(*methods):
+    """Проверяет метод и отдаёт ошибки API в JSON.
+
+    Изменяющие запросы доступны только вошедшим пользователям; CSRF для
+    них проверяет обычный middleware, как и для форм сайта.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                response = _error(405, 'Метод не поддерживается')
+                response['Allow'] = ', '.join(methods)
+                return response
+            try:
+                if (request.method not in SAFE_METHODS
+                        and not request.user.is_authenticated):
+                    raise ApiError(401, 'Требуется авторизация')
+                return view(request, *args, **kwargs)
+            except Http404:
+                return _error(404, 'Не найдено')
+            except ApiError as error:
+                return JsonResponse(error.payload, status=error.status)
+        return wrapper
+    return decorator
+
+
+def _error(status, message):
+    return JsonResponse({'detail': message}, status=status)
+
+
+def _limit(request):
+    try:
+        limit = int(request.GET.get('limit', settings.API_PAGE_SIZE))
+    except ValueError:
+        limit = settings.API_PAGE_SIZE
+    return max(1, min(limit, settings.API_MAX_PAGE_SIZE))
+
+
+def _page(request, resource):
+    results, cursor = resource.page(request.GET.get('cursor'), _limit(request))
+    next_url = None
+    if cursor is not None:
+        query = request.GET.copy()
+        query['cursor'] = cursor
+        next_url = request.build_absolute_uri('?' + query.urlencode())
+    return JsonResponse({'results': results, 'next': next_url})
+
+
+def _export(resource):
+    lines = (
+        json.dumps(item, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        for item in resource.stream(settings.API_EXPORT_BATCH_SIZE)
+    )
+    return StreamingHttpResponse(lines, content_type=NDJSON)
+
+
+def _detail(resource, **lookup):
+    obj = get_object_or_404(resource.prepared(), **lookup)
+    return JsonResponse(resource.serialize(obj))
+
+
+def _form(request):
+    if request.method == 'POST':
+        return request.POST, request.FILES
+    # Тело формы Django разбирает только у POST; PATCH разбираем сами.
+    if request.content_type == 'multipart/form-data':
+        return request.parse_file_upload(request.META, request)
+    return QueryDict(request.body, encoding=request.encoding), None
+
+
+def _payload(request):
+    """Данные запроса: JSON-объект или обычная форма с файлами.
+
+    Прочие типы тела дают 415, а не форму без полей.
+    """
+    if request.content_type in FORM_TYPES:
+        return _form(request)
+    if request.content_type != 'application/json':
+        raise ApiError(415, 'Ожидается JSON или форма')
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise ApiError(400, 'Некорректный JSON')
+    if not isinstance(data, dict):
+        raise ApiError(400, 'Ожидается JSON-объект')
+    return data, None
+
+
+def _bind(form_class, request, partial=False, **kwargs):
+    data, files = _payload(request)
+    form = form_class(data, files, **kwargs)
+    if partial:
+        # PATCH меняет только переданные поля.
+        for name in list(form.fields):
+            if name not in data and not (files and name in files):
+                del form.fields[name]
+    if not form.is_valid():
+        raise ApiError(
+            400, 'Ошибка в данных', errors=form.errors.get_json_data()
+        )
+    return form
+
+
+def _check_owner(request, owner_id):
+    if owner_id != request.user.pk:
+        raise ApiError(403, 'Изменять можно только свои записи')
+
+
+def _check_staff(request):
+    if not request.user.is_staff:
+        raise ApiError(403, 'Недостаточно прав')
+
+
+def _posts(request):
+    queryset = Post.objects.all()
+    if request.GET.get('author'):
+        queryset = queryset.filter(author__username=request.GET['author'])
+    if request.GET.get('group'):
+        queryset = queryset.filter(group__slug=request.GET['group'])
+    return queryset
+
+
+@api_view('GET', 'POST')
+def posts(request):
+    if request.method == 'POST':
+        post = _bind(ApiPostForm, request).save(commit=False)
+        post.author = request.user
+        post.save()
+        resource = PostResource(request, Post.objects.all())
+        return JsonResponse(resource.serialize(post), status=201)
+    return _page(request, PostResource(request, _posts(request)))
+
+
+@api_view('GET')
+def posts_export(request):
+    return _export(PostResource(request, _posts(request)))
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def post(request, post_id):
+    resource = PostResource(request, Post.objects.all())
+    if request.method == 'GET':
+        return _detail(resource, pk=post_id)
+    post = get_object_or_404(Post, pk=post_id)
+    _check_owner(request, post.author_id)
+    if request.method == 'DELETE':
+        post.delete()
+        return HttpResponse(status=204)
+    post = _bind(ApiPostForm, request, partial=True, instance=post).save()
+    return JsonResponse(resource.serialize(post))
+
+
+@api_view('GET', 'POST')
+def comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    resource = CommentResource(request, post.comments.all())
+    if request.method == 'POST':
+        comment = _bind(CommentForm, request).save(commit=False)
+        comment.author = request.user
+        comment.post = post
+        comment.save()
+        return JsonResponse(resource.serialize(comment), status=201)
+    return _page(request, resource)
+
+
+@api_view('GET')
+def comments_export(request, post_id):
+    post = get_object_or_404(Post.objects.only('pk'), pk=post_id)
+    return _export(CommentResource(request, post.comments.all()))
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def comment(request, post_id, comment_id):
+    resource = CommentResource(request, Comment.objects.all())
+    lookup = {'pk': comment_id, 'post_id': post_id}
+    if request.method == 'GET':
+        return _detail(resource, **lookup)
+    comment = get_object_or_404(Comment, **lookup)
+    _check_owner(request, comment.author_id)
+    if request.method == 'DELETE':
+        comment.delete()
+        return HttpResponse(status=204)
+    comment = _bind(
+        CommentForm, request, partial=True, instance=comment
+    ).save()
+    return JsonResponse(resource.serialize(comment))
+
+
+@api_view('GET', 'POST')
+def groups(request):
+    resource = GroupResource(request, Group.objects.all())
+    if request.method == 'POST':
+        _check_staff(request)
+        group = _bind(GroupForm, request).save()
+        return JsonResponse(resource.serialize(group), status=201)
+    return _page(request, resource)
+
+
+@api_view('GET')
+def groups_export(request):
+    return _export(GroupResource(request, Group.objects.all()))
+
+
+@api_view('GET', 'PATCH', 'DELETE')
+def group(request, slug):
+    resource = GroupResource(request, Group.objects.all())
+    if request.method == 'GET':
+        return _detail(resource, slug=slug)
+    _check_staff(request)
+    group = get_object_or_404(Group, slug=slug)
+    if request.method == 'DELETE':
+        group.delete()
+        return HttpResponse(status=204)
+    group = _bind(GroupForm, request, partial=True, instance=group).save()
+    return JsonResponse(resource.serialize(group))
+
+
+def _follows(request):
+    if not request.user.is_authenticated:
+        raise ApiError(401, 'Требуется авторизация')
+    return Follow.objects.filter(user=request.user)
+
+
+@api_view('GET', 'POST')
+def follows(request):
+    resource = FollowResource(request, _follows(request))
+    if request.method == 'POST':
+        form = _bind(FollowForm, request, user=request.user)
+        author = form.cleaned_data['author']
+        # Уникальность пары гарантирует база, как и в profile_follow.
+        follow, created = Follow.objects.get_or_create(
+            user=request.user, author=author
+        )
+        return JsonResponse(
+            resource.serialize(follow), status=201 if created else 200
+        )
+    return _page(request, resource)
+
+
+@api_view('GET')
+def follows_export(request):
+    return _export(FollowResource(request, _follows(request)))
+
+
+@api_view('GET', 'DELETE')
+def follow(request, follow_id):
+    resource = FollowResource(request, _follows(request))
+    if request.method == 'GET':
+        return _detail(resource, pk=follow_id)
+    get_object_or_404(_follows(request), pk=follow_id).delete()
+    return HttpResponse(status=204)
@@ -0,0 +1,115 @@
+"""Версии ключей и защита от лавинного пересчёта кэша.
+
+Каждая область (лента, группа, автор, пост) хранит в кэше число —
+время последнего изменения в миллисекундах. Версия входит в ключ
+фрагмента, поэтому после изменения данных старые фрагменты просто
+перестают находиться и вытесняются по таймауту.
+"""
+import math
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_PREFIX = 'version:'
+LOCK_POLL_INTERVAL = 0.05
+_MISSING = object()
+
+
+def _now():
+    return int(time.time() * 1000)
+
+
+def _key(scope):
+    return VERSION_PREFIX + scope
+
+
+def get_versions(*scopes):
+    """Возвращает словарь ``{область: версия}``.
+
+    Отсутствующая версия заводится текущим временем, так что после
+    очистки кэша ключи не совпадут со старыми.
+    """
+    keys = {_key(scope): scope for scope in scopes}
+    found = cache.get_many(list(keys))
+    versions = {}
+    for key, scope in keys.items():
+        version = found.get(key)
+        if version is None:
+            version = _now()
+            if not cache.add(key, version, None):
+                version = cache.get(key, version)
+        versions[scope] = version
+    return versions
+
+
+def version_key(*scopes):
+    """Склеивает версии областей в строку для ключа фрагмента."""
+    versions = get_versions(*scopes)
+    return '.'.join(str(versions[scope]) for scope in scopes)
+
+
+def bump(*scopes):
+    """Сдвигает версии областей, делая их фрагменты устаревшими."""
+    keys = [_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    now = _now()
+    cache.set_many(
+        {key: max(now, found.get(key, 0) + 1) for key in keys}, None
+    )
+
+
+def _store(key, compute, timeout, stale_timeout):
+    started = time.monotonic()
+    value = compute()
+    delta = time.monotonic() - started
+    expires = time.time() + timeout
+    cache.set(key, (value, expires, delta), timeout + stale_timeout)
+    return value
+
+
+def _lead(key, compute, timeout, stale_timeout):
+    """Пересчитывает значение, если удалось взять аренду на пересчёт."""
+    lock_key = key + ':lock'
+    if not cache.add(lock_key, 1, settings.CACHE_LOCK_TIMEOUT):
+        return _MISSING
+    try:
+        return _store(key, compute, timeout, stale_timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def _fresh(expires, delta, beta):
+    # Вероятностное раннее обновление (XFetch): чем ближе истечение и чем
+    # дороже пересчёт, тем вероятнее, что кто-то обновит значение заранее.
+    jitter = -delta * beta * math.log(1.0 - random.random())
+    return time.time() + jitter < expires
+
+
+def get_or_compute(key, compute, timeout, stale_timeout=None, beta=1.0):
+    """Возвращает значение из кэша, пересчитывая его не больше одного раза.
+
+    Пересчёт делает только процесс, взявший аренду ``<key>:lock``;
+    остальные в это время получают устаревшее значение (stale while
+    revalidate) или, если его ещё нет, коротко ждут результат лидера.
+    """
+    if stale_timeout is None:
+        stale_timeout = settings.CACHE_STALE_TIMEOUT
+    entry = cache.get(key)
+    if entry is not None:
+        value, expires, delta = entry
+        if _fresh(expires, delta, beta):
+            return value
+        fresh = _lead(key, compute, timeout, stale_timeout)
+        return value if fresh is _MISSING else fresh
+    value = _lead(key, compute, timeout, stale_timeout)
+    if value is not _MISSING:
+        return value
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(LOCK_POLL_INTERVAL)
+        entry = cache.get(key)
+        if entry is not None:
+            return entry[0]
+    return compute()
@@ -0,0 +1,77 @@
+"""Условный GET (ETag / Last-Modified) по версиям кэша.
+
+Версия области — это время её последнего изменения в миллисекундах,
+поэтому по версиям страницы можно ответить ``304 Not Modified`` ещё до
+выборки постов и рендеринга шаблона.
+"""
+import hashlib
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.middleware.csrf import get_token
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from . import cache as versions
+
+
+def per_request(func):
+    """Запоминает результат ``func(request, ...)`` до конца запроса.
+
+    Позволяет валидаторам и самой view получить объект одним запросом.
+    """
+    @wraps(func)
+    def wrapper(request, *args, **kwargs):
+        memo = request.__dict__.setdefault('_per_request', {})
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        if key not in memo:
+            memo[key] = func(request, *args, **kwargs)
+        return memo[key]
+    return wrapper
+
+
+def conditional(scopes_func):
+    """Декоратор условного GET для страницы из областей ``scopes_func``.
+
+    ``scopes_func(request, *args, **kwargs)`` возвращает области кэша,
+    от которых зависит страница. ETag строится из их версий, адреса,
+    пользователя и его CSRF-секрета; Last-Modified отдаётся только анонимам,
+    для которых страница не зависит от сессии.
+    """
+    @per_request
+    def page_versions(request, *args, **kwargs):
+        scopes = scopes_func(request, *args, **kwargs)
+        found = versions.get_versions(*scopes)
+        return [found[scope] for scope in scopes]
+
+    def etag(request, *args, **kwargs):
+        parts = [request.get_full_path(), str(request.user.pk)]
+        if request.user.is_authenticated:
+            # В формах страницы есть CSRF-токен: при смене секрета (вход,
+            # новая cookie) сохранённая браузером копия уже не годится.
+            get_token(request)
+            parts.append(request.META['CSRF_COOKIE'])
+        parts.extend(map(str, page_versions(request, *args, **kwargs)))
+        return hashlib.md5('\n'.join(parts).encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return None
+        changed = max(page_versions(request, *args, **kwargs))
+        return datetime.fromtimestamp(changed / 1000, timezone.utc)
+
+    def decorator(view):
+        conditional_view = condition(etag, last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            # Без no-cache браузер по эвристике Last-Modified может
+            # показать устаревшую страницу, не спросив сервер.
+            if request.user.is_authenticated:
+                patch_cache_control(response, no_cache=True, private=True)
+            else:
+                patch_cache_control(response, no_cache=True)
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,27 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает статистику попаданий в общий кэш'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not hasattr(cache, 'stats'):
+            raise CommandError(
+                f'Кэш {options["alias"]!r} не собирает статистику'
+            )
+        stats = cache.stats()
+        shared = stats['shared']
+        lookups = shared['l1_hits'] + shared['hits'] + shared['misses']
+        hit_rate = (
+            (shared['l1_hits'] + shared['hits']) / lookups if lookups else 0
+        )
+        for name, value in shared.items():
+            self.stdout.write(f'{name}: {value}')
+        self.stdout.write(f'hit_rate: {hit_rate:.1%}')
+        self.stdout.write(f'entries: {stats["entries"]}')
+        self.stdout.write(f'size: {stats["size"]}')
@@ -0,0 +1,113 @@
+import os
+import random
+import tempfile
+import threading
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler, OperationalError
+
+ENGINES = (
+    ('sqlite3', 'django.db.backends.sqlite3'),
+    ('core.sqlite_backend', 'core.sqlite_backend'),
+)
+
+
+def _worker(handler, deadline, write_ratio, rows, totals, guard):
+    connection = handler[DEFAULT_DB_ALIAS]
+    reads = writes = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            if random.random() < write_ratio:
+                # Как get_or_create: чтение, а затем запись в одной
+                # транзакции.
+                connection.set_autocommit(False)
+                try:
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM bench')
+                        cursor.execute(
+                            'INSERT INTO bench (value) VALUES (%s)',
+                            ['x' * 100],
+                        )
+                    connection.commit()
+                finally:
+                    connection.set_autocommit(True)
+                writes += 1
+            else:
+                with connection.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT value FROM bench WHERE id = %s',
+                        [random.randint(1, rows)],
+                    )
+                    cursor.fetchone()
+                reads += 1
+        except OperationalError:
+            errors += 1
+            connection.rollback()
+    connection.close()
+    with guard:
+        totals['reads'] += reads
+        totals['writes'] += writes
+        totals['errors'] += errors
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность чтения и записи SQLite '
+        'со стандартным бэкендом и с core.sqlite_backend'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--seconds', type=float, default=3.0)
+        parser.add_argument('--write-ratio', type=float, default=0.2)
+        parser.add_argument('--rows', type=int, default=10000)
+
+    def run(self, engine, path, options):
+        handler = ConnectionHandler({
+            DEFAULT_DB_ALIAS: {'ENGINE': engine, 'NAME': path},
+        })
+        connection = handler[DEFAULT_DB_ALIAS]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench (id INTEGER PRIMARY KEY, value TEXT)'
+            )
+            cursor.executemany(
+                'INSERT INTO bench (value) VALUES (%s)',
+                [['x' * 100]] * options['rows'],
+            )
+        connection.close()
+        totals = {'reads': 0, 'writes': 0, 'errors': 0}
+        guard = threading.Lock()
+        deadline = time.monotonic() + options['seconds']
+        threads = [
+            threading.Thread(target=_worker, args=(
+                handler, deadline, options['write_ratio'], options['rows'],
+                totals, guard,
+            ))
+            for _ in range(options['threads'])
+        ]
+        started = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.monotonic() - started
+        return {
+            name: value / elapsed if name != 'errors' else value
+            for name, value in totals.items()
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f'{"бэкенд":<22}{"чтений/с":>12}{"записей/с":>12}{"ошибок":>9}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for label, engine in ENGINES:
+                path = os.path.join(directory, f'{label}.sqlite3')
+                result = self.run(engine, path, options)
+                self.stdout.write(
+                    f'{label:<22}{result["reads"]:>12.0f}'
+                    f'{result["writes"]:>12.0f}{result["errors"]:>9}'
+                )
@@ -0,0 +1,327 @@
+"""Метрики стоимости запросов.
+
+``PerformanceMiddleware`` заводит на время запроса набор счётчиков:
+время ответа, число и время SQL-запросов, время рендеринга шаблонов,
+попадания и промахи кэша, время работы с миниатюрами. Код, который
+делает эту работу, сообщает о ней через ``timer()`` и ``count()``.
+
+По завершении запроса значения попадают в гистограммы по имени URL
+(``posts:index``, ``posts:profile``...), которые ``render()`` отдаёт
+в текстовом формате Prometheus.
+
+Гистограммы копятся в памяти процесса и не реже раза в
+``FLUSH_INTERVAL`` секунд пишутся в свой файл в ``METRICS_DIR``, как в
+мультипроцессном режиме клиента Prometheus. ``render()`` складывает
+файлы всех воркеров, так что любой из них отдаёт общие числа. Файлы
+завершившихся процессов остаются и входят в сумму: каталог очищают
+при перезапуске сервиса.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import routers
+
+PREFIX = 'yatube_'
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (1, 2, 5, 10, 20, 50, 100, 200)
+# Имя гистограммы: (описание, границы корзин, значение из RequestMetrics).
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        'Полное время обработки запроса', SECONDS,
+        lambda metrics: metrics.duration,
+    ),
+    'db_queries': (
+        'Число SQL-запросов', QUERIES,
+        lambda metrics: metrics.counts['db_queries'],
+    ),
+    'db_duration_seconds': (
+        'Суммарное время SQL-запросов', SECONDS,
+        lambda metrics: metrics.timings['db'],
+    ),
+    'template_duration_seconds': (
+        'Время рендеринга шаблонов', SECONDS,
+        lambda metrics: metrics.timings['template'],
+    ),
+    'thumbnail_duration_seconds': (
+        'Время получения и генерации миниатюр', SECONDS,
+        lambda metrics: metrics.timings['thumbnail'],
+    ),
+}
+COUNTERS = {
+    'cache_hits_total': 'Попадания в кэш',
+    'cache_misses_total': 'Промахи кэша',
+}
+
+FLUSH_INTERVAL = 1.0
+
+_current = ContextVar('request_metrics', default=None)
+_histograms = {}
+_counters = defaultdict(int)
+_lock = threading.Lock()
+_snapshot = {'name': None, 'flushed': 0.0}
+
+
+class RequestMetrics:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.timings = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.active = set()
+
+
+def begin():
+    return _current.set(RequestMetrics())
+
+
+def end(token):
+    """Завершает запрос и возвращает его метрики."""
+    metrics = _current.get()
+    _current.reset(token)
+    metrics.duration = time.perf_counter() - metrics.started
+    return metrics
+
+
+def count(name, value=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.counts[name] += value
+
+
+@contextmanager
+def timer(name):
+    """Добавляет время блока к ``name``; вложенные замеры не суммируются."""
+    metrics = _current.get()
+    if metrics is None or name in metrics.active:
+        yield
+        return
+    metrics.active.add(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.timings[name] += time.perf_counter() - started
+        metrics.active.discard(name)
+
+
+def execute_wrapper(execute, sql, params, many, context):
+    """Обёртка ``connection.execute_wrapper`` для учёта SQL-запросов."""
+    count('db_queries')
+    with timer('db'):
+        return execute(sql, params, many, context)
+
+
+def server_timing(metrics):
+    """Значение заголовка ``Server-Timing`` (длительности в мс)."""
+    def ms(seconds):
+        return f'{seconds * 1000:.1f}'
+
+    return ', '.join((
+        f'total;dur={ms(metrics.duration)}',
+        f'db;desc="{metrics.counts["db_queries"]} queries";'
+        f'dur={ms(metrics.timings["db"])}',
+        f'tpl;dur={ms(metrics.timings["template"])}',
+        f'thumb;dur={ms(metrics.timings["thumbnail"])}',
+        f'cache;desc="{metrics.counts["cache_hits"]} hits, '
+        f'{metrics.counts["cache_misses"]} misses"',
+    ))
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        total = 0
+        for bound, number in zip((*self.buckets, '+Inf'), self.counts):
+            total += number
+            yield bound, total
+
+
+def record(view, metrics):
+    """Добавляет метрики запроса к гистограммам и счётчикам ``view``."""
+    with _lock:
+        for name, (_, buckets, value) in HISTOGRAMS.items():
+            histogram = _histograms.get((name, view))
+            if histogram is None:
+                histogram = _histograms[name, view] = Histogram(buckets)
+            histogram.observe(value(metrics))
+        _counters['cache_hits_total', view] += metrics.counts['cache_hits']
+        _counters['cache_misses_total', view] += (
+            metrics.counts['cache_misses']
+        )
+    if time.monotonic() - _snapshot['flushed'] >= FLUSH_INTERVAL:
+        flush()
+
+
+def _snapshot_path():
+    # Имя с uuid: процесс с тем же pid не затрёт файл предшественника.
+    if _snapshot['name'] is None:
+        _snapshot['name'] = f'{os.getpid()}-{uuid.uuid4().hex}.json'
+    return os.path.join(settings.METRICS_DIR, _snapshot['name'])
+
+
+def flush():
+    """Записывает метрики процесса в его файл в ``METRICS_DIR``."""
+    with _lock:
+        data = {
+            'histograms': [
+                [name, view, histogram.counts, histogram.sum,
+                 histogram.count]
+                for (name, view), histogram in _histograms.items()
+            ],
+            'counters': [
+                [name, view, value]
+                for (name, view), value in _counters.items()
+            ],
+            'routing': [
+                [alias, reason, value]
+                for (alias, reason), value in routers.stats().items()
+            ],
+        }
+        _snapshot['flushed'] = time.monotonic()
+    path = _snapshot_path()
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    temporary = f'{path}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def _forked():
+    # Дочерний процесс начинает с нуля: унаследованное уже лежит в
+    # файле родителя.
+    _histograms.clear()
+    _counters.clear()
+    routers.reset_stats()
+    _snapshot.update(name=None, flushed=0.0)
+
+
+os.register_at_fork(after_in_child=_forked)
+
+
+def _snapshots():
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(settings.METRICS_DIR, name)) as file:
+                yield json.load(file)
+        except (OSError, ValueError):
+            # Файл удалили или дописывают: его числа будут в следующий раз.
+            continue
+
+
+def collect():
+    """Сумма метрик всех процессов: (гистограммы, счётчики, маршруты)."""
+    flush()
+    histograms = {}
+    counters = defaultdict(int)
+    routing = defaultdict(int)
+    for data in _snapshots():
+        for name, view, counts, total, number in data['histograms']:
+            if name not in HISTOGRAMS:
+                continue
+            histogram = histograms.get((name, view))
+            if histogram is None:
+                histogram = histograms[name, view] = Histogram(
+                    HISTOGRAMS[name][1]
+                )
+            if len(counts) != len(histogram.counts):
+                # Файл процесса со старыми границами корзин.
+                continue
+            histogram.counts = [
+                mine + theirs
+                for mine, theirs in zip(histogram.counts, counts)
+            ]
+            histogram.sum += total
+            histogram.count += number
+        for name, view, value in data['counters']:
+            counters[name, view] += value
+        for alias, reason, value in data['routing']:
+            routing[alias, reason] += value
+    return histograms, counters, routing
+
+
+def reset():
+    """Сбрасывает метрики всех процессов (для тестов)."""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+    try:
+        names = os.listdir(settings.METRICS_DIR)
+    except FileNotFoundError:
+        return
+    for name in names:
+        os.remove(os.path.join(settings.METRICS_DIR, name))
+
+
+def _labels(**labels):
+    def escape(value):
+        return (
+            str(value).replace('\\', '\\\\')
+            .replace('"', '\\"').replace('\n', '\\n')
+        )
+    return ','.join(
+        f'{key}="{escape(value)}"' for key, value in labels.items()
+    )
+
+
+def render():
+    """Метрики всех процессов в текстовом формате Prometheus."""
+    histograms, counters, routing = collect()
+    lines = []
+    for name, (help_text, _, _) in HISTOGRAMS.items():
+        lines += [
+            f'# HELP {PREFIX}{name} {help_text}',
+            f'# TYPE {PREFIX}{name} histogram',
+        ]
+        for (metric, view), histogram in sorted(histograms.items()):
+            if metric != name:
+                continue
+            for bound, total in histogram.cumulative():
+                labels = _labels(view=view, le=bound)
+                lines.append(f'{PREFIX}{name}_bucket{{{labels}}} {total}')
+            labels = _labels(view=view)
+            lines.append(f'{PREFIX}{name}_sum{{{labels}}} {histogram.sum}')
+            lines.append(f'{PREFIX}{name}_count{{{labels}}} {histogram.count}')
+    for name, help_text in COUNTERS.items():
+        lines += [
+            f'# HELP {PREFIX}{name} {help_text}',
+            f'# TYPE {PREFIX}{name} counter',
+        ]
+        for (metric, view), value in sorted(counters.items()):
+            if metric == name:
+                labels = _labels(view=view)
+                lines.append(f'{PREFIX}{name}{{{labels}}} {value}')
+    name = PREFIX + 'db_routing_total'
+    lines += [
+        f'# HELP {name} Решения маршрутизатора баз данных',
+        f'# TYPE {name} counter',
+    ]
+    for (alias, reason), value in sorted(routing.items()):
+        lines.append(
+            f'{name}{{{_labels(alias=alias, reason=reason)}}} {value}'
+        )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,75 @@
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, routers
+
+PIN_COOKIE = 'primary_db'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет за основной базой пользователя, который только что писал.
+
+    Пока действует cookie, его чтения не уходят на реплики и он видит
+    свои посты, комментарии и подписки без задержки репликации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = (
+            request.method not in SAFE_METHODS
+            or PIN_COOKIE in request.COOKIES
+        )
+        token = routers.begin_request(pinned)
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = routers.end_request(token)
+        if wrote:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
+
+
+class PerformanceMiddleware:
+    """Считает стоимость запроса и копит её по имени URL.
+
+    Стоит первым в ``MIDDLEWARE``, чтобы время ответа включало всю
+    обработку. Итоги запроса отдаются в заголовке ``Server-Timing``
+    (по умолчанию только персоналу: времена выдают устройство сайта),
+    гистограммы — на странице метрик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = metrics.begin()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute_wrapper)
+                    )
+                response = self.get_response(request)
+        finally:
+            result = metrics.end(token)
+        match = request.resolver_match
+        metrics.record(match.view_name if match else 'unresolved', result)
+        if self.show_timing(request):
+            response['Server-Timing'] = metrics.server_timing(result)
+        return response
+
+    def show_timing(self, request):
+        if settings.SERVER_TIMING == 'staff':
+            user = getattr(request, 'user', None)
+            return user is not None and user.is_staff
+        return bool(settings.SERVER_TIMING)
@@ -0,0 +1,174 @@
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_PARAM = 'cursor'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(pub_date, pk, backwards=False):
+    """Упаковывает ключ (pub_date, pk) в токен для URL."""
+    payload = {'d': pub_date.isoformat(), 'i': pk}
+    if backwards:
+        payload['b'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, pk, backwards) из токена курсора."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        pub_date = parse_datetime(payload['d'])
+        pk = int(payload['i'])
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidCursor(token)
+    if pub_date is None:
+        raise InvalidCursor(token)
+    return pub_date, pk, bool(payload.get('b'))
+
+
+class CursorPage(Page):
+    """Страница ленты, открытая по курсору.
+
+    В отличие от обычной страницы не знает своего номера и общего
+    числа страниц, зато знает курсоры соседних страниц. Они строятся
+    сразу из ключей paginator, так что ``object_list`` потом можно
+    заменить (см. ``timeline.as_posts``).
+    """
+
+    def __init__(self, object_list, paginator, cursor,
+                 has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self.cursor = cursor
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = None
+        self.previous_cursor = None
+        if has_next and object_list:
+            self.next_cursor = encode_cursor(
+                *paginator.key_values(object_list[-1])
+            )
+        if has_previous and object_list:
+            self.previous_cursor = encode_cursor(
+                *paginator.key_values(object_list[0]), backwards=True
+            )
+
+    def __repr__(self):
+        return '<Page cursor=%s>' % (self.cursor or '-')
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def next_page_number(self):
+        return self.next_cursor
+
+    def previous_page_number(self):
+        return self.previous_cursor
+
+    def start_index(self):
+        return None
+
+    def end_index(self):
+        return None
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id) без COUNT(*) и OFFSET.
+
+    Каждая страница — это один индексный проход от позиции курсора,
+    поэтому глубокие страницы стоят столько же, сколько первая.
+    ``keys`` — пути полей, по которым идёт сортировка и поиск; из них же
+    берутся значения для курсора. Общее число объектов и страниц, если
+    к ним обратиться, считается обычным ``COUNT(*)``.
+    """
+
+    cursor_mode = True
+
+    def __init__(self, object_list, per_page, keys=('pub_date', 'pk')):
+        super().__init__(object_list, per_page)
+        self.date_key, self.pk_key = keys
+
+    def key_values(self, obj):
+        """Значения ключей сортировки объекта: ``(дата, id)``."""
+        values = []
+        for key in (self.date_key, self.pk_key):
+            value = obj
+            for attr in key.split('__'):
+                value = getattr(value, attr)
+            values.append(value)
+        return values
+
+    def _ordered(self, backwards=False):
+        sign = '' if backwards else '-'
+        return self.object_list.order_by(
+            sign + self.date_key, sign + self.pk_key
+        )
+
+    def _seek(self, pub_date, pk, backwards):
+        op = 'gt' if backwards else 'lt'
+        condition = (
+            Q(**{f'{self.date_key}__{op}': pub_date})
+            | Q(**{self.date_key: pub_date, f'{self.pk_key}__{op}': pk})
+        )
+        return self._ordered(backwards).filter(condition)
+
+    def page(self, cursor=None):
+        if not cursor:
+            rows = list(self._ordered()[:self.per_page + 1])
+            return CursorPage(
+                rows[:self.per_page], self, None,
+                has_next=len(rows) > self.per_page,
+                has_previous=False,
+            )
+        pub_date, pk, backwards = decode_cursor(cursor)
+        rows = list(self._seek(pub_date, pk, backwards)[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            return CursorPage(
+                rows, self, cursor, has_next=True, has_previous=more,
+            )
+        return CursorPage(
+            rows, self, cursor, has_next=more, has_previous=True,
+        )
+
+    def get_page(self, cursor=None):
+        try:
+            return self.page(cursor)
+        except InvalidCursor:
+            return self.page(None)
+
+
+def paginate(request, queryset, feed=None, per_page=None, keys=None,
+             count=None):
+    """Возвращает страницу ленты в режиме, заданном для неё в настройках.
+
+    Если в запросе есть параметр ``cursor``, страница всегда строится
+    по курсору — так работают ссылки, отрендеренные в курсорном режиме.
+    Известное заранее ``count`` избавляет нумерованные страницы от
+    запроса ``COUNT(*)``.
+    """
+    per_page = per_page or settings.POSTS_PER_PAGE
+    mode = settings.FEED_PAGINATION.get(feed, 'page')
+    if CURSOR_PARAM in request.GET or mode == 'cursor':
+        paginator = CursorPaginator(
+            queryset, per_page, keys or ('pub_date', 'pk')
+        )
+        return paginator.get_page(request.GET.get(CURSOR_PARAM))
+    paginator = Paginator(queryset, per_page)
+    if count is not None:
+        paginator.count = count
+    return paginator.get_page(request.GET.get('page'))
@@ -0,0 +1,91 @@
+"""Маршрутизация чтения на реплики.
+
+Чтение моделей из ``settings.REPLICA_READ_APPS`` уходит на случайную
+реплику из ``settings.DATABASE_REPLICAS``, запись — всегда в default.
+Чтение остаётся на основной базе внутри транзакции и в запросах, где
+пользователь только что писал: ``PrimaryPinMiddleware`` закрепляет его
+за основной базой cookie на ``settings.REPLICA_PIN_SECONDS``.
+
+Каждое решение учитывается в ``stats()`` как ``(база, причина)``.
+"""
+import logging
+import random
+import threading
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+_request = ContextVar('db_routing_request', default=None)
+_decisions = Counter()
+_decisions_lock = threading.Lock()
+
+
+class RequestState:
+    def __init__(self, pinned):
+        self.pinned = pinned
+        self.wrote = False
+
+
+def begin_request(pinned):
+    return _request.set(RequestState(pinned))
+
+
+def end_request(token):
+    """Завершает запрос; возвращает True, если в нём была запись."""
+    state = _request.get()
+    _request.reset(token)
+    return state is not None and state.wrote
+
+
+def stats():
+    """Счётчики решений ``{(база, причина): число}``."""
+    with _decisions_lock:
+        return dict(_decisions)
+
+
+def reset_stats():
+    with _decisions_lock:
+        _decisions.clear()
+
+
+def _route(model, alias, reason):
+    with _decisions_lock:
+        _decisions[alias, reason] += 1
+    logger.debug('%s -> %s (%s)', model._meta.label, alias, reason)
+    return alias
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if model._meta.app_label not in settings.REPLICA_READ_APPS:
+            return _route(model, DEFAULT_DB_ALIAS, 'app')
+        if not settings.DATABASE_REPLICAS:
+            return _route(model, DEFAULT_DB_ALIAS, 'no_replicas')
+        state = _request.get()
+        if state is not None and state.pinned:
+            return _route(model, DEFAULT_DB_ALIAS, 'pinned')
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return _route(model, DEFAULT_DB_ALIAS, 'atomic')
+        return _route(
+            model, random.choice(settings.DATABASE_REPLICAS), 'replica'
+        )
+
+    def db_for_write(self, model, **hints):
+        state = _request.get()
+        if state is not None:
+            # Дальше в этом запросе читаем то, что только что записали.
+            state.pinned = state.wrote = True
+        return _route(model, DEFAULT_DB_ALIAS, 'write')
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, связи между ними допустимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
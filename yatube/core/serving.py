@@ -0,0 +1,296 @@
+"""Раздача статики и картинок постов прямо из WSGI.
+
+``FileServer`` оборачивает приложение Django и отвечает на GET и HEAD
+под ``STATIC_URL`` (из ``STATIC_ROOT`` после collectstatic) и под
+``MEDIA_URL``, не доходя до middleware и шаблонов. Остальные запросы и
+файлы, которых нет, уходят в Django.
+
+- Полный файл отдаётся через ``wsgi.file_wrapper``: gunicorn и uWSGI
+  пишут его в сокет через ``sendfile`` без копирования в процесс.
+- ``Range`` с одним диапазоном даёт 206, с недостижимым — 416; несколько
+  диапазонов отдаются целым файлом, как разрешает RFC 7233.
+- Сжатая копия ``.br`` или ``.gz`` от ``core.staticfiles`` выбирается по
+  ``Accept-Encoding``; запросы с ``Range`` получают исходный файл.
+- Файлы с хэшем содержимого в имени (статика из манифеста, картинки
+  ``core.storage``) кэшируются навсегда как ``immutable``, остальные на
+  ``SERVE_MAX_AGE`` секунд с проверкой по ``ETag`` и ``Last-Modified``.
+"""
+import mimetypes
+import os
+import re
+import stat
+from wsgiref.util import FileWrapper
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.handlers.wsgi import get_path_info
+from django.utils.http import http_date, parse_http_date_safe
+
+from .staticfiles import ENCODINGS, compressible
+from .storage import is_hashed
+
+BLOCK_SIZE = 64 * 1024
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+STATUSES = {
+    200: '200 OK',
+    206: '206 Partial Content',
+    304: '304 Not Modified',
+    416: '416 Range Not Satisfiable',
+}
+TEXT_TYPES = ('application/javascript', 'application/json', 'image/svg+xml')
+
+
+class Unsatisfiable(Exception):
+    pass
+
+
+def parse_range(header, size):
+    """Диапазон ``(начало, конец)`` включительно или ``None``.
+
+    ``None`` значит «отдать файл целиком»: заголовок не разобран или
+    диапазонов несколько. Недостижимый диапазон — ``Unsatisfiable``.
+    """
+    match = RANGE_RE.match(header.strip())
+    if match is None:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last:
+            return None
+        length = int(last)
+        if length == 0 or size == 0:
+            raise Unsatisfiable
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise Unsatisfiable
+    return start, min(end, size - 1)
+
+
+def accepted_encodings(header):
+    """``{кодировка: q}`` из ``Accept-Encoding``."""
+    accepted = {}
+    for part in header.split(','):
+        coding, *params = part.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.strip().partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def etag(stat_result):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}"'
+
+
+def content_type(path):
+    mime, _ = mimetypes.guess_type(path)
+    if mime is None:
+        return 'application/octet-stream'
+    if mime.startswith('text/') or mime in TEXT_TYPES:
+        return mime + '; charset=utf-8'
+    return mime
+
+
+class FileRange:
+    """Тело ответа 206: читает из файла только запрошенный диапазон.
+
+    ``wsgi.file_wrapper`` не знает про смещение и длину, поэтому здесь
+    обычное чтение блоками.
+    """
+
+    def __init__(self, file, start, length):
+        self.file = file
+        self.start = start
+        self.length = length
+
+    def __iter__(self):
+        self.file.seek(self.start)
+        remaining = self.length
+        while remaining > 0:
+            chunk = self.file.read(min(remaining, BLOCK_SIZE))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+class FileServer:
+    def __init__(self, application):
+        self.application = application
+        self.mounts = []
+        if settings.STATIC_ROOT:
+            self.mounts.append(
+                (settings.STATIC_URL, settings.STATIC_ROOT, self.hashed_static)
+            )
+        if settings.MEDIA_ROOT:
+            self.mounts.append(
+                (settings.MEDIA_URL, settings.MEDIA_ROOT, is_hashed)
+            )
+        hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+        self.static_names = frozenset(hashed_files.values())
+
+    def __call__(self, environ, start_response):
+        if environ['REQUEST_METHOD'] in ('GET', 'HEAD'):
+            found = self.find(get_path_info(environ))
+            if found is not None:
+                return self.serve(environ, start_response, *found)
+        return self.application(environ, start_response)
+
+    def hashed_static(self, name):
+        return name in self.static_names
+
+    def find(self, path_info):
+        """``(путь, имя, неизменяемый ли)`` или ``None``."""
+        for prefix, root, immutable in self.mounts:
+            if path_info.startswith(prefix):
+                name = path_info[len(prefix):]
+                break
+        else:
+            return None
+        parts = name.split('/')
+        # Пустые части, скрытые файлы и ``..`` не отдаются: путь не может
+        # выйти из корня.
+        if '\x00' in name or any(
+            not part or part.startswith('.') for part in parts
+        ):
+            return None
+        return os.path.join(root, *parts), name, immutable(name)
+
+    def select(self, environ, path, name):
+        """Выбирает сжатую копию по ``Accept-Encoding``.
+
+        Возвращает ``(путь, stat, кодировка, зависит ли от кодировки)``
+        или ``None``, если файла нет.
+        """
+        try:
+            original = os.stat(path)
+        except OSError:
+            return None
+        if not stat.S_ISREG(original.st_mode):
+            return None
+        if not compressible(name):
+            return path, original, None, False
+        if 'HTTP_RANGE' in environ:
+            return path, original, None, True
+        accepted = accepted_encodings(environ.get('HTTP_ACCEPT_ENCODING', ''))
+        # По убыванию q, при равном q — в порядке ENCODINGS.
+        candidates = sorted(
+            (-accepted.get(encoding, accepted.get('*', 0)), order,
+             encoding, suffix)
+            for order, (encoding, suffix, _) in enumerate(ENCODINGS)
+        )
+        for quality, _, encoding, suffix in candidates:
+            if quality >= 0:
+                break
+            try:
+                variant = os.stat(path + suffix)
+            except OSError:
+                continue
+            return path + suffix, variant, encoding, True
+        return path, original, None, True
+
+    def serve(self, environ, start_response, path, name, immutable):
+        selected = self.select(environ, path, name)
+        if selected is None:
+            return self.application(environ, start_response)
+        path, stat_result, encoding, varies = selected
+        headers = self.headers(stat_result, immutable, varies)
+        if self.not_modified(environ, stat_result):
+            start_response(STATUSES[304], headers)
+            return []
+        size = stat_result.st_size
+        try:
+            byte_range = self.byte_range(environ, stat_result)
+        except Unsatisfiable:
+            headers.append(('Content-Range', f'bytes */{size}'))
+            headers.append(('Content-Length', '0'))
+            start_response(STATUSES[416], headers)
+            return []
+        headers.append(('Content-Type', content_type(name)))
+        if encoding is not None:
+            headers.append(('Content-Encoding', encoding))
+        if byte_range is None:
+            status, start, length = 200, 0, size
+        else:
+            start, end = byte_range
+            status, length = 206, end - start + 1
+            headers.append(('Content-Range', f'bytes {start}-{end}/{size}'))
+        headers.append(('Content-Length', str(length)))
+        return self.body(
+            environ, start_response, STATUSES[status], headers,
+            path, start, length if status == 206 else None,
+        )
+
+    def body(self, environ, start_response, status, headers, path, start,
+             length):
+        """Отдаёт файл целиком или, если задана ``length``, его часть."""
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            start_response(status, headers)
+            return []
+        try:
+            file = open(path, 'rb')
+        except OSError:
+            # Файл удалили между stat и open.
+            return self.application(environ, start_response)
+        start_response(status, headers)
+        if length is not None:
+            return FileRange(file, start, length)
+        file_wrapper = environ.get('wsgi.file_wrapper', FileWrapper)
+        return file_wrapper(file, BLOCK_SIZE)
+
+    def headers(self, stat_result, immutable, varies):
+        if immutable:
+            cache_control = (
+                f'public, max-age={settings.SERVE_IMMUTABLE_MAX_AGE}, '
+                f'immutable'
+            )
+        else:
+            cache_control = f'public, max-age={settings.SERVE_MAX_AGE}'
+        headers = [
+            ('Cache-Control', cache_control),
+            ('ETag', etag(stat_result)),
+            ('Last-Modified', http_date(stat_result.st_mtime)),
+            ('Accept-Ranges', 'bytes'),
+            ('X-Content-Type-Options', 'nosniff'),
+        ]
+        if varies:
+            headers.append(('Vary', 'Accept-Encoding'))
+        return headers
+
+    def not_modified(self, environ, stat_result):
+        if_none_match = environ.get('HTTP_IF_NONE_MATCH')
+        if if_none_match is not None:
+            tags = {tag.strip() for tag in if_none_match.split(',')}
+            current = etag(stat_result)
+            return '*' in tags or current in tags or f'W/{current}' in tags
+        since = parse_http_date_safe(
+            environ.get('HTTP_IF_MODIFIED_SINCE', '')
+        )
+        return since is not None and int(stat_result.st_mtime) <= since
+
+    def byte_range(self, environ, stat_result):
+        header = environ.get('HTTP_RANGE')
+        if header is None:
+            return None
+        if_range = environ.get('HTTP_IF_RANGE')
+        if if_range is not None and if_range.strip() != etag(stat_result):
+            since = parse_http_date_safe(if_range)
+            if since is None or int(stat_result.st_mtime) != since:
+                # Файл изменился с тех пор, как клиент скачал начало.
+                return None
+        return parse_range(header, stat_result.st_size)
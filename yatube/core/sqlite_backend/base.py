@@ -0,0 +1,138 @@
+"""SQLite с настройками для многопоточного сервера.
+
+* при подключении включаются WAL и прочие PRAGMA из ``OPTIONS['pragmas']``;
+* постоянные соединения (``CONN_MAX_AGE``) проверяются ``SELECT 1`` в
+  начале и конце запроса и переоткрываются, если соединение сломано;
+* запись внутри процесса идёт по очереди через общую блокировку базы,
+  а транзакции начинаются с ``BEGIN IMMEDIATE``: транзакция, которая
+  сначала читает, а потом пишет, не получает ``database is locked`` при
+  попытке повысить блокировку.
+"""
+import re
+import threading
+
+from django.db.backends.sqlite3 import base
+from django.db.utils import OperationalError
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 268435456,
+    'temp_store': 'MEMORY',
+}
+OWN_OPTIONS = ('pragmas', 'health_checks', 'write_lock_timeout')
+READ_RE = re.compile(r'\s*(SELECT|PRAGMA|EXPLAIN)\b', re.IGNORECASE)
+
+_write_locks = {}
+_write_locks_guard = threading.Lock()
+
+
+def write_lock(name):
+    """Общая на процесс блокировка записи в файл базы ``name``."""
+    with _write_locks_guard:
+        return _write_locks.setdefault(name, threading.RLock())
+
+
+class SerializedCursorWrapper(base.SQLiteCursorWrapper):
+    """Курсор, который пишет вне транзакции только под блокировкой."""
+
+    def _serialized(self, method, query, *args):
+        if self.connection.in_transaction or READ_RE.match(query):
+            return method(query, *args)
+        if not self.write_lock.acquire(timeout=self.lock_timeout):
+            raise OperationalError('database is locked (write queue)')
+        try:
+            return method(query, *args)
+        finally:
+            self.write_lock.release()
+
+    def execute(self, query, params=None):
+        return self._serialized(super().execute, query, params)
+
+    def executemany(self, query, param_list):
+        return self._serialized(super().executemany, query, param_list)
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        options = self.settings_dict['OPTIONS']
+        self.pragmas = {**DEFAULT_PRAGMAS, **options.get('pragmas', {})}
+        self.health_checks = options.get('health_checks', True)
+        self.write_lock_timeout = options.get(
+            'write_lock_timeout', self.pragmas['busy_timeout'] / 1000
+        )
+        self.write_lock = write_lock(self.settings_dict['NAME'])
+        self.holds_write_lock = False
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        for option in OWN_OPTIONS:
+            params.pop(option, None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.pragmas.items():
+            # None отключает PRAGMA по умолчанию, например journal_mode
+            # для реплики, открытой только на чтение.
+            if value is not None:
+                conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def create_cursor(self, name=None):
+        cursor = self.connection.cursor(factory=SerializedCursorWrapper)
+        cursor.write_lock = self.write_lock
+        cursor.lock_timeout = self.write_lock_timeout
+        return cursor
+
+    def is_usable(self):
+        try:
+            self.connection.execute('SELECT 1')
+        except base.Database.Error:
+            return False
+        return True
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        if (
+            self.health_checks
+            and self.connection is not None
+            and not self.is_usable()
+        ):
+            self.close()
+
+    def _start_transaction_under_autocommit(self):
+        if not self.write_lock.acquire(timeout=self.write_lock_timeout):
+            raise OperationalError('database is locked (write queue)')
+        self.holds_write_lock = True
+        try:
+            self.cursor().execute('BEGIN IMMEDIATE')
+        except Exception:
+            self._release_write_lock()
+            raise
+
+    def _release_write_lock(self):
+        if self.holds_write_lock:
+            self.holds_write_lock = False
+            self.write_lock.release()
+
+    def _commit(self):
+        try:
+            return super()._commit()
+        finally:
+            self._release_write_lock()
+
+    def _rollback(self):
+        try:
+            return super()._rollback()
+        finally:
+            self._release_write_lock()
+
+    def _close(self):
+        try:
+            return super()._close()
+        finally:
+            self._release_write_lock()
@@ -0,0 +1,396 @@
+"""Кэш в файле SQLite, общий для всех процессов на хосте.
+
+Перед файлом стоит маленький кэш в памяти процесса (L1) с коротким
+временем жизни: горячие ключи читаются без обращения к SQLite, а
+устаревание между процессами ограничено ``L1_TIMEOUT`` секундами.
+Размер файла ограничен числом записей и суммарным объёмом значений;
+при превышении вытесняются давно не читавшиеся записи (LRU).
+
+Настройки::
+
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.sqlite_cache.SQLiteCache',
+            'LOCATION': '/var/tmp/yatube-cache.sqlite3',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+                'MAX_SIZE': 256 * 1024 * 1024,
+                'L1_MAX_ENTRIES': 1000,
+                'L1_TIMEOUT': 2,
+            },
+        },
+    }
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from . import metrics
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache ('
+    ' key TEXT PRIMARY KEY,'
+    ' value BLOB NOT NULL,'
+    ' expires REAL,'
+    ' accessed REAL NOT NULL,'
+    ' size INTEGER NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stats ('
+    ' name TEXT PRIMARY KEY,'
+    ' value INTEGER NOT NULL)',
+)
+STATS = ('l1_hits', 'hits', 'misses', 'sets', 'evictions')
+# Счётчики, которые попадают ещё и в метрики текущего запроса.
+REQUEST_METRICS = {
+    'l1_hits': 'cache_hits',
+    'hits': 'cache_hits',
+    'misses': 'cache_misses',
+}
+# Время последнего чтения обновляется не чаще раза в столько секунд,
+# чтобы чтения не превращались в запись на каждый запрос.
+ACCESS_GRANULARITY = 1.0
+STATS_FLUSH_EVERY = 100
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = location
+        self._max_size = options.get('MAX_SIZE', 256 * 1024 * 1024)
+        self._cull_every = options.get('CULL_EVERY', 64)
+        self._l1_max_entries = options.get('L1_MAX_ENTRIES', 1000)
+        self._l1_timeout = options.get('L1_TIMEOUT', 2)
+        self._l1 = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = dict.fromkeys(STATS, 0)
+        self._unflushed = dict.fromkeys(STATS, 0)
+        self._stats_lock = threading.Lock()
+        self._writes = 0
+
+    # Соединение
+
+    def _connection(self):
+        pid = os.getpid()
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == pid:
+            return conn
+        directory = os.path.dirname(self._path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(
+            self._path, timeout=30, isolation_level=None,
+            check_same_thread=False,
+        )
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            conn.execute(statement)
+        self._local.conn = conn
+        self._local.pid = pid
+        return conn
+
+    def _transaction(self):
+        return _Immediate(self._connection())
+
+    # Статистика
+
+    def _count(self, name, value=1, flush=True):
+        if name in REQUEST_METRICS:
+            metrics.count(REQUEST_METRICS[name], value)
+        with self._stats_lock:
+            self._stats[name] += value
+            self._unflushed[name] += value
+            pending = sum(self._unflushed.values())
+        if flush and pending >= STATS_FLUSH_EVERY:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._stats_lock:
+            pending = {k: v for k, v in self._unflushed.items() if v}
+            self._unflushed = dict.fromkeys(STATS, 0)
+        if not pending:
+            return
+        with self._transaction() as conn:
+            for name, value in pending.items():
+                conn.execute(
+                    'INSERT OR IGNORE INTO cache_stats VALUES (?, 0)', (name,)
+                )
+                conn.execute(
+                    'UPDATE cache_stats SET value = value + ? '
+                    'WHERE name = ?', (value, name)
+                )
+
+    def stats(self):
+        """Счётчики обращений: этого процесса и суммарные по хосту."""
+        self._flush_stats()
+        rows = self._connection().execute(
+            'SELECT name, value FROM cache_stats'
+        )
+        shared = dict.fromkeys(STATS, 0)
+        shared.update(rows)
+        entries, size = self._connection().execute(
+            'SELECT COUNT(*), TOTAL(size) FROM cache'
+        ).fetchone()
+        return {
+            'process': dict(self._stats),
+            'shared': shared,
+            'entries': entries,
+            'size': int(size),
+        }
+
+    # L1: хранит сериализованные значения, как и LocMemCache, чтобы
+    # изменение полученного объекта не портило закэшированную копию.
+
+    def _l1_get(self, key):
+        with self._l1_lock:
+            item = self._l1.get(key)
+            if item is None:
+                return None
+            expires, blob = item
+            if expires <= time.time():
+                del self._l1[key]
+                return None
+            self._l1.move_to_end(key)
+            return blob
+
+    def _l1_set(self, key, blob, expires):
+        l1_expires = time.time() + self._l1_timeout
+        if expires is not None:
+            l1_expires = min(l1_expires, expires)
+        with self._l1_lock:
+            self._l1[key] = (l1_expires, blob)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self._l1_max_entries:
+                self._l1.popitem(last=False)
+
+    def _l1_delete(self, *keys):
+        with self._l1_lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    # Служебное
+
+    def _expiry(self, timeout):
+        # BaseCache уже переводит таймаут в момент истечения.
+        return self.get_backend_timeout(timeout)
+
+    def _encode(self, value):
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    def _maybe_cull(self, conn):
+        self._writes += 1
+        if self._writes % self._cull_every:
+            return
+        now = time.time()
+        conn.execute('DELETE FROM cache WHERE expires <= ?', (now,))
+        entries, size = conn.execute(
+            'SELECT COUNT(*), TOTAL(size) FROM cache'
+        ).fetchone()
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        excess = max(entries - self._max_entries, 0)
+        if size > self._max_size:
+            excess = max(excess, int(entries * (1 - self._max_size / size)))
+        excess += entries // self._cull_frequency
+        conn.execute(
+            'DELETE FROM cache WHERE key IN ('
+            ' SELECT key FROM cache ORDER BY accessed LIMIT ?)', (excess,)
+        )
+        self._count('evictions', excess, flush=False)
+
+    # API кэша
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        blob = self._l1_get(key)
+        if blob is not None:
+            self._count('l1_hits')
+            return pickle.loads(blob)
+        now = time.time()
+        row = self._connection().execute(
+            'SELECT value, expires, accessed FROM cache WHERE key = ?',
+            (key,)
+        ).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count('misses')
+            return default
+        blob, expires, accessed = row
+        if now - accessed > ACCESS_GRANULARITY:
+            self._connection().execute(
+                'UPDATE cache SET accessed = ? WHERE key = ?', (now, key)
+            )
+        self._l1_set(key, blob, expires)
+        self._count('hits')
+        return pickle.loads(blob)
+
+    def get_many(self, keys, version=None):
+        found = {}
+        missing = {}
+        for key in keys:
+            full_key = self.make_key(key, version=version)
+            self.validate_key(full_key)
+            blob = self._l1_get(full_key)
+            if blob is not None:
+                self._count('l1_hits')
+                found[key] = pickle.loads(blob)
+            else:
+                missing[full_key] = key
+        if not missing:
+            return found
+        now = time.time()
+        placeholders = ', '.join('?' * len(missing))
+        rows = self._connection().execute(
+            'SELECT key, value, expires FROM cache '
+            f'WHERE key IN ({placeholders}) '
+            'AND (expires IS NULL OR expires > ?)',
+            (*missing, now)
+        ).fetchall()
+        for full_key, blob, expires in rows:
+            self._l1_set(full_key, blob, expires)
+            found[missing[full_key]] = pickle.loads(blob)
+        self._count('hits', len(rows))
+        self._count('misses', len(missing) - len(rows))
+        return found
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self._expiry(timeout)
+        blob = self._encode(value)
+        with self._transaction() as conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)',
+                (key, blob, expires, time.time(), len(blob))
+            )
+            self._maybe_cull(conn)
+        self._l1_set(key, blob, expires)
+        self._count('sets')
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires = self._expiry(timeout)
+        now = time.time()
+        rows = []
+        for key, value in data.items():
+            full_key = self.make_key(key, version=version)
+            self.validate_key(full_key)
+            blob = self._encode(value)
+            rows.append((full_key, blob, expires, now, len(blob)))
+        with self._transaction() as conn:
+            conn.executemany(
+                'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?)', rows
+            )
+            self._maybe_cull(conn)
+        for full_key, blob, *_ in rows:
+            self._l1_set(full_key, blob, expires)
+        self._count('sets', len(rows))
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        expires = self._expiry(timeout)
+        blob = self._encode(value)
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            added = conn.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?, ?)',
+                (key, blob, expires, now, len(blob))
+            ).rowcount == 1
+            if added:
+                self._maybe_cull(conn)
+        if added:
+            self._l1_set(key, blob, expires)
+            self._count('sets')
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._l1_delete(key)
+        with self._transaction() as conn:
+            return conn.execute(
+                'UPDATE cache SET expires = ? WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (self._expiry(timeout), key, time.time())
+            ).rowcount == 1
+
+    def incr(self, key, delta=1, version=None):
+        full_key = self.make_key(key, version=version)
+        self.validate_key(full_key)
+        with self._transaction() as conn:
+            row = conn.execute(
+                'SELECT value FROM cache WHERE key = ? '
+                'AND (expires IS NULL OR expires > ?)',
+                (full_key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError("Key '%s' not found" % key)
+            value = pickle.loads(row[0]) + delta
+            blob = self._encode(value)
+            conn.execute(
+                'UPDATE cache SET value = ?, size = ? WHERE key = ?',
+                (blob, len(blob), full_key)
+            )
+        self._l1_delete(full_key)
+        return value
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        if self._l1_get(key) is not None:
+            return True
+        return self._connection().execute(
+            'SELECT 1 FROM cache WHERE key = ? '
+            'AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def delete(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._l1_delete(key)
+        self._connection().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        full_keys = [self.make_key(key, version=version) for key in keys]
+        self._l1_delete(*full_keys)
+        with self._transaction() as conn:
+            conn.executemany(
+                'DELETE FROM cache WHERE key = ?',
+                [(key,) for key in full_keys]
+            )
+
+    def clear(self):
+        with self._l1_lock:
+            self._l1.clear()
+        self._connection().execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединение живёт всё время работы потока: переоткрывать файл
+        # на каждый запрос дороже, чем держать его открытым.
+        pass
+
+
+class _Immediate:
+    """Транзакция ``BEGIN IMMEDIATE``: блокировка записи берётся сразу."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute('BEGIN IMMEDIATE')
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
@@ -0,0 +1,85 @@
+"""Хранилище статики с хэшами в именах и сжатыми копиями.
+
+``collectstatic`` пишет файлы под именами с хэшем содержимого
+(``css/site.3f2a9c01b7de.css``) и манифест соответствий, а рядом с
+текстовыми файлами кладёт сжатые копии ``.gz`` и, если установлен пакет
+``brotli``, ``.br``. Сжимаются они один раз при сборке; ``core.serving``
+выбирает копию по ``Accept-Encoding``.
+"""
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Расширения, которые имеет смысл сжимать: картинки и шрифты WOFF уже
+# сжаты.
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.json', '.svg', '.xml', '.txt', '.html',
+    '.ico', '.ttf', '.otf', '.eot', '.webmanifest',
+)
+# Копии мельче этого или почти без выигрыша не пишутся.
+MIN_SIZE = 256
+MIN_RATIO = 0.95
+
+
+def _brotli(data):
+    return brotli.compress(data, quality=11)
+
+
+def _gzip(data):
+    # mtime=0: одинаковые файлы дают одинаковые копии при каждой сборке.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+# Кодировка Content-Encoding, суффикс копии и функция сжатия — в порядке
+# предпочтения при равном q.
+# Без пакета brotli копии .br не пишутся.
+ENCODINGS = (
+    ('br', '.br', _brotli if brotli is not None else None),
+    ('gzip', '.gz', _gzip),
+)
+
+
+def compressible(name):
+    return os.path.splitext(name)[1].lower() in COMPRESSIBLE
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def stored_name(self, name):
+        # Без манифеста (collectstatic не запускался: разработка, тесты)
+        # ссылки ведут на исходные имена, а не падают с ValueError.
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(filter(compressible, names)):
+            yield from self.compress(name)
+
+    def compress(self, name):
+        """Пишет сжатые копии файла; отдаёт их как обработанные."""
+        with self.open(name) as original:
+            data = original.read()
+        if len(data) < MIN_SIZE:
+            return
+        for _, suffix, compress in ENCODINGS:
+            if compress is None:
+                continue
+            compressed = compress(data)
+            if len(compressed) > len(data) * MIN_RATIO:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
+            yield name, target, True
@@ -0,0 +1,76 @@
+"""Хранилище файлов с адресацией по содержимому.
+
+Файл сохраняется под SHA-256 своего содержимого в каталогах по первым
+байтам хэша: ``posts/ab/cd/abcd….jpg``. Одинаковые загрузки получают
+одно имя и пишутся на диск один раз, а миниатюры, которые sorl и
+``posts.renditions`` выводят из имени, общие для всех ссылок на файл.
+
+Перед записью или повторным использованием файла хранилище шлёт сигнал
+``file_reserved``: получатель берёт ссылку на имя сразу, а не после
+сохранения модели, и файл, на который как раз ссылается новая
+загрузка, никто не удалит.
+"""
+import hashlib
+import os
+import re
+import uuid
+
+from django.core.files.storage import FileSystemStorage
+from django.dispatch import Signal
+
+HASHED_NAME_RE = re.compile(
+    r'(^|/)([0-9a-f]{2})/([0-9a-f]{2})/\2\3[0-9a-f]{60}(\.[0-9a-z]+)?$'
+)
+
+file_reserved = Signal(providing_args=['name'])
+
+
+def digest(content):
+    """SHA-256 файла, прочитанного кусками."""
+    sha = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    for chunk in content.chunks():
+        sha.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return sha.hexdigest()
+
+
+def hashed_name(name, content_digest):
+    """Имя файла по хэшу в том же каталоге, что и ``name``."""
+    directory = os.path.dirname(name)
+    extension = os.path.splitext(name)[1].lower()
+    return os.path.join(
+        directory, content_digest[:2], content_digest[2:4],
+        content_digest + extension
+    )
+
+
+def is_hashed(name):
+    return bool(HASHED_NAME_RE.search(name))
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """``FileSystemStorage``, который не пишет уже сохранённое содержимое."""
+
+    def _save(self, name, content):
+        name = hashed_name(name, digest(content))
+        file_reserved.send(sender=self.__class__, name=name)
+        if self._touch(name):
+            return name
+        # Пишем под временным именем и переносим на место: одновременная
+        # загрузка того же содержимого заменит файл таким же, а не получит
+        # имя с суффиксом.
+        temporary = super()._save(f'{name}.{uuid.uuid4().hex}.tmp', content)
+        os.replace(self.path(temporary), self.path(name))
+        return name
+
+    def _touch(self, name):
+        """Обновляет mtime существующего файла: повторно использованный
+        файл выглядит свежим для обслуживания, которое удаляет старые."""
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
@@ -0,0 +1,56 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+
+from core.cache import get_or_compute
+
+register = template.Library()
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, expire_time, fragment_name, vary_on):
+        self.nodelist = nodelist
+        self.expire_time = expire_time
+        self.fragment_name = fragment_name
+        self.vary_on = vary_on
+
+    def render(self, context):
+        try:
+            expire_time = int(self.expire_time.resolve(context))
+        except (template.VariableDoesNotExist, ValueError, TypeError):
+            raise template.TemplateSyntaxError(
+                '"fragment_cache" tag got a bad timeout: %r'
+                % self.expire_time.token
+            )
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        key = make_template_fragment_key(self.fragment_name, vary_on)
+        return get_or_compute(
+            key, lambda: self.nodelist.render(context), expire_time
+        )
+
+
+@register.tag
+def fragment_cache(parser, token):
+    """Кэширует фрагмент шаблона с защитой от лавинного пересчёта.
+
+    Синтаксис совпадает с ``{% cache %}``::
+
+        {% fragment_cache 3600 index_page page_obj.number cache_version %}
+            ...
+        {% endfragment_cache %}
+
+    Истёкший фрагмент пересчитывает один процесс, остальные тем временем
+    отдают устаревшую копию.
+    """
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            '%r tag requires at least 2 arguments.' % tokens[0]
+        )
+    return FragmentCacheNode(
+        nodelist,
+        parser.compile_filter(tokens[1]),
+        tokens[2],
+        [parser.compile_filter(t) for t in tokens[3:]],
+    )
@@ -0,0 +1,89 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.template import Context, Template
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import bump, get_or_compute, version_key
+
+
+class VersionTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_bump_changes_version(self):
+        """Сдвиг версии меняет ключ только своей области"""
+        before = version_key('a', 'b')
+        bump('a')
+        after = version_key('a', 'b')
+        self.assertNotEqual(before, after)
+        self.assertEqual(before.split('.')[1], after.split('.')[1])
+
+
+@override_settings(CACHE_LOCK_WAIT=2.0)
+class GetOrComputeTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_single_flight_on_miss(self):
+        """При промахе значение считает только один поток"""
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.2)
+            return 'value'
+
+        results = []
+        threads = [
+            threading.Thread(
+                target=lambda: results.append(
+                    get_or_compute('key', compute, 60)
+                )
+            )
+            for _ in range(5)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, ['value'] * 5)
+        self.assertEqual(len(calls), 1)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока идёт пересчёт, отдаётся устаревшее значение"""
+        get_or_compute('key', lambda: 'old', 60)
+        cache.set('key', ('old', time.time() - 1, 0.0), 60)
+        cache.add('key:lock', 1, 10)
+        value = get_or_compute('key', lambda: 'new', 60)
+        self.assertEqual(value, 'old')
+        cache.delete('key:lock')
+        self.assertEqual(get_or_compute('key', lambda: 'new', 60), 'new')
+
+    def test_early_expiration(self):
+        """Дорогое значение обновляется заранее, до истечения"""
+        cache.set('key', ('old', time.time() + 5, 3600.0), 60)
+        self.assertEqual(
+            get_or_compute('key', lambda: 'new', 60, beta=1000), 'new'
+        )
+
+
+class FragmentCacheTagTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_fragment_cached_by_vary_on(self):
+        """Тег fragment_cache кэширует фрагмент по переменным ключа"""
+        template = Template(
+            '{% load fragment_cache %}'
+            '{% fragment_cache 60 test version %}{{ text }}'
+            '{% endfragment_cache %}'
+        )
+        for text, version, expected in (
+            ('a', 1, 'a'),
+            ('b', 1, 'a'),
+            ('b', 2, 'b'),
+        ):
+            context = Context({'text': text, 'version': version})
+            self.assertEqual(template.render(context), expected)
@@ -0,0 +1,121 @@
+import json
+import os
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Post
+
+from .. import metrics, routers
+
+User = get_user_model()
+
+
+class HistogramTest(SimpleTestCase):
+    def test_cumulative_buckets(self):
+        """Корзины гистограммы накапливаются, как требует Prometheus"""
+        histogram = metrics.Histogram((1, 5))
+        for value in (0.5, 1, 3, 10):
+            histogram.observe(value)
+        self.assertEqual(
+            list(histogram.cumulative()), [(1, 2), (5, 3), ('+Inf', 4)]
+        )
+        self.assertEqual(histogram.sum, 14.5)
+
+    def test_nested_timer(self):
+        """Вложенный замер того же имени не считается дважды"""
+        token = metrics.begin()
+        with metrics.timer('db'):
+            with metrics.timer('db'):
+                pass
+            outer = metrics._current.get().timings['db']
+        result = metrics.end(token)
+        self.assertEqual(outer, 0)
+        self.assertGreater(result.timings['db'], 0)
+
+
+class PerformanceMiddlewareTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.staff = User.objects.create_user(username='staff', is_staff=True)
+        Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        metrics.reset()
+
+    def test_server_timing(self):
+        """Стоимость запроса отдаётся персоналу в заголовке Server-Timing"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for name in ('total;dur=', 'db;desc=', 'tpl;dur=', 'cache;desc='):
+            self.assertIn(name, timing)
+        self.assertNotIn('db;desc="0 queries"', timing)
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_for_everyone(self):
+        """SERVER_TIMING=True отдаёт заголовок всем"""
+        response = self.client.get(reverse('posts:index'))
+        self.assertTrue(response.has_header('Server-Timing'))
+
+    def test_metrics_of_other_workers_are_summed(self):
+        """Страница метрик складывает файлы всех процессов"""
+        self.client.get(reverse('posts:index'))
+        other = {
+            'histograms': [[
+                'request_duration_seconds', 'posts:index',
+                [0] * len(metrics.SECONDS) + [2], 30.0, 2,
+            ]],
+            'counters': [['cache_misses_total', 'posts:index', 5]],
+            'routing': [['default', 'write', 3]],
+        }
+        path = os.path.join(settings.METRICS_DIR, 'other.json')
+        with open(path, 'w') as file:
+            json.dump(other, file)
+        misses = metrics._counters['cache_misses_total', 'posts:index'] + 5
+        writes = routers.stats().get(('default', 'write'), 0) + 3
+        text = metrics.render()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 3',
+            text,
+        )
+        self.assertIn(
+            'yatube_request_duration_seconds_bucket'
+            '{view="posts:index",le="+Inf"} 3',
+            text,
+        )
+        self.assertIn(
+            f'yatube_cache_misses_total{{view="posts:index"}} {misses}', text
+        )
+        self.assertIn(
+            'yatube_db_routing_total{alias="default",reason="write"} '
+            f'{writes}',
+            text,
+        )
+
+    def test_metrics_page(self):
+        """Гистограммы по имени URL видны только персоналу"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:profile', args=['author']))
+        url = reverse('metrics')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        text = response.content.decode()
+        self.assertIn(
+            'yatube_request_duration_seconds_count{view="posts:index"} 1',
+            text,
+        )
+        self.assertIn(
+            'yatube_db_queries_bucket{view="posts:profile",le="+Inf"} 1',
+            text,
+        )
+        self.assertIn('yatube_cache_hits_total{view="posts:index"}', text)
+        self.assertIn('yatube_template_duration_seconds_sum', text)
@@ -0,0 +1,72 @@
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from posts.models import Post
+from tasks.models import Task
+
+from .. import routers
+from ..middleware import PIN_COOKIE, PrimaryPinMiddleware
+
+REPLICAS = ['replica_1', 'replica_2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.ReplicaRouter()
+        routers.reset_stats()
+
+    def test_reads_go_to_replicas(self):
+        """Чтение постов уходит на реплики, запись — в default"""
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Task), 'default')
+        stats = routers.stats()
+        self.assertEqual(sum(
+            count for (alias, reason), count in stats.items()
+            if reason == 'replica'
+        ), 1)
+        self.assertEqual(stats['default', 'write'], 1)
+        self.assertEqual(stats['default', 'app'], 1)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """Без реплик всё читается из default"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_after_write_stick_to_primary(self):
+        """После записи чтение в том же запросе идёт в default"""
+        token = routers.begin_request(pinned=False)
+        self.assertIn(self.router.db_for_read(Post), REPLICAS)
+        self.router.db_for_write(Post)
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertTrue(routers.end_request(token))
+
+    def test_replicas_are_not_migrated(self):
+        """Миграции к репликам не применяются"""
+        self.assertIs(self.router.allow_migrate('replica_1', 'posts'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def test_middleware_pins_writer(self):
+        """Писавший пользователь получает cookie и читает из default"""
+        factory = RequestFactory()
+        reads = []
+
+        def write(request):
+            self.router.db_for_write(Post)
+            return HttpResponse()
+
+        def read(request):
+            reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = PrimaryPinMiddleware(write)(factory.get('/'))
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = PrimaryPinMiddleware(read)(factory.get('/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        request = factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        PrimaryPinMiddleware(read)(request)
+        PrimaryPinMiddleware(read)(factory.post('/'))
+        self.assertIn(reads[0], REPLICAS)
+        self.assertEqual(reads[1:], ['default', 'default'])
@@ -0,0 +1,174 @@
+import gzip
+import hashlib
+import os
+import shutil
+import tempfile
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from ..serving import FileServer, accepted_encodings, parse_range
+
+CSS = b'body { color: black; }\n' * 100
+PICTURE = bytes(range(256)) * 4
+
+
+def django_app(environ, start_response):
+    start_response('404 Not Found', [('Content-Type', 'text/plain')])
+    return [b'django']
+
+
+class FileServerTest(SimpleTestCase):
+    def setUp(self):
+        self.static = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.media = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        for path in (self.static, self.media):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        self.write(self.static, 'css/site.css', CSS)
+        self.write(self.static, 'css/site.css.gz', gzip.compress(CSS))
+        digest = hashlib.sha256(PICTURE).hexdigest()
+        self.picture = f'posts/{digest[:2]}/{digest[2:4]}/{digest}.png'
+        self.write(self.media, self.picture, PICTURE)
+        self.write(self.media, 'posts/old.png', PICTURE)
+        overrides = override_settings(
+            STATIC_ROOT=self.static, MEDIA_ROOT=self.media
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.server = FileServer(django_app)
+
+    def write(self, root, name, content):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as file:
+            file.write(content)
+
+    def get(self, path, method='GET', **headers):
+        environ = {'PATH_INFO': path, 'REQUEST_METHOD': method}
+        environ.update(
+            ('HTTP_' + key.upper(), value) for key, value in headers.items()
+        )
+        setup_testing_defaults(environ)
+        response = {}
+
+        def start_response(status, response_headers):
+            response['status'] = int(status.split()[0])
+            response['headers'] = dict(response_headers)
+
+        body = self.server(environ, start_response)
+        try:
+            response['body'] = b''.join(body)
+        finally:
+            if hasattr(body, 'close'):
+                body.close()
+        return response
+
+    def test_serves_media_file(self):
+        """Картинка поста отдаётся целиком, с хэшем — как immutable"""
+        response = self.get('/media/' + self.picture)
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], PICTURE)
+        headers = response['headers']
+        self.assertEqual(headers['Content-Type'], 'image/png')
+        self.assertEqual(headers['Content-Length'], str(len(PICTURE)))
+        self.assertIn('immutable', headers['Cache-Control'])
+        self.assertNotIn('Vary', headers)
+        old = self.get('/media/posts/old.png')['headers']
+        self.assertEqual(
+            old['Cache-Control'], f'public, max-age={settings.SERVE_MAX_AGE}'
+        )
+
+    def test_head_has_no_body(self):
+        """HEAD получает заголовки без тела"""
+        response = self.get('/media/' + self.picture, method='HEAD')
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], b'')
+        self.assertEqual(
+            response['headers']['Content-Length'], str(len(PICTURE))
+        )
+
+    def test_range(self):
+        """Один диапазон даёт 206, недостижимый — 416"""
+        response = self.get('/media/' + self.picture, range='bytes=10-19')
+        self.assertEqual(response['status'], 206)
+        self.assertEqual(response['body'], PICTURE[10:20])
+        self.assertEqual(
+            response['headers']['Content-Range'],
+            f'bytes 10-19/{len(PICTURE)}'
+        )
+        tail = self.get('/media/' + self.picture, range='bytes=-5')
+        self.assertEqual(tail['body'], PICTURE[-5:])
+        missing = self.get('/media/' + self.picture, range='bytes=5000-')
+        self.assertEqual(missing['status'], 416)
+        self.assertEqual(
+            missing['headers']['Content-Range'], f'bytes */{len(PICTURE)}'
+        )
+        several = self.get('/media/' + self.picture, range='bytes=0-1,5-6')
+        self.assertEqual(several['status'], 200)
+
+    def test_if_range_with_old_etag_sends_whole_file(self):
+        """Range с устаревшим If-Range отдаёт файл целиком"""
+        response = self.get(
+            '/media/' + self.picture, range='bytes=0-9', if_range='"old"'
+        )
+        self.assertEqual(response['status'], 200)
+        self.assertEqual(response['body'], PICTURE)
+
+    def test_conditional(self):
+        """Совпавший ETag даёт 304 без тела"""
+        first = self.get('/media/' + self.picture)
+        response = self.get(
+            '/media/' + self.picture, if_none_match=first['headers']['ETag']
+        )
+        self.assertEqual(response['status'], 304)
+        self.assertEqual(response['body'], b'')
+        since = self.get(
+            '/media/' + self.picture,
+            if_modified_since=first['headers']['Last-Modified'],
+        )
+        self.assertEqual(since['status'], 304)
+
+    def test_encoding_negotiation(self):
+        """Сжатая копия выбирается по Accept-Encoding"""
+        packed = self.get('/static/css/site.css', accept_encoding='br, gzip')
+        self.assertEqual(packed['headers']['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(packed['body']), CSS)
+        self.assertEqual(packed['headers']['Vary'], 'Accept-Encoding')
+        self.assertEqual(
+            packed['headers']['Content-Type'], 'text/css; charset=utf-8'
+        )
+        plain = self.get('/static/css/site.css', accept_encoding='gzip;q=0')
+        self.assertNotIn('Content-Encoding', plain['headers'])
+        self.assertEqual(plain['body'], CSS)
+        ranged = self.get(
+            '/static/css/site.css', accept_encoding='gzip', range='bytes=0-3'
+        )
+        self.assertNotIn('Content-Encoding', ranged['headers'])
+        self.assertEqual(ranged['body'], CSS[:4])
+
+    def test_passes_other_requests_to_django(self):
+        """Остальное и опасные пути уходят в Django"""
+        for path in (
+            '/media/posts/missing.png', '/media/posts/../../settings.py',
+            '/media/posts/', '/media/.hidden', '/posts/', '/media/posts',
+        ):
+            with self.subTest(path=path):
+                self.assertEqual(self.get(path)['body'], b'django')
+        post = self.get('/media/' + self.picture, method='POST')
+        self.assertEqual(post['body'], b'django')
+
+
+class HeaderParsingTest(SimpleTestCase):
+    def test_parse_range(self):
+        self.assertEqual(parse_range('bytes=0-99', 50), (0, 49))
+        self.assertEqual(parse_range('bytes=-10', 5), (0, 4))
+        self.assertEqual(parse_range('bytes=5-', 10), (5, 9))
+        self.assertIsNone(parse_range('items=0-1', 10))
+        self.assertIsNone(parse_range('bytes=9-1', 10))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip;q=0.5, BR, identity;q=x'),
+            {'gzip': 0.5, 'br': 1.0, 'identity': 0.0},
+        )
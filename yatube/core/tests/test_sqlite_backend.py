@@ -0,0 +1,69 @@
+import shutil
+import tempfile
+import threading
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase
+
+
+class SQLiteBackendTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.handler = ConnectionHandler({
+            DEFAULT_DB_ALIAS: {
+                'ENGINE': 'core.sqlite_backend',
+                'NAME': f'{self.directory}/db.sqlite3',
+            },
+        })
+        self.connection = self.handler[DEFAULT_DB_ALIAS]
+        with self.connection.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER PRIMARY KEY)')
+
+    def tearDown(self):
+        self.handler.close_all()
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def pragma(self, name):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """При подключении включаются WAL и остальные PRAGMA"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+
+    def test_writes_wait_for_transaction(self):
+        """Запись из другого потока ждёт конца транзакции, а не падает"""
+        done = threading.Event()
+
+        def write():
+            connection = self.handler[DEFAULT_DB_ALIAS]
+            with connection.cursor() as cursor:
+                cursor.execute('INSERT INTO item (id) VALUES (2)')
+            connection.close()
+            done.set()
+
+        self.connection.set_autocommit(False)
+        with self.connection.cursor() as cursor:
+            cursor.execute('INSERT INTO item (id) VALUES (1)')
+        thread = threading.Thread(target=write)
+        thread.start()
+        self.assertFalse(done.wait(0.2))
+        self.connection.commit()
+        self.connection.set_autocommit(True)
+        thread.join()
+        self.assertTrue(done.is_set())
+        self.assertFalse(self.connection.holds_write_lock)
+        with self.connection.cursor() as cursor:
+            cursor.execute('SELECT COUNT(*) FROM item')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_broken_connection_is_replaced(self):
+        """Сломанное постоянное соединение закрывается проверкой"""
+        self.connection.connection.close()
+        self.connection.close_if_unusable_or_obsolete()
+        self.assertIsNone(self.connection.connection)
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
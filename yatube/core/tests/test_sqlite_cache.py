@@ -0,0 +1,87 @@
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from core.sqlite_cache import SQLiteCache
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = f'{self.directory}/cache.sqlite3'
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        options.setdefault('L1_TIMEOUT', 0.2)
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_values_are_shared_between_instances(self):
+        """Значение, записанное одним процессом, видно другому"""
+        other = self.make_cache()
+        self.cache.set('key', {'a': 1})
+        self.assertEqual(other.get('key'), {'a': 1})
+        self.cache.delete('key')
+        time.sleep(0.3)
+        self.assertIsNone(other.get('key'))
+
+    def test_expiration_and_add(self):
+        """add не перезаписывает живой ключ, но занимает истёкший"""
+        self.assertTrue(self.cache.add('lock', 1, 0.1))
+        self.assertFalse(self.cache.add('lock', 2, 10))
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('lock'))
+        self.assertTrue(self.cache.add('lock', 3, 10))
+        self.assertEqual(self.cache.get('lock'), 3)
+
+    def test_incr_and_many(self):
+        """incr, get_many и set_many работают через общий файл"""
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(self.cache.incr('a', 5), 6)
+        self.assertEqual(
+            self.make_cache().get_many(['a', 'b', 'c']), {'a': 6, 'b': 2}
+        )
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читавшиеся ключи"""
+        cache = self.make_cache(MAX_ENTRIES=10, CULL_EVERY=1, L1_TIMEOUT=0)
+        cache.set('hot', 'value')
+        for i in range(30):
+            time.sleep(0.01)
+            cache.set(f'key-{i}', i)
+            if i % 5 == 0:
+                cache._connection().execute(
+                    'UPDATE cache SET accessed = ? WHERE key = ?',
+                    (time.time(), cache.make_key('hot'))
+                )
+        self.assertLessEqual(cache.stats()['entries'], 10)
+        self.assertEqual(cache.get('hot'), 'value')
+        self.assertIsNone(cache.get('key-0'))
+
+    def test_size_limit(self):
+        """Суммарный объём значений не превышает MAX_SIZE"""
+        cache = self.make_cache(MAX_SIZE=10000, CULL_EVERY=1)
+        for i in range(50):
+            cache.set(f'key-{i}', 'x' * 1000)
+        self.assertLessEqual(cache.stats()['size'], 10000)
+
+    def test_stats(self):
+        """Попадания в L1, в файл и промахи учитываются"""
+        cache = self.make_cache(L1_TIMEOUT=10)
+        other = self.make_cache()
+        cache.set('key', 1)
+        cache.get('key')
+        other.get('key')
+        cache.get('missing')
+        other.stats()
+        stats = cache.stats()
+        self.assertEqual(stats['process']['l1_hits'], 1)
+        self.assertEqual(stats['process']['misses'], 1)
+        self.assertEqual(stats['shared']['hits'], 1)
+        self.assertEqual(stats['shared']['misses'], 1)
@@ -0,0 +1,50 @@
+import gzip
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+CSS = 'body { background: url("../img/dot.png"); }\n' * 50
+
+
+class CompressedManifestStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.root = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        for path in (self.source, self.root):
+            self.addCleanup(shutil.rmtree, path, ignore_errors=True)
+        os.makedirs(os.path.join(self.source, 'css'))
+        os.makedirs(os.path.join(self.source, 'img'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as css:
+            css.write(CSS)
+        with open(os.path.join(self.source, 'img', 'dot.png'), 'wb') as png:
+            png.write(b'\x89PNG' + bytes(1000))
+        overrides = override_settings(
+            STATICFILES_DIRS=[self.source], STATIC_ROOT=self.root
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_collectstatic_writes_hashed_and_compressed(self):
+        """collectstatic пишет имена с хэшем и сжатые копии текста"""
+        call_command('collectstatic', interactive=False, stdout=StringIO())
+        hashed = staticfiles_storage.stored_name('css/site.css')
+        self.assertRegex(hashed, r'^css/site\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root, hashed)
+        with open(path, 'rb') as original, gzip.open(path + '.gz') as packed:
+            self.assertEqual(packed.read(), original.read())
+        image = staticfiles_storage.stored_name('img/dot.png')
+        self.assertFalse(
+            os.path.exists(os.path.join(self.root, image + '.gz'))
+        )
+
+    def test_without_manifest_names_are_kept(self):
+        """Без collectstatic ссылки ведут на исходные имена"""
+        self.assertEqual(
+            staticfiles_storage.url('css/site.css'), '/static/css/site.css'
+        )
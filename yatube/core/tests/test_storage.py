@@ -0,0 +1,77 @@
+import hashlib
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase
+
+from ..storage import (
+    ContentAddressedStorage,
+    file_reserved,
+    hashed_name,
+    is_hashed)
+
+
+class ContentAddressedStorageTest(SimpleTestCase):
+    def setUp(self):
+        self.location = tempfile.mkdtemp(dir=settings.BASE_DIR)
+        self.addCleanup(shutil.rmtree, self.location, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.location)
+
+    def test_name_is_content_hash(self):
+        """Файл сохраняется под хэшем в каталогах по его началу"""
+        digest = hashlib.sha256(b'picture').hexdigest()
+        name = self.storage.save('files/Photo.JPG', ContentFile(b'picture'))
+        self.assertEqual(
+            name, f'files/{digest[:2]}/{digest[2:4]}/{digest}.jpg'
+        )
+        self.assertEqual(name, hashed_name('files/Photo.JPG', digest))
+        self.assertTrue(is_hashed(name))
+        self.assertFalse(is_hashed('files/photo.jpg'))
+
+    def test_identical_content_is_stored_once(self):
+        """Одинаковое содержимое получает одно имя и один файл"""
+        first = self.storage.save('files/a.gif', ContentFile(b'same'))
+        second = self.storage.save('files/b.gif', ContentFile(b'same'))
+        other = self.storage.save('files/c.gif', ContentFile(b'other'))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, other)
+        directory = first.rsplit('/', 1)[0]
+        self.assertEqual(len(self.storage.listdir(directory)[1]), 1)
+
+    def test_reference_is_reserved_before_reuse(self):
+        """Сигнал о ссылке приходит до проверки и записи файла"""
+        reserved = []
+
+        def receiver(sender, name, **kwargs):
+            reserved.append((name, self.storage.exists(name)))
+
+        file_reserved.connect(receiver)
+        self.addCleanup(file_reserved.disconnect, receiver)
+        first = self.storage.save('files/a.gif', ContentFile(b'same'))
+        self.storage.save('files/b.gif', ContentFile(b'same'))
+        self.assertEqual(reserved, [(first, False), (first, True)])
+
+    def test_reuse_refreshes_mtime(self):
+        """Повторно использованный файл получает свежее время изменения"""
+        name = self.storage.save('files/a.gif', ContentFile(b'same'))
+        past = time.time() - 7200
+        os.utime(self.storage.path(name), (past, past))
+        self.storage.save('files/b.gif', ContentFile(b'same'))
+        self.assertGreater(
+            os.path.getmtime(self.storage.path(name)), time.time() - 60
+        )
+
+    def test_concurrent_duplicate_gets_same_name(self):
+        """Одновременная запись того же содержимого не даёт суффикса"""
+        first = self.storage.save('files/a.gif', ContentFile(b'same'))
+        # Вторая загрузка не увидела файл и пишет его сама.
+        with mock.patch.object(self.storage, '_touch', return_value=False):
+            second = self.storage.save('files/b.gif', ContentFile(b'same'))
+        self.assertEqual(first, second)
+        directory = os.path.dirname(self.storage.path(first))
+        self.assertEqual(os.listdir(directory), [os.path.basename(first)])
@@ -0,0 +1,157 @@
+import io
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, PngImagePlugin
+
+from posts.forms import PostForm
+from posts.models import Post
+
+from .. import uploads
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def jpeg(size=(64, 48)):
+    exif = Image.Exif()
+    exif[uploads.ORIENTATION] = 6
+    exif[0x010F] = 'SecretCamera'
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (10, 120, 200)).save(
+        buffer, 'JPEG', exif=exif.tobytes(), comment=b'private comment'
+    )
+    return buffer.getvalue()
+
+
+def png(size=(32, 32), orientation=None):
+    info = PngImagePlugin.PngInfo()
+    info.add_text('Author', 'Secret Person')
+    options = {}
+    if orientation is not None:
+        exif = Image.Exif()
+        exif[uploads.ORIENTATION] = orientation
+        exif[0x010F] = 'SecretCamera'
+        options['exif'] = exif
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 10, 10)).save(
+        buffer, 'PNG', pnginfo=info, **options
+    )
+    return buffer.getvalue()
+
+
+def upload(content, name='photo.jpg', content_type='image/jpeg'):
+    return SimpleUploadedFile(name, content, content_type=content_type)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class UploadsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='uploader')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create(self, image):
+        return self.client.post(
+            reverse('posts:post_create'), {'text': 'Пост', 'image': image}
+        )
+
+    def test_jpeg_metadata_is_stripped(self):
+        """Из JPEG пропадают EXIF и комментарий, ориентация остаётся"""
+        self.create(upload(jpeg()))
+        post = Post.objects.get()
+        content = post.image.read()
+        self.assertNotIn(b'SecretCamera', content)
+        self.assertNotIn(b'private comment', content)
+        with Image.open(io.BytesIO(content)) as image:
+            self.assertEqual(dict(image.getexif()), {uploads.ORIENTATION: 6})
+            image.load()
+            self.assertEqual(image.size, (64, 48))
+
+    def test_png_text_is_stripped(self):
+        """Из PNG пропадают текстовые блоки"""
+        self.create(upload(png(), 'picture.png', 'image/png'))
+        content = Post.objects.get().image.read()
+        self.assertNotIn(b'Secret Person', content)
+        with Image.open(io.BytesIO(content)) as image:
+            image.load()
+            self.assertEqual(image.size, (32, 32))
+
+    def test_png_orientation_is_kept(self):
+        """Из EXIF в PNG остаётся только ориентация"""
+        self.create(upload(png(orientation=6), 'picture.png', 'image/png'))
+        content = Post.objects.get().image.read()
+        self.assertNotIn(b'SecretCamera', content)
+        with Image.open(io.BytesIO(content)) as image:
+            image.load()
+            self.assertEqual(dict(image.getexif()), {uploads.ORIENTATION: 6})
+
+    @override_settings(UPLOAD_MAX_SIZE=1024)
+    def test_large_file_is_rejected(self):
+        """Файл больше UPLOAD_MAX_SIZE не принимается"""
+        response = self.create(upload(jpeg((400, 400))))
+        self.assertFormError(
+            response, 'form', 'image', 'Файл больше 1,0\xa0КБ'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(UPLOAD_MAX_REQUEST_SIZE=1024)
+    def test_large_request_is_refused(self):
+        """Запрос больше UPLOAD_MAX_REQUEST_SIZE получает 400 сразу"""
+        response = self.create(upload(jpeg((400, 400))))
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Post.objects.exists())
+
+    @override_settings(UPLOAD_MAX_PIXELS=1000)
+    def test_too_many_pixels_is_rejected(self):
+        """Размеры проверяются по заголовку"""
+        response = self.create(upload(jpeg()))
+        self.assertFormError(
+            response, 'form', 'image',
+            'Картинка слишком большая: 64×48 точек'
+        )
+        self.assertFalse(Post.objects.exists())
+
+    def test_unsupported_format_is_rejected(self):
+        """Картинки вне UPLOAD_IMAGE_FORMATS не принимаются"""
+        buffer = io.BytesIO()
+        Image.new('RGB', (8, 8)).save(buffer, 'BMP')
+        response = self.create(
+            upload(buffer.getvalue(), 'picture.bmp', 'image/bmp')
+        )
+        self.assertFormError(
+            response, 'form', 'image', 'Формат BMP не поддерживается'
+        )
+
+    def test_form_strips_without_handler(self):
+        """Форма чистит и картинки, загруженные в обход обработчика"""
+        form = PostForm({'text': 'Пост'}, {'image': upload(jpeg())})
+        self.assertTrue(form.is_valid(), form.errors)
+        content = form.cleaned_data['image'].read()
+        self.assertNotIn(b'SecretCamera', content)
+
+    def test_handler_rejects_by_header(self):
+        """Обработчик не пишет файл, отвергнутый по заголовку"""
+        handler = uploads.BoundedUploadHandler()
+        handler.new_file('image', 'big.jpg', 'image/jpeg', None)
+        with override_settings(UPLOAD_MAX_PIXELS=1000):
+            content = jpeg()
+            self.assertIsNone(handler.receive_data_chunk(content, 0))
+            rejected = handler.file_complete(len(content))
+        self.assertIsInstance(rejected, uploads.RejectedUpload)
+        self.assertEqual(rejected.error.code, 'pixels')
@@ -0,0 +1,276 @@
+"""Загрузка картинок: потоковая запись, ранние проверки и очистка EXIF.
+
+``BoundedUploadHandler`` пишет файл на диск кусками и отказывает, не
+дочитав тело: запросы больше ``UPLOAD_MAX_REQUEST_SIZE`` получают 400
+сразу, файл больше ``UPLOAD_MAX_SIZE`` или картинка неподходящего
+формата и размера по заголовку дальше не пишется и приходит в форму как
+``RejectedUpload`` с причиной.
+
+``clean_image`` повторяет проверки для загрузок в обход обработчика и
+убирает из JPEG и PNG метаданные (EXIF, XMP, IPTC, текстовые блоки),
+копируя файл по сегментам без декодирования. Из EXIF остаётся только
+ориентация, чтобы фотографии не перевернулись.
+"""
+import io
+import os
+import struct
+import tempfile
+import zlib
+
+from django import forms
+from django.conf import settings
+from django.core.exceptions import RequestDataTooBig
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.template.defaultfilters import filesizeformat
+from PIL import Image
+
+HEADER_SIZE = 64 * 1024
+COPY_CHUNK_SIZE = 64 * 1024
+ORIENTATION = 0x0112
+JPEG_SOI = b'\xff\xd8'
+# Сегменты JPEG с метаданными: APP1 (EXIF, XMP), APP13 (IPTC), COM.
+JPEG_METADATA = (0xE1, 0xED, 0xFE)
+JPEG_APP0 = 0xE0
+JPEG_SOS = 0xDA
+JPEG_EOI = 0xD9
+# Маркеры без длины: TEM и RST0–RST7.
+JPEG_STANDALONE = (0x01, *range(0xD0, 0xD8))
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+EXIF_HEADER = b'Exif\x00\x00'
+PNG_METADATA = (b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME')
+
+
+class RejectedUpload(UploadedFile):
+    """Файл, который обработчик отказался принимать, и причина отказа."""
+
+    def __init__(self, name, content_type, error):
+        super().__init__(io.BytesIO(), name, content_type, 0)
+        self.error = error
+
+
+def inspect(file):
+    """Проверяет формат и размеры картинки по заголовку.
+
+    Возвращает ``(формат, ориентация EXIF)``; растр не декодируется.
+    Если Pillow не узнал картинку, бросает исключение Pillow.
+    """
+    with Image.open(file) as image:
+        image_format = image.format
+        width, height = image.size
+        orientation = image.getexif().get(ORIENTATION, 1)
+    if image_format not in settings.UPLOAD_IMAGE_FORMATS:
+        raise forms.ValidationError(
+            'Формат %(format)s не поддерживается',
+            code='format', params={'format': image_format}
+        )
+    if width * height > settings.UPLOAD_MAX_PIXELS:
+        raise forms.ValidationError(
+            'Картинка слишком большая: %(width)d×%(height)d точек',
+            code='pixels', params={'width': width, 'height': height}
+        )
+    return image_format, orientation
+
+
+def _too_big():
+    return forms.ValidationError(
+        'Файл больше %(limit)s',
+        code='size',
+        params={'limit': filesizeformat(settings.UPLOAD_MAX_SIZE)},
+    )
+
+
+class BoundedUploadHandler(TemporaryFileUploadHandler):
+    """Пишет загрузки во временные файлы и отбрасывает лишнее заранее."""
+
+    def handle_raw_input(self, input_data, META, content_length, boundary,
+                         encoding=None):
+        if content_length > settings.UPLOAD_MAX_REQUEST_SIZE:
+            raise RequestDataTooBig(
+                'Тело запроса больше settings.UPLOAD_MAX_REQUEST_SIZE'
+            )
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.header = b''
+        self.error = None
+
+    def receive_data_chunk(self, raw_data, start):
+        if self.error is not None:
+            # Остаток отвергнутого файла читается, но не пишется.
+            return None
+        if start + len(raw_data) > settings.UPLOAD_MAX_SIZE:
+            self.error = _too_big()
+            return None
+        if self.header is not None:
+            self.header += raw_data
+            if len(self.header) >= HEADER_SIZE:
+                self.check_header()
+                if self.error is not None:
+                    return None
+        return super().receive_data_chunk(raw_data, start)
+
+    def check_header(self):
+        header, self.header = self.header, None
+        try:
+            inspect(io.BytesIO(header))
+        except forms.ValidationError as error:
+            self.error = error
+        except Exception:
+            # Не картинка или заголовок длиннее прочитанного: решит форма.
+            pass
+
+    def file_complete(self, file_size):
+        if self.header is not None and self.error is None:
+            self.check_header()
+        if self.error is not None:
+            self.file.close()
+            return RejectedUpload(
+                self.file_name, self.content_type, self.error
+            )
+        return super().file_complete(file_size)
+
+
+def _copy(src, dst, size):
+    while size > 0:
+        chunk = src.read(min(size, COPY_CHUNK_SIZE))
+        if not chunk:
+            raise ValueError('Файл обрывается')
+        dst.write(chunk)
+        size -= len(chunk)
+
+
+def _orientation_exif(orientation):
+    """EXIF только с ориентацией, с заголовком ``Exif\\0\\0``."""
+    exif = Image.Exif()
+    exif[ORIENTATION] = orientation
+    return exif.tobytes()
+
+
+def _orientation_segment(orientation):
+    data = _orientation_exif(orientation)
+    return b'\xff\xe1' + struct.pack('>H', len(data) + 2) + data
+
+
+def _orientation_chunk(orientation):
+    # В блоке eXIf лежат данные TIFF без заголовка ``Exif\0\0``.
+    data = _orientation_exif(orientation)[len(EXIF_HEADER):]
+    return (
+        struct.pack('>I', len(data)) + b'eXIf' + data
+        + struct.pack('>I', zlib.crc32(b'eXIf' + data))
+    )
+
+
+def _strip_jpeg(src, dst, orientation):
+    if src.read(2) != JPEG_SOI:
+        raise ValueError('Нет маркера SOI')
+    dst.write(JPEG_SOI)
+    pending = _orientation_segment(orientation) if orientation != 1 else b''
+    while True:
+        marker = src.read(2)
+        if len(marker) < 2 or marker[0] != 0xFF:
+            raise ValueError('Ожидался маркер')
+        code = marker[1]
+        if code != JPEG_APP0 and pending:
+            dst.write(pending)
+            pending = b''
+        if code in (JPEG_SOS, JPEG_EOI):
+            dst.write(marker)
+            while True:
+                chunk = src.read(COPY_CHUNK_SIZE)
+                if not chunk:
+                    return
+                dst.write(chunk)
+        if code in JPEG_STANDALONE:
+            dst.write(marker)
+            continue
+        length = src.read(2)
+        size = struct.unpack('>H', length)[0] - 2
+        if code in JPEG_METADATA:
+            src.seek(size, io.SEEK_CUR)
+            continue
+        dst.write(marker + length)
+        _copy(src, dst, size)
+
+
+def _strip_png(src, dst, orientation):
+    if src.read(8) != PNG_SIGNATURE:
+        raise ValueError('Нет сигнатуры PNG')
+    dst.write(PNG_SIGNATURE)
+    while True:
+        head = src.read(8)
+        if len(head) < 8:
+            raise ValueError('Нет блока IEND')
+        size, kind = struct.unpack('>I4s', head)
+        if kind in PNG_METADATA:
+            src.seek(size + 4, io.SEEK_CUR)
+            continue
+        dst.write(head)
+        _copy(src, dst, size + 4)
+        if kind == b'IHDR' and orientation != 1:
+            # eXIf должен идти до IDAT: ставим его сразу за заголовком.
+            dst.write(_orientation_chunk(orientation))
+        if kind == b'IEND':
+            return
+
+
+STRIPPERS = {'JPEG': _strip_jpeg, 'PNG': _strip_png}
+
+
+def strip_metadata(upload, image_format, orientation=1):
+    """Заменяет содержимое загрузки копией без метаданных.
+
+    Форматы без разборщика в ``STRIPPERS`` остаются как есть.
+    """
+    strip = STRIPPERS.get(image_format)
+    if strip is None:
+        return upload
+    clean = tempfile.NamedTemporaryFile(
+        suffix='.upload' + os.path.splitext(upload.name)[1],
+        dir=settings.FILE_UPLOAD_TEMP_DIR,
+    )
+    upload.seek(0)
+    try:
+        strip(upload, clean, orientation)
+    except (ValueError, struct.error):
+        # Pillow файл принял, а разбор сегментов нет: оставляем как есть.
+        clean.close()
+        upload.seek(0)
+        return upload
+    # Подменяется сам файл, а не объект загрузки: его закроет запрос.
+    original, upload.file = upload.file, clean
+    original.close()
+    upload.size = clean.tell()
+    upload.seek(0)
+    return upload
+
+
+def split_rejected(files):
+    """Убирает из ``files`` отвергнутые загрузки.
+
+    Возвращает ``(files, {поле: ошибка})``: форма добавляет ошибки сама,
+    а поле картинки видит форму без файла.
+    """
+    errors = {
+        name: upload.error for name, upload in files.items()
+        if isinstance(upload, RejectedUpload)
+    }
+    if errors:
+        files = files.copy()
+        for name in errors:
+            del files[name]
+    return files, errors
+
+
+def clean_image(upload):
+    """Проверяет новую картинку по заголовку и убирает метаданные.
+
+    Существующий файл или пустое значение возвращаются как есть.
+    """
+    if not isinstance(upload, UploadedFile):
+        return upload
+    if upload.size > settings.UPLOAD_MAX_SIZE:
+        raise _too_big()
+    upload.seek(0)
+    image_format, orientation = inspect(upload)
+    return strip_metadata(upload, image_format, orientation)
@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics as performance
+
 
 def page_not_found(request, exception):
     template = 'core/404.html'
@@ -19,3 +23,11 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+@staff_member_required
+def metrics(request):
+    return HttpResponse(
+        performance.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,7 +1,11 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+
+from search import index as search_index
 
 from .models import Group, Post
 
+ADMIN_SEARCH_LIMIT = 1000
+
 
 class PostAdmin(admin.ModelAdmin):
     list_display = (
@@ -17,6 +21,39 @@ class PostAdmin(admin.ModelAdmin):
 
     empty_value_display = '-пусто-'
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).for_feed()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Поиск по индексу вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        post_ids, timed_out = search_index.search(
+            search_term, ADMIN_SEARCH_LIMIT
+        )
+        if timed_out:
+            messages.warning(
+                request, 'Поиск не уложился во время, уточните запрос'
+            )
+        elif len(post_ids) >= ADMIN_SEARCH_LIMIT:
+            messages.warning(
+                request,
+                f'Показаны первые {ADMIN_SEARCH_LIMIT} найденных постов, '
+                f'уточните запрос'
+            )
+        return queryset.filter(pk__in=post_ids), False
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        field = super().formfield_for_foreignkey(db_field, request, **kwargs)
+        if db_field.name == 'group':
+            # list_editable строит поле на каждую строку: выбираем группы
+            # один раз на запрос, а не по запросу на строку.
+            choices = getattr(request, '_group_choices', None)
+            if choices is None:
+                choices = request._group_choices = list(field.choices)
+            field.choices = choices
+        return field
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description',)
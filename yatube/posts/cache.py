@@ -0,0 +1,47 @@
+"""Области версионирования кэша для страниц постов."""
+from core import cache as versions
+
+FEED = 'feed'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def author_scope(author_id):
+    return f'author:{author_id}'
+
+
+def profile_scope(user_id):
+    return f'profile:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def post_scopes(post, *group_ids):
+    """Области, которые задевает изменение поста."""
+    scopes = [FEED, author_scope(post.author_id), post_scope(post.pk)]
+    for group_id in {post.group_id, *group_ids}:
+        if group_id is not None:
+            scopes.append(group_scope(group_id))
+    return scopes
+
+
+def invalidate_post(post, *group_ids):
+    versions.bump(*post_scopes(post, *group_ids))
+
+
+def invalidate_comment(comment):
+    versions.bump(post_scope(comment.post_id))
+
+
+def invalidate_group(group):
+    versions.bump(FEED, group_scope(group.pk))
+
+
+def invalidate_follow(follow):
+    versions.bump(
+        profile_scope(follow.user_id), profile_scope(follow.author_id)
+    )
@@ -0,0 +1,86 @@
+"""Денормализованные счётчики постов, подписок и комментариев.
+
+Счётчики меняются атомарным ``UPDATE ... SET x = x + 1`` из сигналов
+моделей, а ``recount`` пересчитывает их по данным и чинит расхождения.
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+# (модель со счётчиком, поле счётчика, модель-источник, поле связи)
+COUNTERS = (
+    (UserStats, 'posts_count', Post, 'author'),
+    (UserStats, 'followers_count', Follow, 'author'),
+    (UserStats, 'following_count', Follow, 'user'),
+    (UserStats, 'comments_count', Comment, 'author'),
+    (Group, 'posts_count', Post, 'group'),
+    (Post, 'comments_count', Comment, 'post'),
+)
+
+
+def bump(model, pk, field, delta):
+    """Сдвигает счётчик на delta, не опуская его ниже нуля."""
+    if pk is None:
+        return 0
+    rows = model.objects.filter(pk=pk)
+    if delta < 0:
+        rows = rows.filter(**{f'{field}__gte': -delta})
+    return rows.update(**{field: F(field) + delta})
+
+
+def bump_user(user_id, field, delta):
+    if bump(UserStats, user_id, field, delta) or delta < 0:
+        return
+    UserStats.objects.get_or_create(user_id=user_id)
+    bump(UserStats, user_id, field, delta)
+
+
+def stats_for(user):
+    """Возвращает счётчики пользователя, создавая их при отсутствии."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(user=user)
+        return stats
+
+
+def _actual(source, relation):
+    counted = source.objects.filter(
+        **{relation: OuterRef('pk')}
+    ).order_by().values(relation).annotate(total=Count('pk')).values('total')
+    return Coalesce(
+        Subquery(counted, output_field=IntegerField()), 0
+    )
+
+
+def recount(repair=True):
+    """Сверяет счётчики с данными.
+
+    Возвращает словарь ``{'Модель.поле': число расхождений}``; при
+    ``repair=True`` расхождения сразу исправляются.
+    """
+    missing = User.objects.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=pk) for pk in missing.iterator()),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    drift = {}
+    for model, field, source, relation in COUNTERS:
+        actual = _actual(source, relation)
+        stale = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}
+        )
+        key = f'{model.__name__}.{field}'
+        drift[key] = stale.count()
+        if repair and drift[key]:
+            model.objects.filter(
+                pk__in=stale.values('pk')
+            ).update(**{field: actual})
+    return drift
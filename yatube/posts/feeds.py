@@ -0,0 +1,169 @@
+"""RSS- и Atom-ленты сайта, групп и авторов.
+
+Лента берёт последние ``SYNDICATION_ITEMS`` постов тем же запросом, что
+и страницы (``for_feed``). Готовый XML лежит в кэше под версией области,
+а ETag/Last-Modified строятся из той же версии, поэтому опрос ленты без
+изменений стоит одного обращения к кэшу.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse, reverse_lazy
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.html import linebreaks
+from django.utils.text import Truncator
+from django.views.decorators.http import require_GET
+
+from core import cache as versions
+from core.conditional import conditional, per_request
+
+from . import cache
+from .models import Group, Post
+
+User = get_user_model()
+
+TITLE_LENGTH = 50
+
+
+@per_request
+def _get_group(request, slug):
+    return get_object_or_404(Group, slug=slug)
+
+
+@per_request
+def _get_author(request, username):
+    return get_object_or_404(User, username=username)
+
+
+class PostsFeed(Feed):
+    """Последние посты сайта."""
+    title = 'Yatube: последние посты'
+    link = reverse_lazy('posts:index')
+    description = 'Последние обновления на сайте'
+
+    def items(self, obj):
+        return self.posts(obj).for_feed()[:settings.SYNDICATION_ITEMS]
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(TITLE_LENGTH)
+
+    def item_description(self, item):
+        # Описание читалки показывают как HTML, а текст поста — не HTML.
+        return linebreaks(item.text, autoescape=True)
+
+    def item_link(self, item):
+        return reverse('posts:post_detail', args=[item.pk])
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_categories(self, item):
+        return [item.group.title] if item.group else []
+
+
+class GroupFeed(PostsFeed):
+    """Последние посты группы."""
+    def get_object(self, request, slug):
+        return _get_group(request, slug)
+
+    def posts(self, group):
+        return group.posts.all()
+
+    def title(self, group):
+        return f'Yatube: {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', args=[group.slug])
+
+    def description(self, group):
+        return group.description
+
+
+class ProfileFeed(PostsFeed):
+    """Последние посты автора."""
+    def get_object(self, request, username):
+        return _get_author(request, username)
+
+    def posts(self, author):
+        return author.posts.all()
+
+    def title(self, author):
+        return f'Yatube: {author.get_full_name() or author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=[author.username])
+
+    def description(self, author):
+        return f'Посты пользователя {author.username}'
+
+
+class AtomMixin:
+    feed_type = Atom1Feed
+
+    def subtitle(self, obj):
+        return self._get_dynamic_attr('description', obj)
+
+
+class PostsAtomFeed(AtomMixin, PostsFeed):
+    pass
+
+
+class GroupAtomFeed(AtomMixin, GroupFeed):
+    pass
+
+
+class ProfileAtomFeed(AtomMixin, ProfileFeed):
+    pass
+
+
+def _index_scopes(request):
+    return [cache.FEED]
+
+
+def _group_scopes(request, slug):
+    return [cache.group_scope(_get_group(request, slug).pk)]
+
+
+def _profile_scopes(request, username):
+    return [cache.author_scope(_get_author(request, username).pk)]
+
+
+def cached_feed(feed, scopes_func):
+    """Делает view, отдающую XML ленты из кэша по версиям областей."""
+    @require_GET
+    @conditional(scopes_func)
+    def view(request, *args, **kwargs):
+        # Ленты не зависят от пользователя и параметров запроса, но
+        # ссылки в них абсолютные: схема и хост входят в ключ.
+        url = request.build_absolute_uri(request.path)
+        path = hashlib.md5(url.encode()).hexdigest()
+        version = versions.version_key(*scopes_func(request, *args, **kwargs))
+        key = f'syndication:{path}:{version}'
+
+        def render():
+            response = feed(request, *args, **kwargs)
+            return response.content, response['Content-Type']
+
+        content, content_type = versions.get_or_compute(
+            key, render, settings.SYNDICATION_CACHE_TIMEOUT
+        )
+        return HttpResponse(content, content_type=content_type)
+    return view
+
+
+index_rss = cached_feed(PostsFeed(), _index_scopes)
+index_atom = cached_feed(PostsAtomFeed(), _index_scopes)
+group_rss = cached_feed(GroupFeed(), _group_scopes)
+group_atom = cached_feed(GroupAtomFeed(), _group_scopes)
+profile_rss = cached_feed(ProfileFeed(), _profile_scopes)
+profile_atom = cached_feed(ProfileAtomFeed(), _profile_scopes)
@@ -1,5 +1,7 @@
 from django import forms
 
+from core import uploads
+
 from .models import Post, Comment
 
 
@@ -8,6 +10,18 @@ class PostForm(forms.ModelForm):
         model = Post
         fields = ('text', 'group', 'image',)
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.files, self.upload_errors = uploads.split_rejected(self.files)
+
+    def clean_image(self):
+        return uploads.clean_image(self.cleaned_data['image'])
+
+    def clean(self):
+        for name, error in self.upload_errors.items():
+            self.add_error(name, error)
+        return super().clean()
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
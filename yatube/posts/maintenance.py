@@ -0,0 +1,175 @@
+"""Обслуживание каталога картинок постов по одному каталогу за раз.
+
+Функции вызываются в дочерних процессах команды ``media_maintenance``:
+каждая получает каталог относительно ``MEDIA_ROOT`` и возвращает
+счётчики для отчёта. Файлы моложе ``grace`` секунд не удаляются: их
+пост мог ещё не закоммититься. Не удаляются и картинки со ссылками в
+``MediaFile``: их уже взял загружаемый, но не сохранённый пост.
+"""
+import logging
+import os
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from sorl.thumbnail import default as sorl
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import media, renditions, thumbnails
+from .models import MediaFile, Post
+
+logger = logging.getLogger(__name__)
+
+# Имена миниатюр из хранилища ключей sorl: задаются в каждом процессе
+# перед проходом по каталогам миниатюр (см. ``use_known``).
+_known = frozenset()
+
+
+def directories(top):
+    """Каталоги с файлами под ``MEDIA_ROOT/top`` в стабильном порядке."""
+    root = os.path.join(settings.MEDIA_ROOT, top)
+    found = []
+    for path, _, files in os.walk(root):
+        if files:
+            found.append(os.path.relpath(path, settings.MEDIA_ROOT))
+    return sorted(found)
+
+
+def _entries(directory):
+    path = os.path.join(settings.MEDIA_ROOT, directory)
+    with os.scandir(path) as entries:
+        return [entry for entry in entries if entry.is_file()]
+
+
+def _name(directory, file_name):
+    return os.path.join(directory, file_name).replace(os.sep, '/')
+
+
+def _old(entry, grace):
+    return time.time() - entry.stat().st_mtime > grace
+
+
+def _remove(stats, entry, name, dry_run):
+    stats['deleted'] += 1
+    stats['deleted_bytes'] += entry.stat().st_size
+    if not dry_run:
+        default_storage.delete(name)
+
+
+def sweep_images(directory, grace, dry_run=False):
+    """Удаляет картинки без постов и их варианты, достраивает миниатюры
+    картинок, на которые посты ссылаются."""
+    stats = Counter()
+    entries = _entries(directory)
+    originals = {}
+    variants = []
+    for entry in entries:
+        stats['files'] += 1
+        stats['bytes'] += entry.stat().st_size
+        match = renditions.RENDITION_RE.match(entry.name)
+        if match:
+            variants.append((entry, match['root']))
+        else:
+            originals[_name(directory, entry.name)] = entry
+    referenced = set(
+        Post.objects.filter(image__in=list(originals)).values_list(
+            'image', flat=True
+        ).distinct()
+    )
+    held = set(
+        MediaFile.objects.filter(
+            name__in=list(originals), refs__gt=0
+        ).values_list('name', flat=True)
+    )
+    for name, entry in originals.items():
+        if name in referenced:
+            stats.update(_rebuild(name, dry_run))
+        elif name not in held and _old(entry, grace):
+            if not dry_run:
+                delete_thumbnails(name, delete_file=False)
+                MediaFile.objects.filter(name=name, refs=0).delete()
+            _remove(stats, entry, name, dry_run)
+    live_roots = {
+        os.path.splitext(name)[0] for name in referenced | held
+    }
+    for entry, root in variants:
+        name = _name(directory, entry.name)
+        if _name(directory, root) not in live_roots and _old(entry, grace):
+            _remove(stats, entry, name, dry_run)
+    return stats
+
+
+def _rebuild(name, dry_run):
+    """Достраивает миниатюры картинки, на которую ссылаются посты."""
+    size = Post.objects.filter(
+        image=name, image_width__isnull=False, image_height__isnull=False
+    ).values_list('image_width', 'image_height').first()
+    stale = (
+        size is None
+        or thumbnails.waiting(name).exists()
+        or bool(renditions.missing(name, *size))
+    )
+    if dry_run:
+        return {'rebuilt': int(stale)}
+    try:
+        if stale:
+            thumbnails.complete(name)
+        else:
+            # Миниатюры sorl, чьи записи убрал prune_kvstore, sorl
+            # построит заново; остальные найдутся в хранилище ключей.
+            thumbnails.generate(name)
+    except Exception:
+        logger.exception('Не удалось построить миниатюры %s', name)
+        return {'errors': 1}
+    return {'rebuilt': int(stale)}
+
+
+def prune_kvstore(dry_run=False):
+    """Убирает из хранилища ключей sorl записи об отсутствующих файлах."""
+    if not dry_run:
+        sorl.kvstore.cleanup()
+
+
+def known_thumbnails():
+    """Имена миниатюр, о которых знает хранилище ключей sorl."""
+    known = set()
+    for key in sorl.kvstore._find_keys(identity='image'):
+        image_file = sorl.kvstore._get(key)
+        if image_file is not None:
+            known.add(image_file.name)
+    return known
+
+
+def use_known(known):
+    global _known
+    _known = frozenset(known)
+
+
+def sweep_thumbnails(directory, grace, dry_run=False):
+    """Удаляет файлы миниатюр sorl, о которых не знает хранилище ключей."""
+    stats = Counter()
+    for entry in _entries(directory):
+        stats['files'] += 1
+        stats['bytes'] += entry.stat().st_size
+        name = _name(directory, entry.name)
+        if name not in _known and _old(entry, grace):
+            _remove(stats, entry, name, dry_run)
+    return stats
+
+
+def missing_files():
+    """Имена картинок, на которые ссылаются посты, но которых нет."""
+    names = Post.objects.exclude(image='').order_by().values_list(
+        'image', flat=True
+    ).distinct()
+    return [
+        name for name in names.iterator()
+        if not default_storage.exists(name)
+    ]
+
+
+def recount(dry_run=False):
+    """Пересчитывает ссылки на файлы после удаления сирот."""
+    if not dry_run:
+        media.recount()
@@ -0,0 +1,212 @@
+import json
+import os
+import statistics
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import urls
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+# Страницы, которые меняют данные: гоняются только с --writes.
+WRITES = ('add_comment', 'profile_follow', 'profile_unfollow')
+# Страницы, которые смотрит вошедший читатель, и страницы автора поста.
+AS_READER = ('follow_index', 'post_create', *WRITES)
+AS_OWNER = ('post_edit',)
+POST_DATA = {'add_comment': {'text': 'Комментарий из бенчмарка'}}
+
+
+def percentiles(values):
+    cuts = statistics.quantiles(values, n=100, method='inclusive')
+    return {'p50': cuts[49], 'p95': cuts[94], 'p99': cuts[98]}
+
+
+class Command(BaseCommand):
+    help = (
+        'Прогоняет все страницы posts/urls.py через тестовый клиент и '
+        'сохраняет задержки p50/p95/p99 и число SQL-запросов в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Сколько замеров на каждую страницу'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Сколько запросов сделать до замеров (прогрев кэша)'
+        )
+        parser.add_argument(
+            '--writes', action='store_true',
+            help='Гонять и страницы, которые меняют данные'
+        )
+        parser.add_argument(
+            '--output',
+            help='Файл для результатов (по умолчанию benchmarks/<время>.json)'
+        )
+        parser.add_argument(
+            '--compare',
+            help='Прошлые результаты: вывести разницу и упасть на регрессии'
+        )
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост p95, доля (по умолчанию 0.2)'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 2:
+            raise CommandError('Нужно хотя бы два замера на страницу')
+        self.queries = 0
+        results = {}
+        for name, url, client, data in self.targets(options['writes']):
+            view = f'{urls.app_name}:{name}'
+            results[view] = self.measure(
+                url, client, data, options['warmup'], options['requests']
+            )
+            self.report(view, results[view])
+        report = {
+            'created': timezone.now().isoformat(),
+            'requests': options['requests'],
+            'database': {
+                model._meta.label: model.objects.count()
+                for model in (User, Group, Post, Comment, Follow)
+            },
+            'results': results,
+        }
+        path = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks',
+            timezone.now().strftime('%Y%m%d-%H%M%S') + '.json'
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as output:
+            json.dump(report, output, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Результаты: {path}'))
+        if options['compare']:
+            self.compare(options['compare'], results, options['threshold'])
+
+    def targets(self, writes):
+        """Страницы с адресами, клиентами и данными для POST."""
+        post = Post.objects.order_by('-comments_count', '-pk').first()
+        group = Group.objects.order_by('-posts_count', '-pk').first()
+        author = User.objects.filter(posts__isnull=False).order_by(
+            '-stats__posts_count', '-pk'
+        ).first()
+        reader_id = Follow.objects.exclude(user=author).values_list(
+            'user', flat=True
+        ).first()
+        if not all((post, group, author, reader_id)):
+            raise CommandError(
+                'Недостаточно данных: запустите manage.py seed'
+            )
+        kwargs = {
+            'post_id': post.pk,
+            'slug': group.slug,
+            'username': author.username,
+        }
+        guest = Client()
+        reader = Client()
+        reader.force_login(User.objects.get(pk=reader_id))
+        owner = Client()
+        owner.force_login(post.author)
+        for pattern in urls.urlpatterns:
+            name = pattern.name
+            if name in WRITES and not writes:
+                self.stdout.write(f'{name}: пропущено, нужен --writes')
+                continue
+            url = reverse(
+                f'{urls.app_name}:{name}',
+                kwargs={key: kwargs[key] for key in pattern.pattern.converters}
+            )
+            client = guest
+            if name in AS_READER:
+                client = reader
+            elif name in AS_OWNER:
+                client = owner
+            yield name, url, client, POST_DATA.get(name)
+
+    def count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def request(self, url, client, data):
+        self.queries = 0
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(self.count_query)
+                )
+            started = time.perf_counter()
+            if data is None:
+                response = client.get(url)
+            else:
+                response = client.post(url, data)
+            elapsed = time.perf_counter() - started
+        return response.status_code, elapsed * 1000, self.queries
+
+    def measure(self, url, client, data, warmup, requests):
+        for _ in range(warmup):
+            self.request(url, client, data)
+        timings = []
+        queries = []
+        statuses = set()
+        for _ in range(requests):
+            status, elapsed, count = self.request(url, client, data)
+            statuses.add(status)
+            timings.append(elapsed)
+            queries.append(count)
+        latency = percentiles(timings)
+        return {
+            'url': url,
+            'method': 'GET' if data is None else 'POST',
+            'statuses': sorted(statuses),
+            'p50_ms': round(latency['p50'], 3),
+            'p95_ms': round(latency['p95'], 3),
+            'p99_ms': round(latency['p99'], 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries_p50': statistics.median(queries),
+            'queries_max': max(queries),
+        }
+
+    def report(self, view, result):
+        self.stdout.write(
+            f'{view:<24} p50 {result["p50_ms"]:8.2f} мс  '
+            f'p95 {result["p95_ms"]:8.2f} мс  '
+            f'p99 {result["p99_ms"]:8.2f} мс  '
+            f'запросов {result["queries_p50"]:g} '
+            f'(макс. {result["queries_max"]})  '
+            f'статусы {result["statuses"]}'
+        )
+
+    def compare(self, path, results, threshold):
+        with open(path) as previous_file:
+            previous = json.load(previous_file)['results']
+        regressions = []
+        for view, result in results.items():
+            old = previous.get(view)
+            if old is None:
+                continue
+            change = result['p95_ms'] / old['p95_ms'] - 1
+            self.stdout.write(
+                f'{view:<24} p95 {old["p95_ms"]:.2f} -> '
+                f'{result["p95_ms"]:.2f} мс ({change:+.0%}), запросов '
+                f'{old["queries_max"]} -> {result["queries_max"]}'
+            )
+            if change > threshold:
+                regressions.append(f'{view}: p95 {change:+.0%}')
+            if result['queries_max'] > old['queries_max']:
+                regressions.append(
+                    f'{view}: запросов {old["queries_max"]} -> '
+                    f'{result["queries_max"]}'
+                )
+        if regressions:
+            raise CommandError('Регрессии: ' + '; '.join(regressions))
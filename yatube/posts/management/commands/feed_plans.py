@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает планы запросов лент и время их выполнения: '
+        'проверка того, что индексы действительно используются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs', type=int, default=20,
+            help='Сколько раз выполнить каждый запрос для замера времени'
+        )
+
+    def feeds(self):
+        author = User.objects.filter(stats__posts_count__gt=0).order_by(
+            '-stats__posts_count'
+        ).first()
+        group = Group.objects.order_by('-posts_count').first()
+        post = Post.objects.order_by('-comments_count').first()
+        reader = Follow.objects.values_list('user', flat=True).first()
+        if not all((author, group, post)):
+            raise CommandError(
+                'Недостаточно данных: нужны посты, группы и комментарии'
+            )
+        page = slice(0, 10)
+        feeds = {
+            'index': Post.objects.for_feed()[page],
+            'group': group.posts.for_feed()[page],
+            'profile': author.posts.for_feed()[page],
+            'comments': Comment.objects.filter(post=post)[page],
+            'follow_check': Follow.objects.filter(
+                user=author, author=author
+            ),
+        }
+        if reader is not None:
+            posts, _ = timeline.feed_for(User(pk=reader))
+            feeds['follow'] = posts[page]
+        return feeds
+
+    def handle(self, *args, **options):
+        for name, queryset in self.feeds().items():
+            timings = []
+            for _ in range(options['runs']):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(queryset.explain())
+            self.stdout.write(
+                f'median {statistics.median(timings):.2f} ms, '
+                f'max {max(timings):.2f} ms\n'
+            )
@@ -0,0 +1,181 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from functools import partial
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from posts import maintenance
+from posts.models import Post
+
+PROGRESS_INTERVAL = 1.0
+MISSING_SHOWN = 10
+
+
+def _run(func, unit):
+    """Обрабатывает каталог в дочернем процессе."""
+    return unit, func(unit)
+
+
+class Command(BaseCommand):
+    help = (
+        'Обслуживает картинки постов: достраивает миниатюры, удаляет файлы '
+        'без постов, чистит хранилище ключей sorl и проверяет, что файлы '
+        'постов на месте. Прерванный запуск продолжается с того же места'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=os.cpu_count() or 1,
+            help='Число процессов для обхода каталогов'
+        )
+        parser.add_argument(
+            '--grace', type=int, default=3600,
+            help='Не удалять файлы моложе стольких секунд'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет удалено и достроено'
+        )
+        parser.add_argument(
+            '--state',
+            default=os.path.join(settings.BASE_DIR, 'media_maintenance.state'),
+            help='Файл с пройденными каталогами для продолжения'
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help='Начать заново, не глядя на файл состояния'
+        )
+
+    def handle(self, *args, **options):
+        self.processes = options['processes']
+        self.dry_run = options['dry_run']
+        grace = options['grace']
+        self.open_state(options['state'], options['restart'])
+        try:
+            self.once('kvstore', maintenance.prune_kvstore, self.dry_run)
+            upload_to = Post._meta.get_field('image').upload_to
+            self.sweep('images', upload_to, partial(
+                maintenance.sweep_images, grace=grace, dry_run=self.dry_run
+            ))
+            self.sweep(
+                'thumbnails', sorl_settings.THUMBNAIL_PREFIX,
+                partial(
+                    maintenance.sweep_thumbnails,
+                    grace=grace, dry_run=self.dry_run,
+                ),
+                maintenance.use_known, (maintenance.known_thumbnails(),),
+            )
+            self.once('recount', maintenance.recount, self.dry_run)
+        except KeyboardInterrupt:
+            self.stderr.write(
+                'Прервано: повторный запуск продолжит с того же места'
+            )
+            return
+        finally:
+            self.state.close()
+        self.check_missing()
+        if not self.dry_run:
+            os.remove(options['state'])
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def open_state(self, path, restart):
+        """Читает пройденные шаги и открывает файл для новых."""
+        self.done = set()
+        if not restart and os.path.exists(path):
+            with open(path) as state:
+                self.done = {line.rstrip('\n') for line in state}
+            self.stdout.write(f'Продолжение: шагов пройдено {len(self.done)}')
+        # В пробном запуске ничего не меняется, запоминать нечего.
+        self.state = open(os.devnull if self.dry_run else path, 'w')
+        for step in sorted(self.done):
+            self.state.write(step + '\n')
+        self.state.flush()
+
+    def mark(self, step):
+        self.done.add(step)
+        self.state.write(step + '\n')
+        self.state.flush()
+
+    def once(self, step, func, *args):
+        if step in self.done:
+            return
+        started = time.monotonic()
+        func(*args)
+        self.mark(step)
+        self.stdout.write(f'{step}: {time.monotonic() - started:.1f} с')
+
+    def sweep(self, phase, top, func, initializer=None, initargs=()):
+        units = [
+            unit for unit in maintenance.directories(top)
+            if f'{phase}:{unit}' not in self.done
+        ]
+        progress = Progress(self, phase, len(units))
+        if self.processes <= 1 or len(units) <= 1:
+            if initializer is not None:
+                initializer(*initargs)
+            results = (_run(func, unit) for unit in units)
+            self.collect(phase, results, progress)
+            return
+        # Соединения с базой нельзя делить между процессами: закрываем
+        # их до fork, каждый процесс откроет своё.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        with context.Pool(self.processes, initializer, initargs) as pool:
+            self.collect(
+                phase, pool.imap_unordered(partial(_run, func), units),
+                progress,
+            )
+
+    def collect(self, phase, results, progress):
+        for unit, stats in results:
+            self.mark(f'{phase}:{unit}')
+            progress.add(stats)
+        progress.report(final=True)
+
+    def check_missing(self):
+        missing = maintenance.missing_files()
+        for name in missing[:MISSING_SHOWN]:
+            self.stderr.write(f'Нет файла: {name}')
+        if missing:
+            self.stderr.write(f'Постов ссылаются на отсутствующие файлы: '
+                              f'{len(missing)}')
+
+
+class Progress:
+    """Счётчики прохода и вывод скорости не чаще раза в секунду."""
+
+    def __init__(self, command, phase, total):
+        self.command = command
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self.stats = Counter()
+        self.started = self.reported = time.monotonic()
+
+    def add(self, stats):
+        self.done += 1
+        self.stats.update(stats)
+        if time.monotonic() - self.reported >= PROGRESS_INTERVAL:
+            self.report()
+
+    def report(self, final=False):
+        self.reported = time.monotonic()
+        elapsed = max(self.reported - self.started, 1e-6)
+        stats = self.stats
+        verb = 'к удалению' if self.command.dry_run else 'удалено'
+        line = (
+            f'{self.phase}: каталогов {self.done}/{self.total}, '
+            f'файлов {stats["files"]} ({stats["files"] / elapsed:.0f}/с, '
+            f'{stats["bytes"] / elapsed / 2 ** 20:.1f} МБ/с), '
+            f'{verb} {stats["deleted"]} '
+            f'({stats["deleted_bytes"] / 2 ** 20:.1f} МБ), '
+            f'достроено {stats["rebuilt"]}, ошибок {stats["errors"]}'
+        )
+        if final:
+            line = self.command.style.SUCCESS(line)
+        self.command.stdout.write(line)
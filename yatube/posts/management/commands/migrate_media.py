@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core.storage import digest, hashed_name, is_hashed
+from posts import media, renditions, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит картинки постов под имена по хэшу содержимого, '
+        'объединяет одинаковые файлы и пересчитывает ссылки на них'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать, что будет перенесено'
+        )
+        parser.add_argument(
+            '--keep-originals', action='store_true',
+            help='Не удалять старые файлы и их миниатюры'
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').order_by().values_list(
+            'image', flat=True
+        ).distinct()
+        # Уже перенесённые файлы пропускаются: команду можно прервать и
+        # запустить снова.
+        legacy = [name for name in names.iterator() if not is_hashed(name)]
+        moved = merged = missing = 0
+        for name in legacy:
+            if not default_storage.exists(name):
+                missing += 1
+                self.stderr.write(f'Нет файла: {name}')
+                continue
+            with default_storage.open(name) as file:
+                target = hashed_name(name, digest(file))
+                duplicate = default_storage.exists(target)
+                if not options['dry_run']:
+                    target = default_storage.save(name, file)
+            moved += 1
+            merged += duplicate
+            self.stdout.write(f'{name} -> {target}')
+            if not options['dry_run']:
+                self.move(name, target, options['keep_originals'])
+        if not options['dry_run']:
+            files = media.recount()
+            cache.clear()
+            self.stdout.write(f'Файлов со ссылками: {files}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено: {moved}, из них совпали с уже сохранёнными: '
+            f'{merged}, без файла: {missing}'
+        ))
+
+    def move(self, name, target, keep_originals):
+        with transaction.atomic():
+            Post.objects.filter(image=name).update(
+                image=target, thumbnails_ready=False
+            )
+        # Миниатюры выводятся из имени: достаточно одной задачи на файл,
+        # она отметит готовыми все посты с этой картинкой.
+        post = Post.objects.filter(image=target).first()
+        thumbnails.enqueue(post)
+        if not keep_originals:
+            delete_thumbnails(name, delete_file=False)
+            renditions.delete(name)
+            default_storage.delete(name)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только показать расхождения, ничего не исправляя'
+        )
+
+    def handle(self, *args, **options):
+        drift = counters.recount(repair=not options['check'])
+        for counter, stale in drift.items():
+            self.stdout.write(f'{counter}: {stale}')
+        total = sum(drift.values())
+        if options['check']:
+            self.stdout.write(f'Расхождений: {total}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Исправлено: {total}'))
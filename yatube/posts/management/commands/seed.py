@@ -0,0 +1,270 @@
+import io
+import random
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image, ImageDraw
+
+from posts import counters, media, thumbnails, timeline
+from posts.models import Comment, Follow, Group, Post
+from search import index
+
+User = get_user_model()
+
+TEXT_POOL_SIZE = 2000
+NAME_POOL_SIZE = 500
+IMAGE_VARIANTS = 20
+IMAGE_SIZE = (960, 640)
+PASSWORD = 'yatube-seed'
+# Доля постов без группы и «перекос» популярности авторов: вес автора
+# номер k пропорционален 1 / k ** AUTHOR_SKEW.
+NO_GROUP_SHARE = 0.3
+AUTHOR_SKEW = 0.8
+
+
+@contextmanager
+def explicit_dates(*models):
+    """Даёт bulk_create сохранить заданные pub_date.
+
+    Иначе ``auto_now_add`` перезапишет их текущим временем.
+    """
+    fields = [model._meta.get_field('pub_date') for model in models]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+def insert(model, objects):
+    """Вставляет объекты пачками и возвращает id новых строк.
+
+    SQLite не возвращает id из bulk_create, поэтому новые строки
+    находятся по id больше прежнего максимума.
+    """
+    before = model.objects.aggregate(last=Max('pk'))['last'] or 0
+    with transaction.atomic():
+        # Размер пачки подбирает Django по лимиту параметров SQLite.
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+    return list(
+        model.objects.filter(pk__gt=before).order_by('pk').values_list(
+            'pk', flat=True
+        )
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, группами, постами, '
+        'комментариями и подписками для нагрузочных тестов'
+    )
+
+    def add_arguments(self, parser):
+        counts = (
+            ('users', 1000), ('groups', 20), ('posts', 20000),
+            ('comments', 50000), ('follows', 20000), ('images', 200),
+        )
+        for name, default in counts:
+            parser.add_argument(
+                f'--{name}', type=int, default=default,
+                help=f'Сколько создать (по умолчанию {default})'
+            )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней раскидать даты публикаций'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=None,
+            help='Зерно генератора для воспроизводимых данных'
+        )
+        parser.add_argument(
+            '--locale', default='ru_RU', help='Локаль Faker'
+        )
+        parser.add_argument(
+            '--skip-search', action='store_true',
+            help='Не пересобирать поисковый индекс'
+        )
+
+    def step(self, name, func, *args):
+        started = time.monotonic()
+        result = func(*args)
+        elapsed = time.monotonic() - started
+        size = f': {len(result)}' if isinstance(result, list) else ''
+        self.stdout.write(f'{name}{size} за {elapsed:.1f} с')
+        return result
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.fake = Faker(options['locale'])
+        self.fake.seed_instance(options['seed'])
+        self.now = timezone.now()
+        self.days = options['days']
+        # Faker медленный, поэтому тексты и имена берутся из пулов.
+        self.texts = [
+            self.fake.paragraph(nb_sentences=self.random.randint(1, 8))
+            for _ in range(TEXT_POOL_SIZE)
+        ]
+        self.names = [
+            (self.fake.first_name(), self.fake.last_name())
+            for _ in range(NAME_POOL_SIZE)
+        ]
+        with explicit_dates(Post, Comment):
+            new_users = self.step(
+                'Пользователи', self.create_users, options['users']
+            )
+            users = list(User.objects.values_list('pk', flat=True))
+            self.step('Группы', self.create_groups, options['groups'])
+            groups = list(Group.objects.values_list('pk', flat=True))
+            images = self.step(
+                'Картинки', self.create_images,
+                min(options['images'], IMAGE_VARIANTS),
+            )
+            self.step(
+                'Посты', self.create_posts,
+                options['posts'], users, groups, images, options['images'],
+            )
+            posts = list(Post.objects.values_list('pk', 'pub_date'))
+            self.step(
+                'Комментарии', self.create_comments,
+                options['comments'], users, posts,
+            )
+        self.step('Подписки', self.create_follows, options['follows'], users)
+        self.step('Счётчики', counters.recount)
+        self.step('Ссылки на картинки', media.recount)
+        cache.clear()
+        self.step('Ленты подписок', timeline.rebuild_all)
+        if not options['skip_search']:
+            self.step('Поисковый индекс', index.rebuild)
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово. Пароль новых пользователей ({len(new_users)}): '
+            f'{PASSWORD}'
+        ))
+
+    def pub_date(self, after=None):
+        start = after or self.now - timedelta(days=self.days)
+        span = (self.now - start).total_seconds()
+        return start + timedelta(seconds=self.random.uniform(0, span))
+
+    def create_users(self, count):
+        start = (User.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        password = make_password(PASSWORD)
+        users = []
+        for number in range(start, start + count):
+            first_name, last_name = self.random.choice(self.names)
+            users.append(User(
+                username=f'{self.fake.user_name()}_{number}',
+                first_name=first_name,
+                last_name=last_name,
+                password=password,
+            ))
+        return insert(User, users)
+
+    def create_groups(self, count):
+        start = (Group.objects.aggregate(last=Max('pk'))['last'] or 0) + 1
+        return insert(Group, [
+            Group(
+                title=f'{self.fake.word().capitalize()} {number}',
+                slug=f'group-{number}',
+                description=self.random.choice(self.texts),
+            )
+            for number in range(start, start + count)
+        ])
+
+    def create_images(self, count):
+        names = []
+        for number in range(count):
+            image = Image.new('RGB', IMAGE_SIZE, self.color())
+            draw = ImageDraw.Draw(image)
+            for _ in range(12):
+                x, y = (self.random.randrange(side) for side in IMAGE_SIZE)
+                radius = self.random.randrange(40, 240)
+                draw.ellipse(
+                    (x - radius, y - radius, x + radius, y + radius),
+                    fill=self.color(),
+                )
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=85)
+            names.append(default_storage.save(
+                f'posts/seed/{number}.jpg', ContentFile(buffer.getvalue())
+            ))
+        return names
+
+    def color(self):
+        return tuple(self.random.randrange(256) for _ in range(3))
+
+    def create_posts(self, count, users, groups, images, with_images):
+        # Немногие авторы пишут большую часть постов, как в жизни.
+        weights = list(accumulate(
+            1 / rank ** AUTHOR_SKEW for rank in range(1, len(users) + 1)
+        ))
+        authors = self.random.choices(users, cum_weights=weights, k=count)
+        illustrated = set(self.random.sample(
+            range(count), min(with_images, count) if images else 0
+        ))
+        posts = []
+        for number, author_id in enumerate(authors):
+            posts.append(Post(
+                author_id=author_id,
+                group_id=(
+                    self.random.choice(groups)
+                    if groups and self.random.random() > NO_GROUP_SHARE
+                    else None
+                ),
+                text=self.random.choice(self.texts),
+                pub_date=self.pub_date(),
+                image=(
+                    self.random.choice(images)
+                    if number in illustrated else ''
+                ),
+            ))
+        created = insert(Post, posts)
+        if created:
+            for post in Post.objects.filter(pk__gte=created[0]).exclude(
+                image=''
+            ):
+                thumbnails.enqueue(post)
+        return created
+
+    def create_comments(self, count, users, posts):
+        if not posts:
+            return []
+        comments = []
+        for _ in range(count):
+            post_id, post_date = self.random.choice(posts)
+            comments.append(Comment(
+                post_id=post_id,
+                author_id=self.random.choice(users),
+                text=self.random.choice(self.texts)[:300],
+                pub_date=self.pub_date(after=post_date),
+            ))
+        return insert(Comment, comments)
+
+    def create_follows(self, count, users):
+        count = min(count, len(users) * (len(users) - 1))
+        weights = list(accumulate(
+            1 / rank ** AUTHOR_SKEW for rank in range(1, len(users) + 1)
+        ))
+        pairs = set()
+        while len(pairs) < count:
+            author_id, = self.random.choices(users, cum_weights=weights)
+            user_id = self.random.choice(users)
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        return insert(Follow, [
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in pairs
+        ])
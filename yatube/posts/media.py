@@ -0,0 +1,80 @@
+"""Счётчики ссылок на файлы картинок постов.
+
+Одинаковые картинки хранятся одним файлом (``core.storage``), поэтому
+файл нельзя удалять вместе с постом: ``retain`` и ``release`` двигают
+счётчик из сигналов, а файл с производными удаляется после коммита,
+когда ссылок не осталось. Ссылку на загружаемый файл ``retain`` берёт
+ещё в хранилище (``core.storage.file_reserved``), до проверки, есть ли
+уже такой файл.
+"""
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, F
+from sorl.thumbnail import delete as delete_thumbnails
+
+from core.storage import is_hashed
+
+from . import renditions
+from .models import MediaFile, Post
+
+
+def _tracked(name):
+    # Файлы со старыми именами не делятся между постами; их переносит
+    # команда migrate_media.
+    return bool(name) and is_hashed(name)
+
+
+def retain(name):
+    if not _tracked(name):
+        return
+    if MediaFile.objects.filter(name=name).update(refs=F('refs') + 1):
+        return
+    MediaFile.objects.get_or_create(name=name)
+    MediaFile.objects.filter(name=name).update(refs=F('refs') + 1)
+
+
+def release(name):
+    """Снимает ссылку; файл без ссылок удаляется после коммита."""
+    if not _tracked(name):
+        return
+    if MediaFile.objects.filter(name=name, refs__gte=1).update(
+        refs=F('refs') - 1
+    ):
+        transaction.on_commit(lambda: collect(name))
+
+
+def collect(name):
+    """Удаляет файл и его миниатюры, если на него никто не ссылается.
+
+    Строка с нулём ссылок удаляется первой и до коммита держит
+    блокировку: ``retain`` из хранилища дождётся её и, если файла уже
+    нет, запишет его заново. Если другой процесс сослался на файл
+    раньше, счётчик не ноль и файл остаётся.
+    """
+    with transaction.atomic():
+        deleted, _ = MediaFile.objects.filter(name=name, refs=0).delete()
+        if deleted:
+            delete(name)
+
+
+def delete(name):
+    delete_thumbnails(name, delete_file=False)
+    renditions.delete(name)
+    default_storage.delete(name)
+
+
+def recount():
+    """Пересчитывает ссылки по постам; возвращает число файлов."""
+    counted = Post.objects.exclude(image='').order_by().values(
+        'image'
+    ).annotate(total=Count('pk')).values_list('image', 'total')
+    with transaction.atomic():
+        MediaFile.objects.all().delete()
+        MediaFile.objects.bulk_create(
+            (
+                MediaFile(name=name, refs=total)
+                for name, total in counted.iterator()
+            ),
+            batch_size=500,
+        )
+    return MediaFile.objects.count()
@@ -0,0 +1,67 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_counters(apps, schema_editor):
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    UserStats = apps.get_model('posts', 'UserStats')
+    for user in User.objects.annotate(
+        posts_total=models.Count('posts', distinct=True),
+        followers_total=models.Count('following', distinct=True),
+        following_total=models.Count('follower', distinct=True),
+        comments_total=models.Count('comments', distinct=True),
+    ).iterator():
+        UserStats.objects.create(
+            user_id=user.pk,
+            posts_count=user.posts_total,
+            followers_count=user.followers_total,
+            following_count=user.following_total,
+            comments_count=user.comments_total,
+        )
+    for group in Group.objects.annotate(total=models.Count('posts')):
+        Group.objects.filter(pk=group.pk).update(posts_count=group.total)
+    for post in Post.objects.order_by().annotate(
+        total=models.Count('comments')
+    ).filter(total__gt=0).iterator():
+        Post.objects.filter(pk=post.pk).update(comments_count=post.total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Число постов')),
+                ('followers_count', models.PositiveIntegerField(db_index=True, default=0, verbose_name='Число подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Число подписок')),
+                ('comments_count', models.PositiveIntegerField(default=0, verbose_name='Число комментариев')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число постов'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Число комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:54
+
+from django.db import migrations, models
+
+
+def drop_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first=models.Min('id'), total=models.Count('id')
+    ).filter(total__gt=1)
+    for row in duplicates:
+        extra = row['total'] - 1
+        Follow.objects.filter(
+            user_id=row['user'], author_id=row['author']
+        ).exclude(pk=row['first']).delete()
+        UserStats.objects.filter(user_id=row['author']).update(
+            followers_count=models.F('followers_count') - extra
+        )
+        UserStats.objects.filter(user_id=row['user']).update(
+            following_count=models.F('following_count') - extra
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0005_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            drop_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-pub_date'], name='comment_post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['-pub_date'], name='post_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def enqueue_existing(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    posts = Post.objects.exclude(image='').values_list('pk', 'image')
+    ThumbnailJob.objects.bulk_create(
+        (ThumbnailJob(post_id=pk, image=image) for pk, image in posts),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0006_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ThumbnailJob',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='thumbnail_job', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('image', models.CharField(max_length=100, verbose_name='Картинка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Поставлено')),
+                ('locked_until', models.DateTimeField(blank=True, null=True, verbose_name='Занято до')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+            ],
+            options={
+                'verbose_name': 'Задание на миниатюры',
+                'verbose_name_plural': 'Задания на миниатюры',
+                'ordering': ['created'],
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='thumbnails_ready',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Миниатюры готовы'),
+        ),
+        migrations.RunPython(enqueue_existing, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:20
+
+import json
+
+from django.db import migrations
+from django.utils import timezone
+
+
+def move_jobs_to_tasks(apps, schema_editor):
+    ThumbnailJob = apps.get_model('posts', 'ThumbnailJob')
+    Task = apps.get_model('tasks', 'Task')
+    now = timezone.now()
+    Task.objects.bulk_create(
+        (
+            Task(
+                name='posts.thumbnails.build',
+                args=json.dumps([post_id]),
+                dedup_key=f'thumbnails:{post_id}',
+                run_at=now,
+            )
+            for post_id in ThumbnailJob.objects.values_list(
+                'post_id', flat=True
+            )
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        ('posts', '0007_thumbnails'),
+    ]
+
+    operations = [
+        migrations.RunPython(move_jobs_to_tasks, migrations.RunPython.noop),
+        migrations.DeleteModel(
+            name='ThumbnailJob',
+        ),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:49
+
+import json
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def enqueue_existing(apps, schema_editor):
+    # Уже готовые картинки тоже получают варианты для srcset.
+    Post = apps.get_model('posts', 'Post')
+    Task = apps.get_model('tasks', 'Task')
+    now = timezone.now()
+    Task.objects.bulk_create(
+        (
+            Task(
+                name='posts.thumbnails.build',
+                args=json.dumps([post_id]),
+                dedup_key=f'thumbnails:{post_id}',
+                run_at=now,
+            )
+            for post_id in Post.objects.exclude(image='').filter(
+                thumbnails_ready=True
+            ).values_list('pk', flat=True)
+        ),
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0001_initial'),
+        ('posts', '0008_thumbnail_tasks'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='image_height',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Высота картинки'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='image_width',
+            field=models.PositiveIntegerField(editable=False, null=True, verbose_name='Ширина картинки'),
+        ),
+        migrations.RunPython(enqueue_existing, migrations.RunPython.noop),
+    ]
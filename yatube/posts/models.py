@@ -13,6 +13,11 @@ class Group(models.Model):
         unique=True
     )
     description = models.TextField('Описание группы')
+    posts_count = models.PositiveIntegerField(
+        'Число постов',
+        default=0,
+        editable=False
+    )
 
     def __str__(self):
         return self.title
@@ -22,6 +27,12 @@ class Group(models.Model):
         verbose_name_plural = 'Группы'
 
 
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Подгружает авторов и группы постов в том же запросе."""
+        return self.select_related('author', 'group')
+
+
 class Post(models.Model):
     text = models.TextField(
         verbose_name='Текст поста',
@@ -50,6 +61,31 @@ class Post(models.Model):
         blank=True
     )
 
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False
+    )
+    thumbnails_ready = models.BooleanField(
+        'Миниатюры готовы',
+        default=False,
+        editable=False
+    )
+    # Размеры оригинала записывает фоновая задача: по ним шаблон строит
+    # srcset, не открывая файл.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки',
+        null=True,
+        editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки',
+        null=True,
+        editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:15]
 
@@ -57,6 +93,18 @@ class Post(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
+        indexes = [
+            models.Index(fields=['-pub_date'], name='post_date_idx'),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date'],
+                name='post_group_date_idx'
+            ),
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
 
 
 class Comment(models.Model):
@@ -84,11 +132,16 @@ class Comment(models.Model):
         ordering = ['-pub_date']
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', '-pub_date'],
+                name='comment_post_date_idx'
+            ),
+        ]
 
 
 class Follow(models.Model):
     """Модель подписки"""
-    unique_together = ['user', 'author']
     user = models.ForeignKey(
         User,
         related_name='follower',
@@ -105,3 +158,93 @@ class Follow(models.Model):
     class Meta:
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'],
+                name='unique_follow'
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись персональной ленты подписок.
+
+    Лента заполняется при публикации поста (fan-out on write), поэтому
+    страница ``follow_index`` читается одним проходом по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        related_name='timeline',
+        on_delete=models.CASCADE,
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        related_name='timeline_entries',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации поста')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_entry'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='timeline_user_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые обновляются при записи.
+
+    Страницам не нужно считать посты, подписчиков и комментарии
+    агрегатными запросами: значения лежат в одной строке.
+    """
+    user = models.OneToOneField(
+        User,
+        primary_key=True,
+        related_name='stats',
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Число постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Число подписчиков',
+        default=0,
+        db_index=True
+    )
+    following_count = models.PositiveIntegerField('Число подписок', default=0)
+    comments_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики пользователя'
+        verbose_name_plural = 'Счётчики пользователей'
+
+
+class MediaFile(models.Model):
+    """Число постов, которые ссылаются на файл картинки.
+
+    Файлы хранятся по хэшу содержимого, поэтому одну картинку делят
+    несколько постов; файл удаляется, когда ссылок не остаётся.
+    """
+    name = models.CharField('Файл', max_length=100, primary_key=True)
+    refs = models.PositiveIntegerField('Ссылок', default=0)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        verbose_name = 'Файл картинки'
+        verbose_name_plural = 'Файлы картинок'
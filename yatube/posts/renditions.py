@@ -0,0 +1,150 @@
+"""Картинки постов в WebP/AVIF нескольких ширин для ``srcset``.
+
+Для каждой геометрии из ``settings.POST_THUMBNAILS`` картинка
+обрезается по её пропорциям и сжимается до ширин «геометрия × масштаб»
+из ``settings.POST_IMAGE_SCALES`` — без увеличения сверх оригинала.
+Файлы лежат рядом с оригиналом, имена выводятся из его имени, так что
+шаблону для разметки хватает размеров оригинала, сохранённых в посте.
+"""
+import io
+import os
+import re
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import features, Image, ImageOps
+
+# Имена вариантов выводятся из имени оригинала, поэтому они пишутся
+# в MEDIA_ROOT как есть, мимо хранилища с адресацией по содержимому.
+storage = FileSystemStorage()
+# Имя варианта: ``<корень оригинала>.<геометрия>.<ширина>w.<формат>``.
+RENDITION_RE = re.compile(r'^(?P<root>.+)\.\d+x\d+\.\d+w\.[a-z]+$')
+ORIENTATION = 0x0112
+# Значения ориентации EXIF, при которых ширина и высота меняются местами.
+ROTATED = (5, 6, 7, 8)
+
+
+def formats():
+    """Форматы из ``settings.POST_IMAGE_FORMATS``, которые умеет Pillow."""
+    return [
+        (name, options) for name, options in settings.POST_IMAGE_FORMATS
+        if features.check(name.lower())
+    ]
+
+
+def _size(geometry):
+    width, height = geometry.split('x')
+    return int(width), int(height)
+
+
+def widths(geometry, width, height):
+    """Ширины вариантов геометрии для оригинала ``width`` x ``height``."""
+    geometry_width, geometry_height = _size(geometry)
+    largest = min(width, height * geometry_width // geometry_height)
+    return sorted({
+        max(1, min(largest, round(geometry_width * scale)))
+        for scale in settings.POST_IMAGE_SCALES
+    })
+
+
+def name(image_name, geometry, width, format_name):
+    root, _ = os.path.splitext(image_name)
+    return f'{root}.{geometry}.{width}w.{format_name.lower()}'
+
+
+def delete(image_name):
+    """Удаляет все варианты картинки ``image_name``."""
+    directory, base = os.path.split(os.path.splitext(image_name)[0])
+    try:
+        _, files = storage.listdir(directory)
+    except FileNotFoundError:
+        return
+    for file_name in files:
+        # Только варианты: у оригиналов ``cat.png`` или ``cat.tar.gz.jpg``
+        # рядом с ``cat.jpg`` тот же корень, но это чужие картинки.
+        match = RENDITION_RE.match(file_name)
+        if match and match['root'] == base:
+            storage.delete(os.path.join(directory, file_name))
+
+
+def sources(image_name, geometry, width, height):
+    """``[(mime-тип, [(url, ширина), ...]), ...]`` для тегов ``<source>``.
+
+    Первым идёт самый компактный формат: браузер берёт первый
+    поддерживаемый.
+    """
+    variants = widths(geometry, width, height)
+    return [
+        (
+            f'image/{format_name.lower()}',
+            [
+                (
+                    storage.url(
+                        name(image_name, geometry, size, format_name)
+                    ),
+                    size,
+                )
+                for size in variants
+            ],
+        )
+        for format_name, _ in formats()
+    ]
+
+
+def _open(image_name):
+    with storage.open(image_name) as file:
+        image = Image.open(file)
+        image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def _oriented_size(image_name):
+    """Размеры оригинала с учётом поворота EXIF, без декодирования."""
+    with storage.open(image_name) as file:
+        with Image.open(file) as image:
+            width, height = image.size
+            orientation = image.getexif().get(ORIENTATION, 1)
+    if orientation in ROTATED:
+        return height, width
+    return width, height
+
+
+def missing(image_name, width, height):
+    """``{(геометрия, ширина): [(формат, опции, имя), ...]}`` для вариантов,
+    которых ещё нет в хранилище."""
+    result = {}
+    for geometry, _ in settings.POST_THUMBNAILS:
+        for size in widths(geometry, width, height):
+            for format_name, options in formats():
+                path = name(image_name, geometry, size, format_name)
+                if not storage.exists(path):
+                    result.setdefault((geometry, size), []).append(
+                        (format_name, options, path)
+                    )
+    return result
+
+
+def generate(image_name):
+    """Строит недостающие варианты и возвращает размеры оригинала.
+
+    Растр декодируется, только если чего-то не хватает.
+    """
+    size = _oriented_size(image_name)
+    absent = missing(image_name, *size)
+    if not absent:
+        return size
+    image = _open(image_name)
+    for (geometry, width), variants in absent.items():
+        geometry_width, geometry_height = _size(geometry)
+        height = max(1, round(width * geometry_height / geometry_width))
+        variant = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        for format_name, options, path in variants:
+            buffer = io.BytesIO()
+            variant.save(buffer, format_name, **options)
+            storage.save(path, ContentFile(buffer.getvalue()))
+    return size
@@ -0,0 +1,119 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.storage import file_reserved
+
+from . import cache, counters, media, thumbnails, timeline
+from .models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(file_reserved)
+def image_reserved(sender, name, **kwargs):
+    if name.startswith(Post._meta.get_field('image').upload_to):
+        media.retain(name)
+
+
+@receiver(pre_save, sender=Post)
+def post_changing(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    # Ссылку на новую загрузку возьмёт хранилище при сохранении файла.
+    instance._image_reserved = (
+        bool(instance.image) and not instance.image._committed
+    )
+    if instance.pk is None:
+        return
+    old = Post.objects.filter(pk=instance.pk).values_list(
+        'group_id', 'image'
+    ).first()
+    if old is None:
+        return
+    old_group_id, old_image = old
+    # Новый файл на этом этапе ещё не сохранён и носит исходное имя,
+    # так что замена картинки видна по несовпадению имён.
+    if old_image != instance.image.name:
+        instance.thumbnails_ready = False
+        instance._old_image = old_image
+    if old_group_id != instance.group_id:
+        counters.bump(Group, old_group_id, 'posts_count', -1)
+        counters.bump(Group, instance.group_id, 'posts_count', 1)
+        cache.invalidate_post(instance, old_group_id)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, 'posts_count', 1)
+        counters.bump(Group, instance.group_id, 'posts_count', 1)
+        timeline.fan_out(instance)
+    old_image = instance.__dict__.pop('_old_image', None)
+    reserved = instance.__dict__.pop('_image_reserved', False)
+    if created or old_image is not None:
+        # Сначала новая ссылка: при той же картинке файл не удалится.
+        if not reserved:
+            media.retain(instance.image.name)
+        media.release(old_image)
+        if instance.image:
+            thumbnails.enqueue(instance)
+    cache.invalidate_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    media.release(instance.image.name)
+    counters.bump_user(instance.author_id, 'posts_count', -1)
+    counters.bump(Group, instance.group_id, 'posts_count', -1)
+    cache.invalidate_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump(Post, instance.post_id, 'comments_count', 1)
+        counters.bump_user(instance.author_id, 'comments_count', 1)
+    cache.invalidate_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump(Post, instance.post_id, 'comments_count', -1)
+    counters.bump_user(instance.author_id, 'comments_count', -1)
+    cache.invalidate_comment(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, raw=False, **kwargs):
+    if not raw:
+        cache.invalidate_group(instance)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, 'followers_count', 1)
+        counters.bump_user(instance.user_id, 'following_count', 1)
+        timeline.backfill(instance.user_id, instance.author_id)
+        cache.invalidate_follow(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, 'followers_count', -1)
+    counters.bump_user(instance.user_id, 'following_count', -1)
+    timeline.remove(instance.user_id, instance.author_id)
+    timeline.follower_lost(instance.author_id)
+    cache.invalidate_follow(instance)
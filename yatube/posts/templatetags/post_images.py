@@ -0,0 +1,32 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from posts import renditions
+
+register = template.Library()
+
+
+@register.simple_tag
+def image_sources(post, geometry):
+    """Теги ``<source>`` с вариантами картинки поста для ``<picture>``.
+
+    Пока фоновая задача не записала размеры оригинала, ничего не выводит:
+    остаётся миниатюра sorl из ``<img>``.
+    """
+    if not post.image or not post.image_width or not post.image_height:
+        return ''
+    width = geometry.split('x')[0]
+    sizes = f'(max-width: {width}px) 100vw, {width}px'
+    return format_html_join('', '{}', (
+        (
+            format_html(
+                '<source type="{}" srcset="{}" sizes="{}">',
+                mime,
+                ', '.join(f'{url} {size}w' for url, size in variants),
+                sizes,
+            ),
+        )
+        for mime, variants in renditions.sources(
+            post.image.name, geometry, post.image_width, post.image_height
+        )
+    ))
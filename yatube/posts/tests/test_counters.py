@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_counters(self):
+        """Создание, перенос и удаление поста меняют счётчики"""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_comment_and_follow_counters(self):
+        """Комментарии и подписки меняют счётчики"""
+        post = Post.objects.create(author=self.author, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Коммент'
+        )
+        follow = Follow.objects.create(user=self.reader, author=self.author)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.stats(self.reader).comments_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(self.stats(self.reader).following_count, 0)
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+
+    def test_profile_reads_counter(self):
+        """Профиль берёт число постов из счётчика"""
+        Post.objects.create(author=self.author, text='Пост')
+        client = Client()
+        url = reverse('posts:profile', args=[self.author.username])
+        response = client.get(url)
+        self.assertEqual(response.context['count'], 1)
+        self.assertEqual(
+            response.context['count'], self.author.posts.count()
+        )
+
+    def test_recount_repairs_drift(self):
+        """Команда recount_counters находит и чинит расхождения"""
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Пост'
+        )
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Post.objects.filter(pk=post.pk).update(comments_count=3)
+        out = StringIO()
+        call_command('recount_counters', '--check', stdout=out)
+        self.assertIn('UserStats.posts_count: 1', out.getvalue())
+        self.assertIn('Post.comments_count: 1', out.getvalue())
+        self.assertEqual(self.stats(self.author).posts_count, 7)
+        call_command('recount_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(post.comments_count, 0)
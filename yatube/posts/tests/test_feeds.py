@@ -0,0 +1,126 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post
+
+User = get_user_model()
+
+
+class FeedsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='feed_author')
+        cls.group = Group.objects.create(
+            title='Лента группы', slug='feed-group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.author, group=cls.group, text=f'Пост {i} <b>'
+            )
+            for i in range(3)
+        ]
+        cls.feeds = {
+            reverse('posts:index_rss'): 'application/rss+xml',
+            reverse('posts:index_atom'): 'application/atom+xml',
+            reverse('posts:group_rss', args=[cls.group.slug]):
+                'application/rss+xml',
+            reverse('posts:group_atom', args=[cls.group.slug]):
+                'application/atom+xml',
+            reverse('posts:profile_rss', args=[cls.author.username]):
+                'application/rss+xml',
+            reverse('posts:profile_atom', args=[cls.author.username]):
+                'application/atom+xml',
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+
+    def test_feeds_list_posts(self):
+        """Ленты отдают посты с экранированным текстом"""
+        for url, content_type in self.feeds.items():
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertTrue(
+                    response['Content-Type'].startswith(content_type)
+                )
+                content = response.content.decode()
+                self.assertIn(
+                    reverse('posts:post_detail', args=[self.posts[0].pk]),
+                    content
+                )
+                self.assertNotIn('<b>', content)
+
+    @override_settings(SYNDICATION_ITEMS=2)
+    def test_feed_window_is_bounded(self):
+        """В ленту попадают только последние SYNDICATION_ITEMS постов"""
+        response = self.guest_client.get(reverse('posts:index_rss'))
+        self.assertEqual(response.content.count(b'<item>'), 2)
+
+    def test_unknown_object_is_404(self):
+        """Лента несуществующей группы или автора отдаёт 404"""
+        urls = (
+            reverse('posts:group_rss', args=['missing']),
+            reverse('posts:profile_atom', args=['missing']),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertEqual(response.status_code, 404)
+
+    def test_repeated_request_uses_cache(self):
+        """Повторный запрос без изменений не рендерит ленту заново"""
+        url = reverse('posts:index_rss')
+        first = self.guest_client.get(url)
+        with self.assertNumQueries(0):
+            second = self.guest_client.get(url)
+        self.assertEqual(first.content, second.content)
+        with self.assertNumQueries(0):
+            response = self.guest_client.get(
+                url, HTTP_IF_NONE_MATCH=first['ETag']
+            )
+        self.assertEqual(response.status_code, 304)
+        self.assertTrue(first.has_header('Last-Modified'))
+
+    def test_cache_is_per_scheme_and_host(self):
+        """Закэшированная лента не отдаёт ссылки чужого хоста и схемы"""
+        url = reverse('posts:index_rss')
+        self.guest_client.get(url, HTTP_HOST='localhost')
+        response = self.guest_client.get(url, secure=True)
+        content = response.content.decode()
+        self.assertIn('https://testserver/', content)
+        self.assertNotIn('localhost', content)
+
+    def test_new_post_updates_feed(self):
+        """Новый пост сбрасывает закэшированную ленту"""
+        url = reverse('posts:group_atom', args=[self.group.slug])
+        first = self.guest_client.get(url)
+        post = Post.objects.create(
+            author=self.author, group=self.group, text='Свежий пост'
+        )
+        response = self.guest_client.get(
+            url, HTTP_IF_NONE_MATCH=first['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            reverse('posts:post_detail', args=[post.pk]),
+            response.content.decode()
+        )
+
+    def test_pages_link_to_feeds(self):
+        """Страницы лент ссылаются на свои RSS и Atom"""
+        pages = {
+            reverse('posts:index'): reverse('posts:index_rss'),
+            reverse('posts:group_list', args=[self.group.slug]):
+                reverse('posts:group_atom', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.author.username]):
+                reverse('posts:profile_rss', args=[self.author.username]),
+        }
+        for page, feed in pages.items():
+            with self.subTest(page=page):
+                response = self.guest_client.get(page)
+                self.assertContains(response, f'href="{feed}"')
@@ -1,3 +1,4 @@
+import hashlib
 import shutil
 import tempfile
 
@@ -8,6 +9,8 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from core.storage import hashed_name
+
 from ..models import Group, Post, Comment
 
 User = get_user_model()
@@ -139,7 +142,9 @@ class FormTest(TestCase):
         self.assertTrue(
             Post.objects.filter(
                 text='Тестовый текст',
-                image='posts/small.gif'
+                image=hashed_name(
+                    'posts/small.gif', hashlib.sha256(small_gif).hexdigest()
+                )
             ).exists()
         )
 
@@ -0,0 +1,146 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.storage import is_hashed
+from tasks import queue
+from tasks.models import Task
+
+from .. import media
+from ..models import MediaFile, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.get_thumbnail')
+class MediaTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create(self, name):
+        return Post.objects.create(
+            author=self.user, text='Картинка', image=upload(name)
+        )
+
+    def refs(self, name):
+        return MediaFile.objects.get(name=name).refs
+
+    def test_identical_images_share_file(self, get_thumbnail):
+        """Одинаковые картинки — один файл с двумя ссылками"""
+        first = self.create('one.gif')
+        second = self.create('two.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertTrue(is_hashed(first.image.name))
+        self.assertEqual(self.refs(first.image.name), 2)
+
+    def test_shared_image_reuses_thumbnails(self, get_thumbnail):
+        """Пост с уже обработанной картинкой не ставит новую задачу"""
+        first = self.create('one.gif')
+        queue.work()
+        second = self.create('two.gif')
+        self.assertFalse(Task.objects.exists())
+        second.refresh_from_db()
+        self.assertTrue(second.thumbnails_ready)
+        self.assertEqual((second.image_width, second.image_height), (2, 1))
+        self.assertEqual(first.image.name, second.image.name)
+
+    def test_release_deletes_unreferenced_file(self, get_thumbnail):
+        """Файл удаляется вместе с последней ссылкой"""
+        first = self.create('one.gif')
+        second = self.create('two.gif')
+        queue.work()
+        name = first.image.name
+        with mock.patch('posts.media.transaction.on_commit') as on_commit:
+            first.delete()
+            media.collect(name)
+            self.assertTrue(default_storage.exists(name))
+            second.delete()
+            media.collect(name)
+        self.assertEqual(on_commit.call_count, 2)
+        self.assertFalse(default_storage.exists(name))
+        self.assertFalse(MediaFile.objects.filter(name=name).exists())
+
+    def test_upload_holds_reference_before_post_is_saved(self, get_thumbnail):
+        """Загрузка берёт ссылку сразу: файл не удалят до сохранения поста"""
+        first = self.create('one.gif')
+        name = first.image.name
+        self.assertEqual(
+            default_storage.save('posts/two.gif', ContentFile(SMALL_GIF)),
+            name,
+        )
+        self.assertEqual(self.refs(name), 2)
+        with mock.patch('posts.media.transaction.on_commit'):
+            first.delete()
+        media.collect(name)
+        self.assertTrue(default_storage.exists(name))
+        self.assertEqual(self.refs(name), 1)
+
+    def test_edit_moves_reference(self, get_thumbnail):
+        """Замена картинки переносит ссылку на новый файл"""
+        post = self.create('one.gif')
+        old_name = post.image.name
+        post.image = SimpleUploadedFile(
+            'other.gif', SMALL_GIF + b'\x00', content_type='image/gif'
+        )
+        with mock.patch('posts.media.transaction.on_commit') as on_commit:
+            post.save()
+        self.assertEqual(self.refs(old_name), 0)
+        self.assertEqual(self.refs(post.image.name), 1)
+        on_commit.call_args.args[0]()
+        self.assertFalse(default_storage.exists(old_name))
+
+    def test_migrate_media(self, get_thumbnail):
+        """Команда переносит старые имена под хэш и объединяет дубли"""
+        legacy = FileSystemStorage()
+        names = [
+            legacy.save(f'posts/legacy_{i}.gif', ContentFile(SMALL_GIF))
+            for i in range(2)
+        ]
+        posts = [
+            Post.objects.create(author=self.user, text='Старый', image=name)
+            for name in names
+        ]
+        call_command('migrate_media', stdout=StringIO())
+        for post in posts:
+            post.refresh_from_db()
+            self.assertTrue(is_hashed(post.image.name))
+        self.assertEqual(posts[0].image.name, posts[1].image.name)
+        self.assertEqual(self.refs(posts[0].image.name), 2)
+        for name in names:
+            self.assertFalse(default_storage.exists(name))
+        queue.work()
+        posts[1].refresh_from_db()
+        self.assertTrue(posts[1].thumbnails_ready)
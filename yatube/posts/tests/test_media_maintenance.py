@@ -0,0 +1,157 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from tasks import queue
+
+from .. import renditions
+from ..models import MediaFile, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def age(name, seconds=7200):
+    past = time.time() - seconds
+    os.utime(default_storage.path(name), (past, past))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+@mock.patch('posts.thumbnails.get_thumbnail')
+class MediaMaintenanceTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+        self.state = tempfile.mktemp(dir=settings.BASE_DIR)
+        self.addCleanup(
+            lambda: os.path.exists(self.state) and os.remove(self.state)
+        )
+
+    def run_command(self, **options):
+        stdout, stderr = StringIO(), StringIO()
+        call_command(
+            'media_maintenance', processes=1, grace=60, state=self.state,
+            stdout=stdout, stderr=stderr, **options
+        )
+        return stdout.getvalue(), stderr.getvalue()
+
+    def post_with_image(self):
+        post = Post.objects.create(
+            author=self.user, text='Картинка', image=SimpleUploadedFile(
+                'small.gif', SMALL_GIF, content_type='image/gif'
+            )
+        )
+        queue.work()
+        return post
+
+    def orphan(self, content, seconds=7200, refs=0):
+        name = default_storage.save('posts/orphan.gif', ContentFile(content))
+        MediaFile.objects.filter(name=name).update(refs=refs)
+        age(name, seconds)
+        return name
+
+    def test_sweeps_orphans_and_rebuilds(self, get_thumbnail):
+        """Сироты удаляются, недостающие варианты достраиваются"""
+        post = self.post_with_image()
+        old_orphan = self.orphan(b'old')
+        fresh_orphan = self.orphan(b'fresh', seconds=0)
+        variant = renditions.name(post.image.name, '604x400', 1, 'WEBP')
+        default_storage.delete(variant)
+        stale_variant = renditions.name(old_orphan, '604x400', 1, 'WEBP')
+        renditions.storage.save(stale_variant, ContentFile(b'x'))
+        age(stale_variant)
+        Post.objects.create(author=self.user, text='Без файла', image='x.gif')
+        stdout, stderr = self.run_command()
+        self.assertFalse(default_storage.exists(old_orphan))
+        self.assertFalse(default_storage.exists(stale_variant))
+        self.assertTrue(default_storage.exists(fresh_orphan))
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertTrue(default_storage.exists(variant))
+        self.assertIn('images: каталогов', stdout)
+        self.assertIn('Нет файла: x.gif', stderr)
+        self.assertFalse(os.path.exists(self.state))
+
+    def test_dry_run_changes_nothing(self, get_thumbnail):
+        """Пробный запуск ничего не удаляет"""
+        orphan = self.orphan(b'old')
+        stdout, _ = self.run_command(dry_run=True)
+        self.assertTrue(default_storage.exists(orphan))
+        self.assertIn('к удалению 1', stdout)
+
+    def test_resumes_from_state(self, get_thumbnail):
+        """Пройденные каталоги из файла состояния пропускаются"""
+        orphan = self.orphan(b'old')
+        with open(self.state, 'w') as state:
+            state.write('kvstore\n')
+            state.write(f'images:{os.path.dirname(orphan)}\n')
+        stdout, _ = self.run_command()
+        self.assertIn('Продолжение: шагов пройдено 2', stdout)
+        self.assertTrue(default_storage.exists(orphan))
+        self.run_command(restart=True)
+        self.assertFalse(default_storage.exists(orphan))
+
+    def test_keeps_held_files(self, get_thumbnail):
+        """Старый файл со ссылкой от несохранённого поста не удаляется"""
+        held = self.orphan(b'held', refs=1)
+        variant = renditions.name(held, '604x400', 1, 'WEBP')
+        renditions.storage.save(variant, ContentFile(b'x'))
+        age(variant)
+        self.run_command()
+        self.assertTrue(default_storage.exists(held))
+        self.assertTrue(default_storage.exists(variant))
+
+    def test_logs_rebuild_errors(self, get_thumbnail):
+        """Ошибка построения миниатюр попадает в лог с именем файла"""
+        post = self.post_with_image()
+        default_storage.delete(
+            renditions.name(post.image.name, '604x400', 1, 'WEBP')
+        )
+        with mock.patch(
+            'posts.thumbnails.complete', side_effect=OSError('broken')
+        ), self.assertLogs('posts.maintenance', 'ERROR') as logs:
+            stdout, _ = self.run_command()
+        self.assertIn(post.image.name, logs.output[0])
+        self.assertIn('OSError: broken', logs.output[0])
+        self.assertIn('ошибок 1', stdout)
+
+    def test_repairs_missing_size_once(self, get_thumbnail):
+        """Размеры готового поста восстанавливаются за один проход"""
+        post = self.post_with_image()
+        Post.objects.filter(pk=post.pk).update(
+            image_width=None, image_height=None
+        )
+        stdout, _ = self.run_command()
+        self.assertIn('достроено 1', stdout)
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (2, 1))
+        stdout, _ = self.run_command()
+        self.assertIn('достроено 0', stdout)
@@ -1,7 +1,8 @@
 from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from ..models import Group, Post
+from ..models import Follow, Group, Post
 
 User = get_user_model()
 
@@ -37,3 +38,10 @@ class PostModelTest(TestCase):
         """Проверяемб что у модели User корректно работает __str__"""
         user = str(PostModelTest.user)
         self.assertEqual(self.user.__str__(), user)
+
+    def test_follow_is_unique(self):
+        """Повторная подписка на того же автора запрещена в базе"""
+        author = User.objects.create(username='author')
+        Follow.objects.create(user=self.user, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.user, author=author)
@@ -1,7 +1,14 @@
+from http import HTTPStatus
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
+from core.paginator import CursorPage, CursorPaginator
+
 from ..models import Group, Post
 
 User = get_user_model()
@@ -55,3 +62,100 @@ class PaginatorTest(TestCase):
         response_1 = self.authorized_client.get(url + '?page=2')
         self.assertEqual(len(response.context['page_obj']), 10)
         self.assertEqual(len(response_1.context['page_obj']), 4)
+
+
+@override_settings(FEED_PAGINATION={
+    'index': 'cursor',
+    'group': 'cursor',
+    'profile': 'cursor',
+    'follow': 'cursor',
+})
+class CursorPaginatorTest(TestCase):
+    """Проверяем курсорную пагинацию лент"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='testauth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=cls.user,
+                text=f'Тестовый пост- {i}',
+                group=cls.group
+            )
+            for i in range(14)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def test_cursor_pages(self):
+        """Курсоры ведут на следующую и обратно на первую страницу"""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': 'test-slug'}),
+            reverse('posts:profile', kwargs={'username': 'testauth'}),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                first = self.authorized_client.get(url).context['page_obj']
+                self.assertIsInstance(first, CursorPage)
+                self.assertEqual(len(first), 10)
+                self.assertFalse(first.has_previous())
+                second = self.authorized_client.get(
+                    url, {'cursor': first.next_cursor}
+                ).context['page_obj']
+                self.assertEqual(len(second), 4)
+                self.assertFalse(second.has_next())
+                back = self.authorized_client.get(
+                    url, {'cursor': second.previous_cursor}
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_cursor_pages_do_not_overlap(self):
+        """Курсорные страницы покрывают ленту без повторов"""
+        response = self.authorized_client.get(reverse('posts:index'))
+        page = response.context['page_obj']
+        seen = list(page)
+        while page.has_next():
+            page = self.authorized_client.get(
+                reverse('posts:index'), {'cursor': page.next_cursor}
+            ).context['page_obj']
+            seen.extend(page)
+        self.assertEqual(
+            [post.pk for post in seen],
+            [post.pk for post in Post.objects.order_by('-pub_date', '-pk')]
+        )
+
+    def test_broken_cursor_opens_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.authorized_client.get(
+            reverse('posts:index'), {'cursor': '!!!'}
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(len(response.context['page_obj']), 10)
+
+    def test_cursor_page_skips_count(self):
+        """Курсорная страница не выполняет COUNT(*)"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        first = paginator.page()
+        with CaptureQueriesContext(connection) as queries:
+            paginator.page(first.next_cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('COUNT', queries[0]['sql'])
+        self.assertNotIn('OFFSET', queries[0]['sql'])
+
+    def test_count_is_available(self):
+        """Общее число объектов и страниц доступно по запросу"""
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        self.assertEqual(paginator.count, Post.objects.count())
+        self.assertEqual(
+            paginator.num_pages, -(-paginator.count // 10)
+        )
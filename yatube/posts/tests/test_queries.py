@@ -0,0 +1,69 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class FeedQueriesTest(TestCase):
+    """Число запросов на страницу не зависит от числа постов на ней"""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user(username='reader')
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass'
+        )
+        authors = [
+            User.objects.create_user(username=f'author_{i}')
+            for i in range(3)
+        ]
+        groups = [
+            Group.objects.create(title=f'Группа {i}', slug=f'group-{i}')
+            for i in range(2)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.posts = [
+            Post.objects.create(
+                author=authors[i % 3],
+                group=groups[i % 2],
+                text=f'Пост {i}'
+            )
+            for i in range(12)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(10):
+            Comment.objects.create(
+                post=cls.post, author=authors[i % 3], text=f'Коммент {i}'
+            )
+        cls.author = authors[0]
+        cls.group = groups[0]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def test_feed_query_counts(self):
+        """Страницы лент выполняют фиксированное число запросов"""
+        pages = {
+            reverse('posts:index'): 4,
+            reverse('posts:group_list', args=[self.group.slug]): 4,
+            reverse('posts:profile', args=[self.author.username]): 5,
+            reverse('posts:post_detail', args=[self.post.pk]): 4,
+            reverse('posts:follow_index'): 6,
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                with self.assertNumQueries(expected):
+                    self.client.get(url)
+
+    def test_admin_changelist_query_count(self):
+        """Список постов в админке не делает запрос на каждую строку"""
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(7):
+            self.client.get(reverse('admin:posts_post_changelist'))
@@ -0,0 +1,129 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from tasks import queue
+
+from .. import renditions
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def upload(size):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, (200, 30, 30)).save(buffer, 'PNG')
+    return SimpleUploadedFile(
+        name='big.png', content=buffer.getvalue(), content_type='image/png'
+    )
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    POST_THUMBNAILS=(('600x400', {'crop': 'center', 'upscale': True}),),
+    POST_IMAGE_SCALES=(0.5, 1, 2),
+)
+class RenditionsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_widths_do_not_upscale(self):
+        """Ширины ограничены оригиналом, обрезанным по пропорциям"""
+        self.assertEqual(
+            renditions.widths('600x400', 2000, 2000), [300, 600, 1200]
+        )
+        self.assertEqual(
+            renditions.widths('600x400', 2000, 500), [300, 600, 750]
+        )
+        self.assertEqual(renditions.widths('600x400', 2, 1), [1])
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_build_stores_variants_and_size(self, get_thumbnail):
+        """Задача строит варианты всех форматов и запоминает размеры"""
+        post = Post.objects.create(
+            author=self.user, text='Картинка', image=upload((1000, 800))
+        )
+        queue.work()
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1000, 800))
+        self.assertTrue(renditions.formats())
+        for format_name, _ in renditions.formats():
+            for width in (300, 600, 1000):
+                name = renditions.name(
+                    post.image.name, '600x400', width, format_name
+                )
+                with self.subTest(name=name):
+                    with default_storage.open(name) as file:
+                        image = Image.open(file)
+                        self.assertEqual(image.format, format_name)
+                        self.assertEqual(
+                            image.size, (width, round(width * 400 / 600))
+                        )
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_tag_renders_picture_sources(self, get_thumbnail):
+        """Тег выводит <source> с srcset по форматам от компактного"""
+        post = Post.objects.create(
+            author=self.user, text='Картинка', image=upload((700, 500))
+        )
+        queue.work()
+        post.refresh_from_db()
+        html = Template(
+            '{% load post_images %}{% image_sources post "600x400" %}'
+        ).render(Context({'post': post}))
+        webp = renditions.name(post.image.name, '600x400', 600, 'WEBP')
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn(f'{default_storage.url(webp)} 600w, ', html)
+        self.assertEqual(
+            html.count('<source'), len(renditions.formats())
+        )
+        self.assertTrue(html.startswith(
+            f'<source type="image/{renditions.formats()[0][0].lower()}"'
+        ))
+
+    def test_tag_is_empty_without_size(self):
+        """Без размеров оригинала тег ничего не выводит"""
+        post = Post(author=self.user, text='Без размеров', image='a.png')
+        html = Template(
+            '{% load post_images %}{% image_sources post "600x400" %}'
+        ).render(Context({'post': post}))
+        self.assertEqual(html, '')
+
+    def test_delete_removes_only_variants(self):
+        """Удаляются варианты картинки, а не соседи с тем же корнем"""
+        names = [
+            'posts/cat.604x400.302w.webp',
+            'posts/cat.960x339.960w.avif',
+            'posts/cat.png',
+            'posts/cat.tar.gz.jpg',
+            'posts/cat.png.604x400.302w.webp',
+        ]
+        for file_name in names:
+            renditions.storage.save(file_name, io.BytesIO(b'x'))
+        renditions.delete('posts/cat.jpg')
+        self.assertEqual(
+            [renditions.storage.exists(file_name) for file_name in names],
+            [False, False, True, True, True],
+        )
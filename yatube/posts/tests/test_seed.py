@@ -0,0 +1,55 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts import urls
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+class SeedBenchmarkTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed', users=10, groups=2, posts=40, comments=30, follows=15,
+            images=0, seed=1, skip_search=True, stdout=StringIO(),
+        )
+
+    def test_seed(self):
+        """Данные создаются со счётчиками и лентами подписок"""
+        self.assertEqual(Post.objects.count(), 40)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertEqual(Follow.objects.count(), 15)
+        self.assertTrue(TimelineEntry.objects.exists())
+        dates = set(Post.objects.values_list('pub_date', flat=True))
+        self.assertEqual(len(dates), 40)
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_benchmark(self):
+        """Бенчмарк проходит все страницы и пишет результаты в JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'result.json')
+            call_command(
+                'benchmark', requests=3, warmup=0, writes=True,
+                output=path, stdout=StringIO(),
+            )
+            with open(path) as result_file:
+                results = json.load(result_file)['results']
+            call_command(
+                'benchmark', requests=3, warmup=0,
+                output=os.path.join(directory, 'next.json'),
+                compare=path, threshold=100, stdout=StringIO(),
+            )
+        self.assertCountEqual(
+            results,
+            [f'posts:{pattern.name}' for pattern in urls.urlpatterns],
+        )
+        for result in results.values():
+            self.assertLess(max(result['statuses']), 400)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
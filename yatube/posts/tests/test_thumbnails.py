@@ -0,0 +1,114 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from tasks import queue
+from tasks.models import Task
+
+from .. import thumbnails
+from ..models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def upload(name):
+    return SimpleUploadedFile(
+        name=name, content=SMALL_GIF, content_type='image/gif'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            author=self.user, text='С картинкой', image=upload('one.gif')
+        )
+
+    def test_saving_image_enqueues_job(self):
+        """Сохранение картинки ставит задачу, до обработки виден оригинал"""
+        self.assertTrue(
+            Task.objects.filter(
+                dedup_key=f'thumbnails:{self.post.image.name}'
+            )
+        )
+        self.assertFalse(self.post.thumbnails_ready)
+        response = Client().get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, f'src="{self.post.image.url}"')
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_process_generates_all_geometries(self, get_thumbnail):
+        """Обработка строит все миниатюры и снимает задачу"""
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(
+            [call.args[1] for call in get_thumbnail.call_args_list],
+            [geometry for geometry, _ in settings.POST_THUMBNAILS],
+        )
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+        self.assertFalse(Task.objects.exists())
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_new_image_resets_thumbnails(self, get_thumbnail):
+        """Замена картинки снова ставит задачу"""
+        queue.work()
+        post = Post.objects.get(pk=self.post.pk)
+        post.image = upload('two.gif')
+        post.save()
+        post.refresh_from_db()
+        self.assertFalse(post.thumbnails_ready)
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(get_thumbnail.call_args.args[0], post.image.name)
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_shared_new_image_is_built_once(self, get_thumbnail):
+        """Два поста с новой общей картинкой ставят одну задачу"""
+        other = Post.objects.create(
+            author=self.user, text='Та же картинка', image=upload('one.gif')
+        )
+        self.assertEqual(other.image.name, self.post.image.name)
+        self.assertEqual(Task.objects.count(), 1)
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(
+            Post.objects.filter(thumbnails_ready=True).count(), 2
+        )
+
+    @mock.patch('posts.thumbnails.get_thumbnail')
+    def test_build_fills_missing_size(self, get_thumbnail):
+        """Задача миграции сохраняет размеры у готового поста без них"""
+        Post.objects.filter(pk=self.post.pk).update(thumbnails_ready=True)
+        thumbnails.build(self.post.pk)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.thumbnails_ready)
+        self.assertEqual(
+            (self.post.image_width, self.post.image_height), (2, 1)
+        )
@@ -0,0 +1,128 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.paginator import CursorPaginator, decode_cursor
+from tasks import queue
+
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return [post.pk for post in response.context['page_obj']]
+
+    def test_new_post_is_fanned_out(self):
+        """Новый пост автора попадает в ленту подписчика"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый пост')
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post).exists()
+        )
+        self.assertEqual(self.feed(), [post.pk])
+
+    def test_follow_backfills_and_unfollow_cleans(self):
+        """Подписка подтягивает старые посты, отписка их убирает"""
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertEqual(self.feed(), [post.pk for post in reversed(posts)])
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader))
+        self.assertEqual(self.feed(), [])
+
+    def test_rebuild_all(self):
+        """Полная пересборка восстанавливает ленты подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        TimelineEntry.objects.all().delete()
+        TimelineEntry.objects.create(
+            user=self.author, post=posts[0], pub_date=posts[0].pub_date
+        )
+        timeline.rebuild_all()
+        self.assertEqual(self.feed(), [post.pk for post in reversed(posts)])
+        self.assertFalse(TimelineEntry.objects.filter(user=self.author))
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=0)
+    def test_celebrity_posts_are_read_on_demand(self):
+        """Посты популярного автора подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        cache.clear()
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed(), [post.pk])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_author_below_limit_is_fanned_out(self):
+        """Посты бывшего популярного автора раздаются после отписки"""
+        other = User.objects.create_user(username='other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=other, author=self.author)
+        cache.clear()
+        post = Post.objects.create(author=self.author, text='Пост звезды')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        Follow.objects.filter(user=other, author=self.author).delete()
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(self.feed(), [post.pk])
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.reader, post=post)
+        )
+
+    @override_settings(FEED_PAGINATION={'follow': 'cursor'})
+    def test_cursor_pages_of_timeline(self):
+        """Лента подписок листается курсором"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(12)
+        ]
+        url = reverse('posts:follow_index')
+        first = self.reader_client.get(url).context['page_obj']
+        second = self.reader_client.get(
+            url, {'cursor': first.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [post.pk for post in list(first) + list(second)],
+            [post.pk for post in reversed(posts)]
+        )
+
+    def test_cursor_encodes_configured_keys(self):
+        """Курсор берёт значения из ключей paginator, а не из obj.pk"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(author=self.author, text=f'Пост {i}')
+            for i in range(3)
+        ]
+        entries = TimelineEntry.objects.filter(user=self.reader).order_by(
+            '-pub_date', '-post_id'
+        )
+        paginator = CursorPaginator(entries, 2, ('pub_date', 'post_id'))
+        first = paginator.page()
+        self.assertEqual(decode_cursor(first.next_cursor)[1], posts[1].pk)
+        second = paginator.page(first.next_cursor)
+        self.assertEqual([entry.post_id for entry in second], [posts[0].pk])
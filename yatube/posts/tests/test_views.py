@@ -194,13 +194,9 @@ class ViewTest(TestCase):
 
     def test_index_cache(self):
         """Проверяем кэширование шаблона индекс"""
-        index_cache = Post.objects.create(
-            text='Проверочный текст',
-            author=self.user
-        )
         response = self.authorized_client.get(reverse('posts:index'))
         content_1 = response.content
-        index_cache.delete()
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
         new_response = self.authorized_client.get(reverse('posts:index'))
         new_content = new_response.content
         self.assertEqual(content_1, new_content)
@@ -209,6 +205,115 @@ class ViewTest(TestCase):
         content_2 = response_2.content
         self.assertNotEqual(content_1, content_2)
 
+    def test_cache_invalidated_on_changes(self):
+        """Изменения постов, групп и комментариев сразу видны на страницах"""
+        index = reverse('posts:index')
+        group = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        profile = reverse(
+            'posts:profile', kwargs={'username': self.user.username}
+        )
+        for url in (index, group, profile):
+            self.authorized_client.get(url)
+        post = Post.objects.create(
+            text='Свежий пост', author=self.user, group=self.group
+        )
+        for url in (index, group, profile):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertContains(response, 'Свежий пост')
+        post.delete()
+        for url in (index, group, profile):
+            with self.subTest(url=url):
+                response = self.authorized_client.get(url)
+                self.assertNotContains(response, 'Свежий пост')
+        detail = reverse('posts:post_detail', kwargs={'post_id': 1})
+        self.authorized_client.get(detail)
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Новый коммент'
+        )
+        self.assertContains(
+            self.authorized_client.get(detail), 'Новый коммент'
+        )
+
+    @override_settings(COMMENTS_PER_PAGE=3)
+    def test_comments_are_paginated(self):
+        """Комментарии отдаются страницами, остальные — по кнопке"""
+        post = Post.objects.create(author=self.user, text='Обсуждаемый')
+        comments = [
+            Comment.objects.create(
+                post=post, author=self.user, text=f'Коммент {i}'
+            )
+            for i in range(7)
+        ]
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', kwargs={'post_id': post.pk})
+        )
+        page = response.context['comments']
+        self.assertContains(response, 'Комментарии: 7')
+        self.assertContains(response, 'data-more-comments')
+        seen = [comment.pk for comment in page]
+        url = reverse('posts:post_comments', kwargs={'post_id': post.pk})
+        while page.has_next():
+            response = self.client.get(url, {'cursor': page.next_cursor})
+            self.assertTemplateNotUsed(response, 'base.html')
+            page = response.context['comments']
+            seen += [comment.pk for comment in page]
+        self.assertEqual(
+            seen, [comment.pk for comment in reversed(comments)]
+        )
+        self.assertNotContains(response, 'data-more-comments')
+
+    def test_comments_of_missing_post(self):
+        """Комментарии несуществующего поста отвечают 404"""
+        url = reverse('posts:post_comments', kwargs={'post_id': 10 ** 6})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_conditional_get(self):
+        """Неизменённые страницы отвечают 304 до рендеринга"""
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.user.username}),
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                etag = self.authorized_client.get(url)['ETag']
+                response = self.authorized_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response.templates, [])
+        Comment.objects.create(
+            post=self.post, author=self.user, text='Ещё коммент'
+        )
+        response = self.authorized_client.get(
+            urls[-1], HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertContains(response, 'Ещё коммент')
+
+    def test_conditional_get_follow_changes_profile(self):
+        """Подписка меняет ETag профиля автора"""
+        author = User.objects.create_user(username='author')
+        url = reverse('posts:profile', kwargs={'username': author.username})
+        etag = self.authorized_client.get(url)['ETag']
+        Follow.objects.create(user=self.user, author=author)
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stats'].followers_count, 1)
+
+    def test_last_modified_only_for_guests(self):
+        """Last-Modified отдаётся только неавторизованным пользователям"""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        last_modified = response['Last-Modified']
+        self.assertIn('no-cache', response['Cache-Control'])
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, 304)
+        response = self.authorized_client.get(url)
+        self.assertFalse(response.has_header('Last-Modified'))
+        self.assertIn('private', response['Cache-Control'])
+
     def test_following_to_author(self):
         """Проверка возможности подписываться"""
         follow_user = User.objects.create_user(username='follow')
@@ -0,0 +1,104 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+При сохранении картинки пост получает ``thumbnails_ready=False`` и
+задачу ``build_image`` в очереди; пока миниатюры не готовы, шаблоны
+показывают оригинал. Задача одна на картинку: посты с одной картинкой
+не строят одни и те же файлы параллельно.
+"""
+from django.conf import settings
+from django.db.models import Q
+from sorl.thumbnail import get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+
+from core import metrics
+from tasks.queue import task
+
+from . import cache, renditions
+from .models import Post
+
+
+class TimedThumbnailBackend(ThumbnailBackend):
+    """Учитывает в метриках запроса время поиска и генерации миниатюр."""
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        with metrics.timer('thumbnail'):
+            return super().get_thumbnail(file_, geometry_string, **options)
+
+
+def enqueue(post):
+    """Ставит задачу на миниатюры картинки поста.
+
+    Если та же картинка уже готова у другого поста, миниатюры общие и
+    пост сразу получает её размеры.
+    """
+    ready = Post.objects.filter(
+        image=post.image.name, thumbnails_ready=True,
+        image_width__isnull=False, image_height__isnull=False,
+    ).exclude(pk=post.pk).values('image_width', 'image_height').first()
+    if ready is not None:
+        Post.objects.filter(
+            image=post.image.name, thumbnails_ready=False
+        ).update(thumbnails_ready=True, **ready)
+        post.thumbnails_ready = True
+        post.image_width = ready['image_width']
+        post.image_height = ready['image_height']
+        return
+    build_image.delay(
+        post.image.name, dedup_key=f'thumbnails:{post.image.name}'
+    )
+
+
+def generate(image):
+    """Строит миниатюры из ``settings.POST_THUMBNAILS`` и варианты srcset.
+
+    Возвращает размеры оригинала.
+    """
+    for geometry, options in settings.POST_THUMBNAILS:
+        get_thumbnail(image, geometry, **options)
+    return renditions.generate(image)
+
+
+def waiting(image):
+    """Посты с картинкой без миниатюр или без сохранённых размеров.
+
+    Размеров нет у постов, готовых до появления вариантов srcset.
+    """
+    return Post.objects.filter(image=image).filter(
+        Q(thumbnails_ready=False)
+        | Q(image_width__isnull=True)
+        | Q(image_height__isnull=True)
+    )
+
+
+def complete(image):
+    """Строит миниатюры картинки и отмечает готовыми все её посты.
+
+    Миниатюры общие для всех постов с этой картинкой. Картинку могли
+    заменить во время генерации: такой пост ждёт своей задачи и по
+    фильтру image сюда не попадёт. Возвращает число отмеченных постов.
+    """
+    width, height = generate(image)
+    waiting_posts = list(waiting(image))
+    Post.objects.filter(
+        pk__in=[waiting_post.pk for waiting_post in waiting_posts],
+        image=image,
+    ).update(thumbnails_ready=True, image_width=width, image_height=height)
+    for waiting_post in waiting_posts:
+        cache.invalidate_post(waiting_post)
+    return len(waiting_posts)
+
+
+@task
+def build_image(image):
+    if not waiting(image).exists():
+        return
+    complete(image)
+
+
+@task
+def build(post_id):
+    # Задачи по id поста ставили миграции 0008 и 0009.
+    post = Post.objects.filter(pk=post_id).first()
+    if post is None or not post.image:
+        return
+    complete(post.image.name)
@@ -0,0 +1,189 @@
+"""Персональная лента подписок с раздачей постов при записи.
+
+Новый пост сразу копируется в ленты всех подписчиков автора, а подписка
+подтягивает в ленту последние посты автора. У авторов с очень большим
+числом подписчиков раздача не делается: их посты подмешиваются в ленту
+при чтении. Когда такой автор опускается до порога, задача
+``fan_out_author`` раздаёт подписчикам его последние посты.
+"""
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Q
+
+from core.cache import get_or_compute
+from tasks.queue import task
+
+from .models import Follow, Post, TimelineEntry, UserStats
+
+CELEBRITIES_CACHE_KEY = 'timeline:celebrities'
+CELEBRITIES_CACHE_TIMEOUT = 300
+BATCH_SIZE = 500
+
+
+def celebrity_ids():
+    """Возвращает id авторов, посты которых читаются без раздачи."""
+    return get_or_compute(
+        CELEBRITIES_CACHE_KEY,
+        lambda: frozenset(
+            UserStats.objects.filter(
+                followers_count__gt=settings.TIMELINE_FANOUT_LIMIT
+            ).values_list('user_id', flat=True)
+        ),
+        CELEBRITIES_CACHE_TIMEOUT,
+    )
+
+
+def _bulk_insert(entries):
+    # bulk_create сам собирает всё в список, поэтому большие раздачи
+    # режутся на пачки заранее.
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, BATCH_SIZE))
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раздаёт новый пост в ленты подписчиков автора."""
+    if post.author_id in celebrity_ids():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя последние посты нового автора."""
+    if author_id in celebrity_ids():
+        return
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        'pk', 'pub_date'
+    )[:settings.TIMELINE_BACKFILL_LIMIT]
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for pk, pub_date in posts
+    )
+
+
+def follower_lost(author_id):
+    """Ставит раздачу, если автор после отписки опустился до порога."""
+    if UserStats.objects.filter(
+        user_id=author_id, followers_count=settings.TIMELINE_FANOUT_LIMIT
+    ).exists():
+        fan_out_author.delay(
+            author_id, dedup_key=f'timeline:author:{author_id}'
+        )
+
+
+@task
+def fan_out_author(author_id):
+    """Раздаёт последние посты автора в ленты всех его подписчиков.
+
+    Кэш популярных авторов сбрасывается до раздачи: новые посты дальше
+    раздаёт ``fan_out``, а написанные раньше добавляются здесь.
+    """
+    cache.delete(CELEBRITIES_CACHE_KEY)
+    if author_id in celebrity_ids():
+        return
+    posts = list(
+        Post.objects.filter(author_id=author_id).values_list(
+            'pk', 'pub_date'
+        )[:settings.TIMELINE_BACKFILL_LIMIT]
+    )
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        TimelineEntry(user_id=user_id, post_id=pk, pub_date=pub_date)
+        for user_id in followers.iterator()
+        for pk, pub_date in posts
+    )
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты читателя посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(user):
+    """Пересобирает ленту читателя с нуля."""
+    TimelineEntry.objects.filter(user=user).delete()
+    for author_id in Follow.objects.filter(user=user).values_list(
+        'author_id', flat=True
+    ):
+        backfill(user.pk, author_id)
+
+
+def rebuild_all():
+    """Пересобирает все ленты одним запросом INSERT ... SELECT.
+
+    Последние посты каждого автора выбираются оконной функцией, так что
+    строки лент не проходят через Python.
+    """
+    celebrities = sorted(celebrity_ids())
+    excluded = ''
+    if celebrities:
+        placeholders = ', '.join(['%s'] * len(celebrities))
+        excluded = f'AND follow.author_id NOT IN ({placeholders})'
+    sql = f"""
+        INSERT INTO {TimelineEntry._meta.db_table} (user_id, post_id, pub_date)
+        SELECT follow.user_id, post.id, post.pub_date
+        FROM {Follow._meta.db_table} follow
+        JOIN (
+            SELECT id, author_id, pub_date, ROW_NUMBER() OVER (
+                PARTITION BY author_id ORDER BY pub_date DESC, id DESC
+            ) AS position
+            FROM {Post._meta.db_table}
+        ) post ON post.author_id = follow.author_id
+        WHERE post.position <= %s {excluded}
+    """
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [settings.TIMELINE_BACKFILL_LIMIT, *celebrities]
+            )
+
+
+def feed_for(user):
+    """Возвращает ленту подписок и ключи её сортировки.
+
+    Без подписок на популярных авторов лента — это диапазон индекса
+    ``(user, pub_date, post)`` в таблице записей; иначе к записям
+    подмешиваются посты популярных авторов.
+    """
+    celebrities = celebrity_ids()
+    if celebrities:
+        followed = Follow.objects.filter(
+            user=user, author_id__in=celebrities
+        ).values_list('author_id', flat=True)
+        if followed.exists():
+            entries = TimelineEntry.objects.filter(user=user)
+            posts = Post.objects.for_feed().filter(
+                Q(pk__in=entries.values('post_id'))
+                | Q(author_id__in=followed)
+            )
+            return posts, ('pub_date', 'pk')
+    entries = TimelineEntry.objects.filter(user=user).select_related(
+        'post__author', 'post__group'
+    ).order_by('-pub_date', '-post_id')
+    return entries, ('pub_date', 'post_id')
+
+
+def as_posts(page):
+    """Заменяет записи ленты на странице их постами."""
+    page.object_list = [
+        obj.post if isinstance(obj, TimelineEntry) else obj
+        for obj in page.object_list
+    ]
+    return page
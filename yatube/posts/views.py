@@ -1,69 +1,131 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 from django.views.decorators.http import (
     require_http_methods,
     require_GET,
     require_POST)
 
+from core import cache as versions
+from core.conditional import conditional, per_request
+from core.paginator import CursorPaginator, paginate
+
+from . import cache, timeline
+from .counters import stats_for
 from .forms import PostForm, CommentForm
-from .models import Group, Post, Follow
+from .models import Comment, Group, Post, Follow
 
 User = get_user_model()
 
 
+@per_request
+def _get_group(request, slug):
+    return get_object_or_404(Group, slug=slug)
+
+
+@per_request
+def _get_author(request, username):
+    return get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+
+
+@per_request
+def _get_post(request, post_id):
+    return get_object_or_404(
+        Post.objects.for_feed().select_related('author__stats'),
+        pk=post_id
+    )
+
+
+def _comments_page(post_id, cursor=None):
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    )
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE)
+    return paginator.get_page(cursor)
+
+
+def _index_scopes(request):
+    return [cache.FEED]
+
+
+def _group_scopes(request, slug):
+    return [cache.group_scope(_get_group(request, slug).pk)]
+
+
+def _profile_scopes(request, username):
+    author = _get_author(request, username)
+    return [cache.author_scope(author.pk), cache.profile_scope(author.pk)]
+
+
+def _comments_scopes(request, post_id):
+    return [cache.post_scope(post_id)]
+
+
+def _post_scopes(request, post_id):
+    post = _get_post(request, post_id)
+    return [
+        cache.post_scope(post.pk),
+        cache.group_scope(post.group_id),
+        cache.author_scope(post.author_id),
+    ]
+
+
 @require_http_methods(["GET"])
+@conditional(_index_scopes)
 def index(request):
 
     template = 'posts/index.html'
-    posts = Post.objects.all()
+    posts = Post.objects.for_feed()
+    page_obj = paginate(request, posts, 'index')
 
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-
-    context = {'page_obj': page_obj}
+    context = {
+        'page_obj': page_obj,
+        'cache_version': versions.version_key(cache.FEED),
+    }
 
     return render(request, template, context)
 
 
 @require_GET
+@conditional(_group_scopes)
 def group_posts(request, slug):
 
     template = 'posts/group_list.html'
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    group = _get_group(request, slug)
+    posts = group.posts.for_feed()
+    page_obj = paginate(request, posts, 'group', count=group.posts_count)
 
     context = {
         'group': group,
         'page_obj': page_obj,
+        'cache_version': versions.version_key(cache.group_scope(group.pk)),
     }
 
     return render(request, template, context=context)
 
 
 @require_GET
+@conditional(_profile_scopes)
 def profile(request, username):
 
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    count = posts.count()
-
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    author = _get_author(request, username)
+    posts = author.posts.for_feed()
+    stats = stats_for(author)
+    page_obj = paginate(
+        request, posts, 'profile', count=stats.posts_count
+    )
     following = False
     if request.user.is_authenticated:
         following = Follow.objects.filter(
             user=request.user,
             author=author,
-        )
+        ).exists()
     i_not_auth = True
     if request.user == author:
         i_not_auth = False
@@ -71,23 +133,48 @@ def profile(request, username):
         'author': author,
         'following': following,
         'page_obj': page_obj,
-        'count': count,
+        'count': stats.posts_count,
+        'stats': stats,
         'i_not_auth': i_not_auth,
+        'cache_version': versions.version_key(cache.author_scope(author.pk)),
     }
     return render(request, template, context)
 
 
 @require_http_methods(["GET", "POST"])
+@conditional(_post_scopes)
 def post_detail(request, post_id):
 
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = _get_post(request, post_id)
+    # Первая страница комментариев читается лениво: при попадании во
+    # фрагментный кэш запрос к ним не выполняется.
+    comments = SimpleLazyObject(lambda: _comments_page(post.pk))
     form = CommentForm()
     context = {
         'post': post,
         'form': form,
         'comments': comments,
+        'cache_version': versions.version_key(
+            *_post_scopes(request, post_id)
+        ),
+    }
+    return render(request, template, context)
+
+
+@require_GET
+@conditional(_comments_scopes)
+def post_comments(request, post_id):
+    """Следующая страница комментариев для кнопки «Показать ещё»."""
+    template = 'posts/includes/comment_list.html'
+    comments = _comments_page(post_id, request.GET.get('cursor'))
+    # Пустая страница бывает и у несуществующего поста: для него 404,
+    # как у самого поста. Непустая страница обходится одним запросом.
+    if not comments and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': comments,
     }
     return render(request, template, context)
 
@@ -152,13 +239,11 @@ def add_comment(request, post_id):
 @require_GET
 def follow_index(request):
     template = 'posts/follow.html'
-    posts = Post.objects.filter(
-        author__following__user=request.user
-    )
+    posts, keys = timeline.feed_for(request.user)
     post_exists = posts.exists()
-    paginator = Paginator(posts, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = timeline.as_posts(
+        paginate(request, posts, 'follow', keys=keys)
+    )
 
     context = {
         'post_exists': post_exists,
@@ -172,26 +257,14 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
         return redirect('posts:profile', author)
-    if Follow.objects.filter(user=request.user, author=author).exists():
-        return redirect('posts:profile', username=username)
-    Follow.objects.create(
-        author=author,
-        user=request.user,
-    )
+    # Уникальность пары гарантирует база: get_or_create при гонке
+    # ловит IntegrityError и возвращает уже созданную подписку.
+    Follow.objects.get_or_create(author=author, user=request.user)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    if request.user == author:
-        return redirect('posts:profile', username=username)
-    if not Follow.objects.filter(user=request.user, author=author).exists():
-        return redirect('posts:profile', username=username)
-    follow = get_object_or_404(
-        Follow,
-        author=author,
-        user=request.user,
-    )
-    follow.delete()
+    Follow.objects.filter(author=author, user=request.user).delete()
     return redirect('posts:profile', username=username)
@@ -0,0 +1,206 @@
+"""Хранилища поискового индекса.
+
+На SQLite со сборкой FTS5 термы документов лежат в виртуальной таблице
+``search_fts`` и ранжируются bm25. На остальных базах используется
+обратный индекс в обычных таблицах (``Term`` и ``Posting``) с
+ранжированием TF-IDF. Правило совпадения у обоих одно: все слова
+запроса в одном документе (тексте поста или одном комментарии).
+"""
+import math
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Case, Count, F, FloatField, Sum, Value, When
+
+from core.cache import get_or_compute
+
+from .models import Document, Posting, Term
+
+FTS_TABLE = 'search_fts'
+# Сколько лучших документов FTS5 отбирает на одно место в выдаче:
+# несколько документов (пост и его комментарии) дают один пост.
+CANDIDATES_PER_RESULT = 4
+DOCUMENTS_COUNT_KEY = 'search:documents'
+DOCUMENTS_COUNT_TIMEOUT = 300
+PROGRESS_STEPS = 1000
+# Не больше 999 параметров в запросе SQLite.
+BATCH_SIZE = 500
+_fts_tables = {}
+
+
+def _chunks(items, size=BATCH_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class FTSBackend:
+    """Индекс в таблице SQLite FTS5."""
+
+    def add(self, document, terms):
+        self.remove(document)
+        self.add_many([(document, terms)])
+
+    def add_many(self, items):
+        """Добавляет новые документы: список пар (документ, термы)."""
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [(document.pk, ' '.join(terms)) for document, terms in items],
+            )
+
+    def remove(self, document):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [document.pk]
+            )
+
+    def search(self, terms, limit):
+        match = ' '.join(f'"{term}"' for term in terms)
+        documents = Document._meta.db_table
+        sql = (
+            f'SELECT d.post_id FROM ('
+            f'SELECT rowid, bm25({FTS_TABLE}) AS score FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s ORDER BY score LIMIT %s'
+            f') f JOIN {documents} d ON d.id = f.rowid '
+            f'GROUP BY d.post_id ORDER BY MIN(f.score) LIMIT %s'
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql, [match, limit * CANDIDATES_PER_RESULT, limit]
+            )
+            return [post_id for post_id, in cursor.fetchall()]
+
+
+class IndexBackend:
+    """Обратный индекс в таблицах ``Term`` и ``Posting``."""
+
+    def add(self, document, terms):
+        self.remove(document)
+        self.add_many([(document, terms)])
+
+    def add_many(self, items):
+        """Добавляет новые документы: список пар (документ, термы)."""
+        frequencies = [(document, Counter(terms)) for document, terms in items]
+        documents_count = Counter()
+        for _, counts in frequencies:
+            documents_count.update(counts.keys())
+        Term.objects.bulk_create(
+            (Term(term=term) for term in documents_count),
+            batch_size=BATCH_SIZE,
+            ignore_conflicts=True,
+        )
+        term_ids = {}
+        for chunk in _chunks(list(documents_count)):
+            term_ids.update(
+                Term.objects.filter(term__in=chunk).values_list('term', 'pk')
+            )
+        Posting.objects.bulk_create(
+            (
+                Posting(
+                    term_id=term_ids[term],
+                    document=document,
+                    frequency=min(frequency, 32767),
+                )
+                for document, counts in frequencies
+                for term, frequency in counts.items()
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        by_delta = {}
+        for term, delta in documents_count.items():
+            by_delta.setdefault(delta, []).append(term_ids[term])
+        for delta, ids in by_delta.items():
+            for chunk in _chunks(ids):
+                Term.objects.filter(pk__in=chunk).update(
+                    documents_count=F('documents_count') + delta
+                )
+
+    def remove(self, document):
+        postings = Posting.objects.filter(document=document)
+        Term.objects.filter(
+            pk__in=list(postings.values_list('term_id', flat=True))
+        ).update(documents_count=F('documents_count') - 1)
+        postings.delete()
+
+    def search(self, terms, limit):
+        found = Term.objects.filter(term__in=terms).values_list(
+            'pk', 'documents_count'
+        )
+        if len(found) < len(terms):
+            return []
+        total = get_or_compute(
+            DOCUMENTS_COUNT_KEY,
+            Document.objects.count,
+            DOCUMENTS_COUNT_TIMEOUT,
+        )
+        weights = [
+            When(
+                term_id=pk,
+                then=F('frequency') * Value(
+                    math.log(1 + (total - df + 0.5) / (df + 0.5))
+                ),
+            )
+            for pk, df in found
+        ]
+        # Как и в FTS5, все слова должны быть в одном документе; пост
+        # получает оценку лучшего из своих документов.
+        rows = Posting.objects.filter(
+            term_id__in=[pk for pk, _ in found]
+        ).values('document', 'document__post_id').annotate(
+            matched=Count('term_id'),
+            score=Sum(Case(*weights, output_field=FloatField())),
+        ).filter(matched=len(found)).order_by('-score')[
+            :limit * CANDIDATES_PER_RESULT
+        ]
+        post_ids = dict.fromkeys(row['document__post_id'] for row in rows)
+        return list(post_ids)[:limit]
+
+
+def fts_available():
+    """Есть ли в текущей базе таблица FTS5 (создаётся миграцией)."""
+    name = connection.settings_dict['NAME']
+    if name not in _fts_tables:
+        _fts_tables[name] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[name]
+
+
+def get_backend():
+    choice = settings.SEARCH_BACKEND
+    if choice == 'fts' or choice == 'auto' and fts_available():
+        return FTSBackend()
+    return IndexBackend()
+
+
+@contextmanager
+def time_budget(milliseconds):
+    """Прерывает запросы, не уложившиеся в бюджет времени.
+
+    SQLite прерывается из обработчика прогресса, PostgreSQL — по
+    ``statement_timeout``; в обоих случаях поднимается OperationalError.
+    """
+    if connection.vendor == 'postgresql':
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                'SET LOCAL statement_timeout = %s', [int(milliseconds)]
+            )
+            yield
+        return
+    if connection.vendor != 'sqlite':
+        yield
+        return
+    connection.ensure_connection()
+    deadline = time.monotonic() + milliseconds / 1000
+    raw = connection.connection
+    raw.set_progress_handler(
+        lambda: time.monotonic() > deadline, PROGRESS_STEPS
+    )
+    try:
+        yield
+    finally:
+        raw.set_progress_handler(None, PROGRESS_STEPS)
@@ -0,0 +1,112 @@
+"""Индексация постов и комментариев и поиск по ним."""
+from itertools import islice
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from posts.models import Comment, Post
+
+from .backends import FTS_TABLE, fts_available, get_backend, time_budget
+from .models import Document, Posting, Term
+from .text import terms
+
+MAX_QUERY_TERMS = 8
+BATCH_SIZE = 500
+
+
+def _index(kind, object_id, post_id, text):
+    document_terms = terms(text)
+    document, _ = Document.objects.update_or_create(
+        kind=kind,
+        object_id=object_id,
+        defaults={'post_id': post_id, 'length': len(document_terms)},
+    )
+    get_backend().add(document, document_terms)
+
+
+def index_post(post):
+    _index(Document.POST, post.pk, post.pk, post.text)
+
+
+def index_comment(comment):
+    _index(Document.COMMENT, comment.pk, comment.post_id, comment.text)
+
+
+def unindex_comment(comment):
+    Document.objects.filter(
+        kind=Document.COMMENT, object_id=comment.pk
+    ).delete()
+
+
+def search(query, limit=None):
+    """Ищет посты, в тексте или одном из комментариев которых есть все
+    слова.
+
+    Возвращает ``(id постов по убыванию релевантности, timed_out)``;
+    запрос дольше ``settings.SEARCH_TIME_BUDGET_MS`` прерывается.
+    """
+    query_terms = list(dict.fromkeys(terms(query)))[:MAX_QUERY_TERMS]
+    if not query_terms:
+        return [], False
+    limit = limit or settings.SEARCH_MAX_RESULTS
+    try:
+        with time_budget(settings.SEARCH_TIME_BUDGET_MS):
+            return get_backend().search(query_terms, limit), False
+    except OperationalError as error:
+        message = str(error)
+        if 'interrupted' not in message and 'timeout' not in message:
+            raise
+        return [], True
+
+
+def _index_many(kind, rows):
+    """Индексирует новые документы пачкой: rows — (id, id поста, текст)."""
+    rows = [
+        (object_id, post_id, terms(text)) for object_id, post_id, text in rows
+    ]
+    Document.objects.bulk_create(
+        Document(
+            kind=kind,
+            object_id=object_id,
+            post_id=post_id,
+            length=len(document_terms),
+        )
+        for object_id, post_id, document_terms in rows
+    )
+    # SQLite не возвращает id из bulk_create: дочитываем их.
+    ids = dict(
+        Document.objects.filter(
+            kind=kind, object_id__in=[row[0] for row in rows]
+        ).values_list('object_id', 'pk')
+    )
+    get_backend().add_many([
+        (Document(pk=ids[object_id]), document_terms)
+        for object_id, _, document_terms in rows
+    ])
+
+
+def rebuild():
+    """Строит индекс заново; возвращает число документов."""
+    with connection.cursor() as cursor:
+        if fts_available():
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        for model in (Posting, Term, Document):
+            cursor.execute(f'DELETE FROM {model._meta.db_table}')
+    sources = (
+        (Document.POST, Post.objects.values_list('pk', 'pk', 'text')),
+        (
+            Document.COMMENT,
+            Comment.objects.values_list('pk', 'post_id', 'text'),
+        ),
+    )
+    indexed = 0
+    for kind, rows in sources:
+        rows = rows.order_by().iterator(chunk_size=BATCH_SIZE)
+        while True:
+            batch = list(islice(rows, BATCH_SIZE))
+            if not batch:
+                break
+            with transaction.atomic():
+                _index_many(kind, batch)
+            indexed += len(batch)
+    return indexed
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from search import index
+from search.backends import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Строит поисковый индекс постов и комментариев заново'
+
+    def handle(self, *args, **options):
+        indexed = index.rebuild()
+        backend = type(get_backend()).__name__
+        self.stdout.write(
+            self.style.SUCCESS(f'Проиндексировано документов: {indexed} '
+                               f'({backend})')
+        )
@@ -0,0 +1,83 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:05
+
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.utils import OperationalError
+
+
+def create_fts(apps, schema_editor):
+    # FTS5 есть не во всех сборках SQLite: без него поиск работает по
+    # обратному индексу в таблицах Term и Posting.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    try:
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE search_fts USING fts5(body)'
+        )
+    except OperationalError:
+        pass
+
+
+def drop_fts(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS search_fts')
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('posts', '0008_thumbnail_tasks'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Document',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('post', 'Пост'), ('comment', 'Комментарий')], max_length=10, verbose_name='Тип')),
+                ('object_id', models.PositiveIntegerField(verbose_name='Id объекта')),
+                ('length', models.PositiveIntegerField(default=0, verbose_name='Число термов')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_documents', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Документ поиска',
+                'verbose_name_plural': 'Документы поиска',
+            },
+        ),
+        migrations.CreateModel(
+            name='Term',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, unique=True, verbose_name='Терм')),
+                ('documents_count', models.PositiveIntegerField(default=0, verbose_name='Число документов')),
+            ],
+            options={
+                'verbose_name': 'Терм',
+                'verbose_name_plural': 'Термы',
+            },
+        ),
+        migrations.CreateModel(
+            name='Posting',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('frequency', models.PositiveSmallIntegerField(verbose_name='Частота')),
+                ('document', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='search.Document', verbose_name='Документ')),
+                ('term', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='search.Term', verbose_name='Терм')),
+            ],
+            options={
+                'verbose_name': 'Вхождение',
+                'verbose_name_plural': 'Вхождения',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='posting',
+            constraint=models.UniqueConstraint(fields=('term', 'document'), name='unique_posting'),
+        ),
+        migrations.AddConstraint(
+            model_name='document',
+            constraint=models.UniqueConstraint(fields=('kind', 'object_id'), name='unique_search_document'),
+        ),
+        migrations.RunPython(create_fts, drop_fts),
+    ]
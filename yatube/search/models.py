@@ -0,0 +1,77 @@
+from django.db import models
+
+from posts.models import Post
+
+
+class Document(models.Model):
+    """Проиндексированный текст поста или комментария.
+
+    Результат поиска — пост, поэтому документ комментария тоже ссылается
+    на свой пост.
+    """
+    POST = 'post'
+    COMMENT = 'comment'
+    KINDS = (
+        (POST, 'Пост'),
+        (COMMENT, 'Комментарий'),
+    )
+
+    kind = models.CharField('Тип', max_length=10, choices=KINDS)
+    object_id = models.PositiveIntegerField('Id объекта')
+    post = models.ForeignKey(
+        Post,
+        related_name='search_documents',
+        on_delete=models.CASCADE,
+        verbose_name='Пост'
+    )
+    length = models.PositiveIntegerField('Число термов', default=0)
+
+    class Meta:
+        verbose_name = 'Документ поиска'
+        verbose_name_plural = 'Документы поиска'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'object_id'],
+                name='unique_search_document'
+            ),
+        ]
+
+
+class Term(models.Model):
+    """Терм обратного индекса и число документов с ним."""
+    term = models.CharField('Терм', max_length=64, unique=True)
+    documents_count = models.PositiveIntegerField(
+        'Число документов',
+        default=0
+    )
+
+    class Meta:
+        verbose_name = 'Терм'
+        verbose_name_plural = 'Термы'
+
+
+class Posting(models.Model):
+    """Вхождение терма в документ (для баз без FTS5)."""
+    term = models.ForeignKey(
+        Term,
+        related_name='postings',
+        on_delete=models.CASCADE,
+        verbose_name='Терм'
+    )
+    document = models.ForeignKey(
+        Document,
+        related_name='postings',
+        on_delete=models.CASCADE,
+        verbose_name='Документ'
+    )
+    frequency = models.PositiveSmallIntegerField('Частота')
+
+    class Meta:
+        verbose_name = 'Вхождение'
+        verbose_name_plural = 'Вхождения'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'document'],
+                name='unique_posting'
+            ),
+        ]
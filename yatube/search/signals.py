@@ -0,0 +1,32 @@
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from posts.models import Comment, Post
+
+from . import index
+from .backends import get_backend
+from .models import Document
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index.index_post(instance)
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, raw=False, **kwargs):
+    if not raw:
+        index.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    index.unindex_comment(instance)
+
+
+@receiver(pre_delete, sender=Document)
+def document_deleting(sender, instance, **kwargs):
+    # Документы поста удаляются каскадом вместе с ним: убираем их термы
+    # из индекса, пока строки ещё на месте.
+    get_backend().remove(instance)
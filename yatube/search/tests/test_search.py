@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+
+from .. import index
+from ..backends import FTSBackend, IndexBackend, get_backend
+
+User = get_user_model()
+
+
+class FTSSearchTest(TestCase):
+    backend = FTSBackend
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.fish = Post.objects.create(
+            author=cls.author, text='Коты любят рыбу'
+        )
+        cls.dog = Post.objects.create(
+            author=cls.author, text='Собака гоняет кота'
+        )
+        cls.python = Post.objects.create(
+            author=cls.author, text='Про программирование на Python'
+        )
+        cls.comment = Comment.objects.create(
+            post=cls.python, author=cls.author, text='Котами полон интернет'
+        )
+
+    def found(self, query):
+        post_ids, timed_out = index.search(query)
+        self.assertFalse(timed_out)
+        return post_ids
+
+    def test_backend(self):
+        """Используется ожидаемое хранилище индекса"""
+        self.assertIsInstance(get_backend(), self.backend)
+
+    def test_stemmed_search(self):
+        """Находятся все формы слова в постах и комментариях"""
+        self.assertCountEqual(
+            self.found('кот'),
+            [self.fish.pk, self.dog.pk, self.python.pk],
+        )
+        self.assertEqual(self.found('КОШКА'), [])
+        self.assertEqual(self.found('!!!'), [])
+
+    def test_all_words_required(self):
+        """Пост должен содержать все слова запроса"""
+        self.assertEqual(self.found('кот рыба'), [self.fish.pk])
+
+    def test_words_in_one_document(self):
+        """Слова поста и его комментария вместе не дают совпадения"""
+        self.assertEqual(self.found('программирование интернет'), [])
+        self.assertEqual(self.found('кот интернет'), [self.python.pk])
+
+    def test_ranking(self):
+        """Пост с частым упоминанием слова выше в выдаче"""
+        cats = Post.objects.create(author=self.author, text='кот кот кот')
+        self.assertEqual(self.found('коты')[0], cats.pk)
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при правке и удалении"""
+        fish = Post.objects.get(pk=self.fish.pk)
+        fish.text = 'Собаки любят мясо'
+        fish.save()
+        self.assertEqual(self.found('рыба'), [])
+        self.assertCountEqual(
+            self.found('собака'), [self.fish.pk, self.dog.pk]
+        )
+        Comment.objects.get(pk=self.comment.pk).delete()
+        self.assertNotIn(self.python.pk, self.found('кот'))
+        Post.objects.get(pk=self.dog.pk).delete()
+        self.assertEqual(self.found('собака'), [self.fish.pk])
+
+    def test_rebuild(self):
+        """Перестроение индекса сохраняет результаты"""
+        before = self.found('кот')
+        self.assertEqual(index.rebuild(), 4)
+        self.assertCountEqual(self.found('кот'), before)
+
+    @mock.patch('search.backends.PROGRESS_STEPS', 1)
+    @override_settings(SEARCH_TIME_BUDGET_MS=-1)
+    def test_time_budget(self):
+        """Запрос дольше бюджета прерывается"""
+        self.assertEqual(index.search('кот'), ([], True))
+
+    def test_views(self):
+        """Страница и API поиска отдают найденные посты"""
+        client = Client()
+        response = client.get(reverse('search:search'), {'q': 'рыбу'})
+        self.assertEqual(list(response.context['posts']), [self.fish])
+        response = client.get(
+            reverse('search:api'), {'q': 'питон python', 'limit': 5}
+        )
+        self.assertEqual(response.json()['results'], [])
+        response = client.get(reverse('search:api'), {'q': 'python'})
+        result, = response.json()['results']
+        self.assertEqual(result['id'], self.python.pk)
+        self.assertEqual(result['author'], 'author')
+
+
+@override_settings(SEARCH_BACKEND='index')
+class IndexSearchTest(FTSSearchTest):
+    backend = IndexBackend
+
+
+class AdminSearchTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@example.com', 'password'
+        )
+        for text in ('Коты любят рыбу', 'Собака гоняет кота'):
+            Post.objects.create(author=cls.admin, text=text)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def search(self, query):
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': query}
+        )
+        return response, [str(m) for m in response.context['messages']]
+
+    @mock.patch('posts.admin.ADMIN_SEARCH_LIMIT', 1)
+    def test_truncated_results_are_reported(self):
+        """Админка предупреждает, что выдача обрезана"""
+        response, messages = self.search('кот')
+        self.assertEqual(response.context['cl'].result_count, 1)
+        self.assertEqual(len(messages), 1)
+        self.assertIn('первые 1', messages[0])
+
+    @mock.patch('search.backends.PROGRESS_STEPS', 1)
+    @override_settings(SEARCH_TIME_BUDGET_MS=-1)
+    def test_timeout_is_reported(self):
+        """Админка предупреждает, что поиск не уложился во время"""
+        _, messages = self.search('кот')
+        self.assertEqual(len(messages), 1)
+        self.assertIn('не уложился', messages[0])
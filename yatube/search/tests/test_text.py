@@ -0,0 +1,26 @@
+from django.test import SimpleTestCase
+
+from ..text import stem, terms
+
+
+class TextTest(SimpleTestCase):
+    def test_stem(self):
+        """Формы слова сводятся к одной основе"""
+        cases = {
+            'кот': ('кот', 'кота', 'коты', 'котами'),
+            'книг': ('книги', 'книгой', 'книгах'),
+            'подписа': ('подписаться', 'подписался'),
+            'возможн': ('возможность', 'возможности'),
+            'красив': ('красивейший', 'красивые'),
+        }
+        for expected, words in cases.items():
+            for word in words:
+                with self.subTest(word=word):
+                    self.assertEqual(stem(word), expected)
+
+    def test_terms(self):
+        """Текст разбивается на термы в нижнем регистре без ё"""
+        self.assertEqual(
+            terms('Ёжики бегали по Django-проекту, 2024 г.'),
+            ['ежик', 'бега', 'по', 'django', 'проект', '2024'],
+        )
@@ -0,0 +1,135 @@
+"""Разбиение текста на термы и стемминг для русского языка.
+
+Стеммер — алгоритм Портера (Snowball) для русского: отрезает окончания
+внутри области RV, поэтому «котами», «кота» и «коты» дают один терм.
+"""
+import re
+from functools import lru_cache
+
+TOKEN_RE = re.compile(r'\w+')
+CYRILLIC_RE = re.compile('[а-я]')
+MAX_TERM_LENGTH = 64
+VOWELS = 'аеиоуыэюя'
+
+
+def _endings(after_a, other):
+    """Окончания от длинных к коротким с флагом «после а/я»."""
+    endings = [(ending, True) for ending in after_a]
+    endings += [(ending, False) for ending in other]
+    return sorted(endings, key=lambda item: -len(item[0]))
+
+
+PERFECTIVE_GERUND = _endings(
+    ('в', 'вши', 'вшись'),
+    ('ив', 'ивши', 'ившись', 'ыв', 'ывши', 'ывшись'),
+)
+REFLEXIVE = _endings((), ('ся', 'сь'))
+ADJECTIVE = _endings((), (
+    'ее', 'ие', 'ые', 'ое', 'ими', 'ыми', 'ей', 'ий', 'ый', 'ой', 'ем',
+    'им', 'ым', 'ом', 'его', 'ого', 'ему', 'ому', 'их', 'ых', 'ую', 'юю',
+    'ая', 'яя', 'ою', 'ею',
+))
+PARTICIPLE = _endings(
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+VERB = _endings(
+    (
+        'ла', 'на', 'ете', 'йте', 'ли', 'й', 'л', 'ем', 'н', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'ешь', 'нно',
+    ),
+    (
+        'ила', 'ыла', 'ена', 'ейте', 'уйте', 'ите', 'или', 'ыли', 'ей',
+        'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ило', 'ыло', 'ено', 'ят',
+        'ует', 'уют', 'ит', 'ыт', 'ены', 'ить', 'ыть', 'ишь', 'ую', 'ю',
+    ),
+)
+NOUN = _endings((), (
+    'а', 'ев', 'ов', 'ие', 'ье', 'е', 'иями', 'ями', 'ами', 'еи', 'ии',
+    'и', 'ией', 'ей', 'ой', 'ий', 'й', 'иям', 'ям', 'ием', 'ем', 'ам',
+    'ом', 'о', 'у', 'ах', 'иях', 'ях', 'ы', 'ь', 'ию', 'ью', 'ю', 'ия',
+    'ья', 'я',
+))
+SUPERLATIVE = ('ейше', 'ейш')
+DERIVATIONAL = ('ость', 'ост')
+
+
+def _strip(rv, endings):
+    """Отрезает самое длинное подходящее окончание или возвращает None.
+
+    Окончания с флагом должны идти после «а» или «я» внутри RV.
+    """
+    for ending, after_a in endings:
+        if not rv.endswith(ending):
+            continue
+        stem = rv[:-len(ending)]
+        if after_a and not stem.endswith(('а', 'я')):
+            continue
+        return stem
+    return None
+
+
+def _after_vowel_consonant(word, start):
+    for i in range(start + 1, len(word)):
+        if word[i - 1] in VOWELS and word[i] not in VOWELS:
+            return i + 1
+    return len(word)
+
+
+def _strip_inflection(rv):
+    stripped = _strip(rv, PERFECTIVE_GERUND)
+    if stripped is not None:
+        return stripped
+    reflexive = _strip(rv, REFLEXIVE)
+    if reflexive is not None:
+        rv = reflexive
+    adjective = _strip(rv, ADJECTIVE)
+    if adjective is not None:
+        participle = _strip(adjective, PARTICIPLE)
+        return adjective if participle is None else participle
+    for endings in (VERB, NOUN):
+        stripped = _strip(rv, endings)
+        if stripped is not None:
+            return stripped
+    return rv
+
+
+def _strip_superlative(rv):
+    for ending in SUPERLATIVE:
+        if rv.endswith(ending):
+            rv = rv[:-len(ending)]
+            return rv[:-1] if rv.endswith('нн') else rv
+    if rv.endswith('нн') or rv.endswith('ь'):
+        return rv[:-1]
+    return rv
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    """Возвращает основу русского слова."""
+    rv_start = next(
+        (i + 1 for i, ch in enumerate(word) if ch in VOWELS), len(word)
+    )
+    r2 = _after_vowel_consonant(
+        word, _after_vowel_consonant(word, 0)
+    )
+    rv = _strip_inflection(word[rv_start:])
+    if rv.endswith('и'):
+        rv = rv[:-1]
+    for ending in DERIVATIONAL:
+        if rv.endswith(ending) and rv_start + len(rv) - len(ending) >= r2:
+            rv = rv[:-len(ending)]
+            break
+    return word[:rv_start] + _strip_superlative(rv)
+
+
+def terms(text):
+    """Разбивает текст на термы: нижний регистр, ё→е, стемминг."""
+    result = []
+    for token in TOKEN_RE.findall(text.lower().replace('ё', 'е')):
+        if len(token) < 2:
+            continue
+        if CYRILLIC_RE.search(token):
+            token = stem(token)
+        result.append(token[:MAX_TERM_LENGTH])
+    return result
@@ -0,0 +1,57 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import render
+from django.urls import reverse
+from django.views.decorators.http import require_GET
+
+from posts.models import Post
+
+from . import index
+
+
+def _found_posts(request, limit):
+    query = request.GET.get('q', '').strip()
+    post_ids, timed_out = index.search(query, limit)
+    posts = Post.objects.for_feed().in_bulk(post_ids)
+    return query, [posts[pk] for pk in post_ids if pk in posts], timed_out
+
+
+@require_GET
+def search(request):
+    template = 'search/results.html'
+    query, posts, timed_out = _found_posts(
+        request, settings.SEARCH_MAX_RESULTS
+    )
+    context = {
+        'query': query,
+        'posts': posts,
+        'timed_out': timed_out,
+    }
+    return render(request, template, context)
+
+
+@require_GET
+def search_api(request):
+    try:
+        limit = int(request.GET.get('limit', settings.SEARCH_MAX_RESULTS))
+    except ValueError:
+        limit = settings.SEARCH_MAX_RESULTS
+    limit = max(1, min(limit, settings.SEARCH_MAX_RESULTS))
+    query, posts, timed_out = _found_posts(request, limit)
+    return JsonResponse({
+        'query': query,
+        'timed_out': timed_out,
+        'results': [
+            {
+                'id': post.pk,
+                'text': post.text,
+                'author': post.author.username,
+                'group': post.group.slug if post.group else None,
+                'pub_date': post.pub_date.isoformat(),
+                'url': request.build_absolute_uri(
+                    reverse('posts:post_detail', args=[post.pk])
+                ),
+            }
+            for post in posts
+        ],
+    })
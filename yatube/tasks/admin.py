@@ -0,0 +1,39 @@
+from django.contrib import admin
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = (
+        'pk',
+        'name',
+        'status',
+        'attempts',
+        'run_at',
+        'last_error',
+    )
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'dedup_key')
+    actions = ('retry',)
+
+    def retry(self, request, queryset):
+        for pk in queryset.filter(status=Task.FAILED).values_list(
+            'pk', flat=True
+        ):
+            try:
+                with transaction.atomic():
+                    Task.objects.filter(pk=pk).update(
+                        status=Task.QUEUED,
+                        attempts=0,
+                        run_at=timezone.now(),
+                        locked_until=None,
+                    )
+            except IntegrityError:
+                # Такая же задача уже стоит в очереди.
+                pass
+    retry.short_description = 'Повторить упавшие задачи'
+
+
+admin.site.register(Task, TaskAdmin)
@@ -0,0 +1,68 @@
+"""Отправка писем через очередь задач.
+
+``QueuedEmailBackend`` только ставит письмо в очередь, а отправляет его
+обработчик через настоящий бэкенд ``settings.TASKS_EMAIL_BACKEND``.
+"""
+import base64
+from email.mime.base import MIMEBase
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .queue import task
+
+
+def _attachment(attachment):
+    if isinstance(attachment, MIMEBase):
+        raise ValueError('Вложение MIMEBase нельзя поставить в очередь')
+    filename, content, mimetype = attachment
+    if isinstance(content, bytes):
+        return [filename, base64.b64encode(content).decode(), mimetype, True]
+    return [filename, content, mimetype, False]
+
+
+def serialize(message):
+    """Превращает письмо в JSON-совместимый словарь."""
+    return {
+        'subject': message.subject,
+        'body': message.body,
+        'from_email': message.from_email,
+        'to': message.to,
+        'cc': message.cc,
+        'bcc': message.bcc,
+        'reply_to': message.reply_to,
+        'headers': message.extra_headers,
+        'alternatives': getattr(message, 'alternatives', []),
+        'attachments': [
+            _attachment(attachment) for attachment in message.attachments
+        ],
+    }
+
+
+def deserialize(data):
+    alternatives = data.pop('alternatives')
+    attachments = data.pop('attachments')
+    message = EmailMultiAlternatives(**data)
+    for content, mimetype in alternatives:
+        message.attach_alternative(content, mimetype)
+    for filename, content, mimetype, encoded in attachments:
+        if encoded:
+            content = base64.b64decode(content)
+        message.attach(filename, content, mimetype)
+    return message
+
+
+@task
+def send_email(data):
+    connection = get_connection(settings.TASKS_EMAIL_BACKEND)
+    connection.send_messages([deserialize(data)])
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Почтовый бэкенд, который откладывает отправку в очередь задач."""
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            send_email.delay(serialize(message))
+        return len(email_messages)
@@ -0,0 +1,81 @@
+import multiprocessing
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from tasks import queue
+
+
+def _loop(batch, sleep, once, stop):
+    """Цикл обработчика: берёт порции задач, пока не попросят остановиться."""
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    done = failed = 0
+    try:
+        while not stop.is_set():
+            ok, errors = queue.work(batch)
+            done += ok
+            failed += errors
+            if not (ok or errors):
+                if once:
+                    break
+                stop.wait(sleep)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        connections.close_all()
+    return done, failed
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes', type=int, default=settings.TASKS_WORKER_PROCESSES,
+            help='Число процессов-обработчиков'
+        )
+        parser.add_argument(
+            '--batch', type=int, default=10,
+            help='Сколько задач процесс забирает за раз'
+        )
+        parser.add_argument(
+            '--sleep', type=float, default=1.0,
+            help='Пауза при пустой очереди, секунд'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Завершиться, когда очередь опустеет'
+        )
+
+    def handle(self, *args, **options):
+        batch, sleep = options['batch'], options['sleep']
+        once = options['once']
+        if options['processes'] <= 1:
+            done, failed = _loop(
+                batch, sleep, once, multiprocessing.Event()
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f'Выполнено: {done}, с ошибкой: {failed}')
+            )
+            return
+        # Соединения с базой нельзя делить между процессами: закрываем
+        # их до fork, каждый обработчик откроет своё.
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        workers = [
+            context.Process(target=_loop, args=(batch, sleep, once, stop))
+            for _ in range(options['processes'])
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            stop.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS('Обработчики остановлены'))
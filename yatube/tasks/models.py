@@ -0,0 +1,60 @@
+from django.db import models
+from django.db.models import Q
+
+
+class Task(models.Model):
+    """Отложенный вызов функции, который выполнит ``runworker``.
+
+    Выполненные задачи удаляются; в таблице остаются ждущие, занятые
+    обработчиками и окончательно упавшие.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=200)
+    args = models.TextField('Аргументы (JSON)', default='[]')
+    dedup_key = models.CharField(
+        'Ключ дедупликации',
+        max_length=200,
+        null=True,
+        blank=True
+    )
+    status = models.CharField(
+        'Статус',
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED
+    )
+    run_at = models.DateTimeField('Выполнить после')
+    locked_until = models.DateTimeField('Занята до', null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Поставлена', auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
+
+    class Meta:
+        verbose_name = 'Задача'
+        verbose_name_plural = 'Задачи'
+        constraints = [
+            # Одинаковая задача стоит в очереди не больше одного раза;
+            # уже выполняющаяся не мешает поставить следующую.
+            models.UniqueConstraint(
+                fields=['dedup_key'],
+                condition=Q(status='queued'),
+                name='unique_queued_task'
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=['status', 'run_at'],
+                name='task_status_run_at_idx'
+            ),
+        ]
@@ -0,0 +1,172 @@
+"""Очередь фоновых задач в базе данных.
+
+Функция объявляется задачей декоратором ``@task`` и ставится в очередь
+вызовом ``func.delay(*args)``; аргументы должны сериализоваться в JSON.
+Задачу выполняет команда ``runworker``. Обработчик забирает задачу
+условным UPDATE и держит её до ``locked_until``: если он умрёт, задача
+снова станет видна другим (visibility timeout).
+"""
+import json
+import logging
+import random
+from datetime import timedelta
+from functools import update_wrapper
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+
+class TaskFunction:
+    """Функция-задача: вызывается как обычно или ставится в очередь."""
+
+    def __init__(self, func, max_attempts=None, backoff=None):
+        update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__qualname__}'
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+
+    def __call__(self, *args):
+        return self.func(*args)
+
+    def delay(self, *args, dedup_key=None, countdown=0):
+        return enqueue(
+            self.name, args, dedup_key=dedup_key, countdown=countdown
+        )
+
+
+def task(func=None, *, max_attempts=None, backoff=None):
+    """Декоратор ``@task`` или ``@task(max_attempts=..., backoff=...)``."""
+    def decorator(func):
+        return TaskFunction(func, max_attempts, backoff)
+    return decorator if func is None else decorator(func)
+
+
+def enqueue(name, args=(), dedup_key=None, countdown=0):
+    """Ставит задачу в очередь.
+
+    Если задача с тем же ``dedup_key`` уже ждёт выполнения, новая не
+    создаётся и возвращается стоящая в очереди.
+    """
+    fields = {
+        'name': name,
+        'args': json.dumps(list(args)),
+        'dedup_key': dedup_key,
+        'run_at': timezone.now() + timedelta(seconds=countdown),
+    }
+    if dedup_key is None:
+        return Task.objects.create(**fields)
+    while True:
+        try:
+            with transaction.atomic():
+                return Task.objects.create(**fields)
+        except IntegrityError:
+            queued = Task.objects.filter(
+                dedup_key=dedup_key, status=Task.QUEUED
+            ).first()
+            # Дубль могли забрать в работу между INSERT и SELECT.
+            if queued is not None:
+                return queued
+
+
+def _available(now):
+    return (
+        Q(status=Task.QUEUED, run_at__lte=now)
+        | Q(status=Task.RUNNING, locked_until__lt=now)
+    )
+
+
+def claim(limit):
+    """Забирает в работу до limit готовых к выполнению задач.
+
+    Блокировка у всех задач одна, на ``TASKS_VISIBILITY_TIMEOUT``
+    секунд: забранное нужно успеть выполнить за это время.
+    """
+    now = timezone.now()
+    lock = now + timedelta(seconds=settings.TASKS_VISIBILITY_TIMEOUT)
+    candidates = list(
+        Task.objects.filter(_available(now)).order_by(
+            'run_at'
+        ).values_list('pk', flat=True)[:limit]
+    )
+    claimed = [
+        pk for pk in candidates
+        if Task.objects.filter(_available(now), pk=pk).update(
+            status=Task.RUNNING,
+            locked_until=lock,
+            attempts=F('attempts') + 1,
+        )
+    ]
+    return list(Task.objects.filter(pk__in=claimed).order_by('run_at'))
+
+
+def _retry_delay(func, attempts):
+    # Экспоненциальная пауза с разбросом, чтобы повторы не шли пачкой.
+    backoff = getattr(func, 'backoff', None) or settings.TASKS_RETRY_BACKOFF
+    return backoff * 2 ** (attempts - 1) * random.uniform(1, 1.5)
+
+
+def _fail(job, func, error):
+    max_attempts = (
+        getattr(func, 'max_attempts', None) or settings.TASKS_MAX_ATTEMPTS
+    )
+    rows = Task.objects.filter(pk=job.pk, locked_until=job.locked_until)
+    if job.attempts >= max_attempts:
+        rows.update(
+            status=Task.FAILED, locked_until=None, last_error=str(error)
+        )
+        return
+    run_at = timezone.now() + timedelta(
+        seconds=_retry_delay(func, job.attempts)
+    )
+    try:
+        with transaction.atomic():
+            rows.update(
+                status=Task.QUEUED,
+                run_at=run_at,
+                locked_until=None,
+                last_error=str(error),
+            )
+    except IntegrityError:
+        # В очереди уже стоит такая же задача: она и сделает работу.
+        rows.delete()
+
+
+def run(job):
+    """Выполняет забранную задачу; возвращает True при успехе."""
+    func = None
+    try:
+        func = import_string(job.name)
+        func(*json.loads(job.args))
+    except Exception as error:
+        logger.exception('Задача %s упала', job)
+        _fail(job, func, error)
+        return False
+    Task.objects.filter(pk=job.pk, locked_until=job.locked_until).delete()
+    return True
+
+
+def work(limit=10):
+    """Выполняет до limit задач; возвращает (успешных, неудачных).
+
+    Задачи забираются по одной прямо перед выполнением: иначе конец
+    медленной порции дождался бы истечения блокировки и его выполнил
+    бы ещё и другой обработчик.
+    """
+    done = failed = 0
+    for _ in range(limit):
+        jobs = claim(1)
+        if not jobs:
+            break
+        if run(jobs[0]):
+            done += 1
+        else:
+            failed += 1
+    return done, failed
@@ -0,0 +1,125 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core import mail
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import queue
+from ..models import Task
+
+CALLS = []
+
+
+@queue.task
+def record(*args):
+    CALLS.append(args)
+
+
+@queue.task
+def check_queued():
+    CALLS.append(tuple(
+        Task.objects.order_by('pk').values_list('status', flat=True)
+    ))
+
+
+@queue.task(max_attempts=2, backoff=60)
+def explode():
+    raise RuntimeError('сломалось')
+
+
+class QueueTest(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_delay_and_work(self):
+        """Задача выполняется обработчиком с аргументами и удаляется"""
+        record.delay(1, 'два')
+        self.assertEqual(CALLS, [])
+        self.assertEqual(queue.work(), (1, 0))
+        self.assertEqual(CALLS, [(1, 'два')])
+        self.assertFalse(Task.objects.exists())
+
+    def test_countdown(self):
+        """Отложенная задача не выполняется раньше срока"""
+        record.delay(countdown=60)
+        self.assertEqual(queue.work(), (0, 0))
+
+    def test_dedup_key(self):
+        """Задача с тем же ключом не ставится, пока первая ждёт"""
+        first = record.delay(1, dedup_key='same')
+        self.assertEqual(record.delay(1, dedup_key='same'), first)
+        self.assertEqual(Task.objects.count(), 1)
+        queue.claim(10)
+        record.delay(1, dedup_key='same')
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_retry_with_backoff(self):
+        """Упавшая задача повторяется с паузой, затем помечается ошибкой"""
+        explode.delay()
+        self.assertEqual(queue.work(), (0, 1))
+        job = Task.objects.get()
+        self.assertEqual(job.status, Task.QUEUED)
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.last_error, 'сломалось')
+        self.assertGreaterEqual(
+            job.run_at, timezone.now() + timedelta(seconds=59)
+        )
+        self.assertEqual(queue.work(), (0, 0))
+        Task.objects.update(run_at=timezone.now())
+        self.assertEqual(queue.work(), (0, 1))
+        self.assertEqual(Task.objects.get().status, Task.FAILED)
+
+    def test_visibility_timeout(self):
+        """Задачу упавшего обработчика забирают после таймаута"""
+        record.delay(1)
+        self.assertEqual(len(queue.claim(10)), 1)
+        self.assertEqual(queue.claim(10), [])
+        Task.objects.update(locked_until=timezone.now() - timedelta(1))
+        job, = queue.claim(10)
+        self.assertEqual(job.attempts, 2)
+
+    def test_tasks_are_claimed_one_at_a_time(self):
+        """Следующая задача порции не заблокирована, пока идёт текущая"""
+        check_queued.delay()
+        check_queued.delay()
+        self.assertEqual(queue.work(), (2, 0))
+        self.assertEqual(CALLS, [
+            (Task.RUNNING, Task.QUEUED),
+            (Task.RUNNING,),
+        ])
+
+    def test_runworker_once(self):
+        """runworker --once выполняет очередь и завершается"""
+        record.delay(1)
+        record.delay(2)
+        out = StringIO()
+        call_command('runworker', processes=1, once=True, stdout=out)
+        self.assertEqual(sorted(CALLS), [(1,), (2,)])
+        self.assertIn('Выполнено: 2', out.getvalue())
+
+
+@override_settings(
+    EMAIL_BACKEND='tasks.mail.QueuedEmailBackend',
+    TASKS_EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+)
+class QueuedEmailTest(TestCase):
+    def test_email_is_sent_by_worker(self):
+        """Письмо ставится в очередь и отправляется обработчиком"""
+        message = mail.EmailMultiAlternatives(
+            'Тема', 'Текст', 'from@example.com', ['to@example.com']
+        )
+        message.attach_alternative('<b>Текст</b>', 'text/html')
+        message.attach('data.bin', b'\x00\x01', 'application/octet-stream')
+        message.send()
+        self.assertEqual(mail.outbox, [])
+        self.assertEqual(queue.work(), (1, 0))
+        sent, = mail.outbox
+        self.assertEqual(sent.subject, 'Тема')
+        self.assertEqual(sent.to, ['to@example.com'])
+        self.assertEqual(sent.alternatives, [('<b>Текст</b>', 'text/html')])
+        self.assertEqual(
+            sent.attachments,
+            [('data.bin', b'\x00\x01', 'application/octet-stream')],
+        )
@@ -1,4 +1,8 @@
+import atexit
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -27,11 +31,16 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'tasks.apps.TasksConfig',
+    'search.apps.SearchConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.PrimaryPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -45,7 +54,7 @@ ROOT_URLCONF = 'yatube.urls'
 TEMPLATES_DIR = f'{BASE_DIR}/yatube/templates'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.template_backends.TimedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,14 +75,47 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# core.sqlite_backend — sqlite3 с WAL, PRAGMA из OPTIONS['pragmas'],
+# проверкой постоянных соединений и очередью записи внутри процесса.
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
+        'ENGINE': 'core.sqlite_backend',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {
+            'pragmas': {
+                'journal_mode': 'WAL',
+                'synchronous': 'NORMAL',
+                'busy_timeout': 5000,
+                'cache_size': -64000,
+                'mmap_size': 268435456,
+            },
+        },
     }
 }
 
 
+# Реплики только для чтения: пути к копиям базы через запятую в
+# YATUBE_DB_REPLICAS. В тестах реплики зеркалируют default.
+DATABASE_REPLICAS = []
+for number, path in enumerate(
+    filter(None, os.getenv('YATUBE_DB_REPLICAS', '').split(',')), 1
+):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'core.sqlite_backend',
+        'NAME': f'file:{path}?mode=ro',
+        'CONN_MAX_AGE': 600,
+        'OPTIONS': {'pragmas': {'journal_mode': None}},
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Приложения, чтение моделей которых можно отдавать репликам, и сколько
+# секунд после записи пользователь читает только из основной базы.
+REPLICA_READ_APPS = ('posts', 'auth', 'search')
+REPLICA_PIN_SECONDS = 5
+
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
 
@@ -114,22 +156,145 @@ STATIC_URL = '/static/'
 STATICFILES_DIRS = [
     f'{BASE_DIR}/yatube/static'
 ]
+STATIC_ROOT = os.path.join(BASE_DIR, 'static')
+# collectstatic пишет файлы с хэшем в имени, манифест и сжатые копии
+# .gz/.br, которые отдаёт core.serving.FileServer из yatube.wsgi.
+STATICFILES_STORAGE = 'core.staticfiles.CompressedManifestStaticFilesStorage'
+# Файлы с хэшем содержимого в имени кэшируются навсегда, остальные —
+# на SERVE_MAX_AGE секунд с проверкой по ETag.
+SERVE_MAX_AGE = 60
+SERVE_IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
 
 DEFAULT_AUTO_FIELD = 'django.db.models.AutoField'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+# Письма уходят через очередь задач (runworker), а отправляет их
+# TASKS_EMAIL_BACKEND.
+EMAIL_BACKEND = 'tasks.mail.QueuedEmailBackend'
+TASKS_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent+emails')
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
+# Файлы лежат под хэшем содержимого: одинаковые картинки хранятся и
+# обрабатываются один раз. Старые имена переносит manage.py migrate_media.
+DEFAULT_FILE_STORAGE = 'core.storage.ContentAddressedStorage'
+
+# Загрузки пишутся на диск кусками; больше лимитов файл не принимается,
+# а картинка проверяется по заголовку до полной проверки Pillow.
+FILE_UPLOAD_HANDLERS = ['core.uploads.BoundedUploadHandler']
+UPLOAD_MAX_SIZE = 10 * 1024 * 1024
+UPLOAD_MAX_REQUEST_SIZE = UPLOAD_MAX_SIZE + 1024 * 1024
+UPLOAD_MAX_PIXELS = 40 * 1000 * 1000
+UPLOAD_IMAGE_FORMATS = ('JPEG', 'PNG', 'GIF', 'WEBP')
+
+# Тесты (manage.py test, pytest) пишут кэш и метрики во временный
+# каталог своего процесса: их cache.clear() и metrics.reset() не трогают
+# данные dev-сервера.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    _test_dir = tempfile.mkdtemp(prefix='yatube-test-')
+    atexit.register(shutil.rmtree, _test_dir, True)
+
+# Кэш в файле SQLite общий для всех воркеров на хосте; перед ним стоит
+# небольшой кэш в памяти процесса.
+CACHE_PATH = os.environ.get('YATUBE_CACHE_PATH')
+if CACHE_PATH is None and TESTING:
+    CACHE_PATH = os.path.join(_test_dir, 'cache.sqlite3')
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.sqlite_cache.SQLiteCache',
+        'LOCATION': CACHE_PATH or os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+            'MAX_SIZE': 256 * 1024 * 1024,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 2,
+        },
     }
 }
 
+# Сколько секунд после истечения фрагмент ещё отдаётся, пока его
+# пересчитывает один процесс, и на сколько берётся аренда пересчёта.
+CACHE_STALE_TIMEOUT = 60
+CACHE_LOCK_TIMEOUT = 10
+# Сколько секунд ждать чужой пересчёт, если устаревшего значения нет.
+CACHE_LOCK_WAIT = 1.0
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
+
+POSTS_PER_PAGE = 10
+# Комментарии под постом подгружаются страницами по курсору.
+COMMENTS_PER_PAGE = 20
+# RSS/Atom: сколько последних постов в ленте и сколько секунд держать
+# готовый XML (версия области в ключе сбрасывает его раньше).
+SYNDICATION_ITEMS = 20
+SYNDICATION_CACHE_TIMEOUT = 60 * 60
+
+# Миниатюры, которые строятся заранее для каждой картинки поста:
+# (геометрия, опции sorl). Шаблоны используют те же значения.
+POST_THUMBNAILS = (
+    ('604x400', {'crop': 'center', 'upscale': True}),
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Варианты картинок для srcset: ширины — доли ширины геометрии, форматы
+# от компактного к привычному (Pillow без поддержки формата его пропустит).
+POST_IMAGE_SCALES = (0.5, 1, 1.5, 2)
+POST_IMAGE_FORMATS = (
+    ('AVIF', {'quality': 50, 'speed': 6}),
+    ('WEBP', {'quality': 75, 'method': 6}),
+)
+
+# Миниатюры строит sorl; бэкенд только добавляет их время в метрики.
+THUMBNAIL_BACKEND = 'posts.thumbnails.TimedThumbnailBackend'
+# sorl сам выбирает имена миниатюр и не смотрит на имя, которое вернуло
+# хранилище, поэтому миниатюры пишутся без адресации по содержимому.
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+
+# Кому отдавать стоимость запроса в заголовке Server-Timing: 'staff' —
+# только персоналу, True — всем, False — никому. Гистограммы по адресам
+# доступны персоналу на /metrics/ в любом случае.
+SERVER_TIMING = 'staff'
+# Каталог, где воркеры складывают метрики для /metrics/; очищается при
+# перезапуске сервиса.
+METRICS_DIR = os.environ.get('YATUBE_METRICS_DIR') or (
+    os.path.join(_test_dir, 'metrics') if TESTING
+    else os.path.join(BASE_DIR, 'metrics')
+)
+
+# Поиск: 'fts' — SQLite FTS5, 'index' — обратный индекс в таблицах,
+# 'auto' — FTS5, если миграция смогла создать его таблицу.
+SEARCH_BACKEND = 'auto'
+SEARCH_MAX_RESULTS = 50
+SEARCH_TIME_BUDGET_MS = 300
+
+# Очередь фоновых задач: время, на которое обработчик забирает задачу,
+# число попыток и начальная пауза перед повтором (удваивается).
+TASKS_VISIBILITY_TIMEOUT = 300
+TASKS_MAX_ATTEMPTS = 5
+TASKS_RETRY_BACKOFF = 10
+TASKS_WORKER_PROCESSES = 2
+
+# JSON API: размер страницы по умолчанию и наибольший, размер пачки,
+# которой выгрузка в NDJSON читает базу.
+API_PAGE_SIZE = 20
+API_MAX_PAGE_SIZE = 100
+API_EXPORT_BATCH_SIZE = 500
+
+# Режим пагинации лент: 'page' — нумерованные страницы (COUNT + OFFSET),
+# 'cursor' — переход по ключу (pub_date, id) для больших лент.
+FEED_PAGINATION = {
+    'index': 'page',
+    'group': 'page',
+    'profile': 'page',
+    'follow': 'page',
+}
+
+# Посты авторов, у которых подписчиков больше этого числа, не раздаются
+# в ленты при публикации, а подмешиваются в ленту подписок при чтении.
+TIMELINE_FANOUT_LIMIT = 10000
+# Сколько последних постов автора попадает в ленту при подписке.
+TIMELINE_BACKFILL_LIMIT = 500